@@ -2,74 +2,227 @@ import sys
 from model import PodcastModel, TextBlock
 
 import sys
+import asyncio
 import json
+import os
 import re
-from model import PodcastModel, TextBlock
+import time
+import zlib
+from model import PodcastModel, TextBlock, TTSCache
+from post_process import PodcastPostProcessor
+from tts_backends import AdaptiveRateLimiter, EdgeTTSBackend, LocalTTSBackend, MockTTSBackend
+
+class NearDuplicateFilter:
+    """
+    Detecta turnos casi duplicados entre fragmentos consecutivos del guión.
+
+    El chunker de n8n solapa 200 caracteres entre fragmentos, así que la IA
+    suele repetir un turno con otras palabras. Cada texto se reduce a
+    shingles de caracteres (robustos a palabras agregadas o cambiadas) y se
+    compara con Jaccard exacto contra los turnos del fragmento anterior.
+    Dentro de un mismo fragmento no se descarta nada: la ventana es chica,
+    así que el costo total sigue siendo lineal en el tamaño del guión.
+    """
+
+    def __init__(self, threshold=0.7, shingle_size=5):
+        self.threshold = threshold
+        self.shingle_size = shingle_size
+        self.previous = []  # (shingles, texto) del fragmento anterior
+        self.current = []
+        self.dropped = []
+
+    def shingles(self, text):
+        """Conjunto de shingles de ``shingle_size`` caracteres del texto normalizado (hash CRC32)"""
+        normalized = ' '.join(re.findall(r'\w+', text.lower())).encode('utf-8')
+        size = min(self.shingle_size, len(normalized)) or 1
+        return {zlib.crc32(normalized[i:i + size])
+                for i in range(max(1, len(normalized) - size + 1))}
+
+    def start_chunk(self):
+        """Cierra el fragmento actual; el siguiente solo se compara contra este"""
+        self.previous = self.current
+        self.current = []
+
+    def check(self, text):
+        """
+        Devuelve (similitud, texto_previo) si ``text`` casi duplica un turno
+        del fragmento anterior, o None; si no es duplicado lo registra en el
+        fragmento actual.
+        """
+        shingles = self.shingles(text)
+        best = None
+        for other, other_text in self.previous:
+            # Jaccard no puede superar min/max de los tamaños: se evita la intersección
+            if min(len(shingles), len(other)) < self.threshold * max(len(shingles), len(other)):
+                continue
+            similarity = len(shingles & other) / len(shingles | other)
+            if similarity >= self.threshold and (best is None or similarity > best[0]):
+                best = (similarity, other_text)
+        if best:
+            return best
+
+        self.current.append((shingles, text))
+        return None
+
+    def filter(self, segments):
+        """Filtra los segmentos de un fragmento recién cerrado e informa los descartes"""
+        kept = []
+        for segment in segments:
+            text = extract_text(segment)
+            match = self.check(text)
+            if match is None:
+                kept.append(segment)
+                continue
+            similarity, original = match
+            self.dropped.append((similarity, text, original))
+            print(f"🧹 Casi duplicado descartado (similitud {similarity:.2f}): '{text[:60]}...'")
+            print(f"   Ya incluido: '{original[:60]}...'")
+        self.start_chunk()
+        return kept
+
+
+class IncrementalScriptParser:
+    """
+    Tokenizador incremental de una sola pasada para el guión sucio de la IA.
+
+    Recorre el texto saltando con una regex entre los caracteres estructurales
+    ([ ] { } comillas y escapes), llevando profundidad y estado de string
+    entre llamadas a ``feed``. Cada vez que cierra un array u objeto de nivel
+    superior se intenta parsear (con ``clean_json_string`` como respaldo) y,
+    si es un podcast válido, se devuelven sus segmentos nuevos. Los textos
+    repetidos se descartan, y con ``similarity_threshold`` también los casi
+    duplicados respecto del fragmento anterior (ver NearDuplicateFilter).
+    """
+
+    STRUCTURAL = re.compile(r'[\[\]{}"\\]')
+    KEYWORDS = ('hablante', 'voz', 'texto', 'locutor')
+    MAX_CANDIDATE_CHARS = 200_000  # Un '[' suelto no debe acumular texto indefinidamente
+
+    def __init__(self, similarity_threshold=0.7):
+        self.near_duplicates = NearDuplicateFilter(similarity_threshold) if similarity_threshold else None
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+        self.parts = []
+        self.candidate_chars = 0
+        self.seen_texts = set()
+        self.candidates = 0
+
+    def feed(self, text):
+        """Procesa el texto nuevo y devuelve la lista de segmentos completados"""
+        segments = []
+        length = len(text)
+        position = 0
+        chunk_start = 0 if self.depth else None
+
+        if self.escape and length:
+            # El carácter escapado quedó al inicio de este fragmento
+            self.escape = False
+            position = 1
+
+        while True:
+            match = self.STRUCTURAL.search(text, position)
+            if match is None:
+                break
+            pos = match.start()
+            char = text[pos]
+            position = pos + 1
+
+            if self.depth == 0:
+                if char in '[{':
+                    self.depth = 1
+                    self.in_string = False
+                    self.parts = []
+                    self.candidate_chars = 0
+                    chunk_start = pos
+                continue
+
+            if self.in_string:
+                if char == '\\':
+                    if pos + 1 < length:
+                        position = pos + 2
+                    else:
+                        self.escape = True
+                elif char == '"':
+                    self.in_string = False
+                continue
+
+            if char == '"':
+                self.in_string = True
+            elif char in '[{':
+                self.depth += 1
+            elif char in ']}':
+                self.depth -= 1
+                if self.depth == 0:
+                    self.parts.append(text[chunk_start:pos + 1])
+                    candidate = ''.join(self.parts)
+                    self.parts = []
+                    chunk_start = None
+                    segments.extend(self._emit(candidate))
+
+        if self.depth and chunk_start is not None:
+            self.parts.append(text[chunk_start:])
+            self.candidate_chars += length - chunk_start
+            if self.candidate_chars > self.MAX_CANDIDATE_CHARS:
+                print("⚠️ Fragmento sin cerrar demasiado largo, se descarta")
+                self.depth = 0
+                self.parts = []
+
+        return segments
+
+    def _emit(self, candidate):
+        """Valida un array/objeto cerrado y devuelve sus segmentos no vistos"""
+        lowered = candidate.lower()
+        if not any(keyword in lowered for keyword in self.KEYWORDS):
+            return []
+
+        self.candidates += 1
+        try:
+            parsed = json.loads(candidate)
+        except json.JSONDecodeError:
+            clean_json = clean_json_string(candidate)
+            try:
+                parsed = json.loads(clean_json)
+            except json.JSONDecodeError as e:
+                print(f"⚠️ Error parsing JSON en fragmento {self.candidates}: {e}")
+                print(f"   JSON problemático: {clean_json[:200]}...")
+                return []
+
+        if not is_valid_podcast_json(parsed):
+            return []
+        items = parsed if isinstance(parsed, list) else parsed['podcast']
 
-def extract_json_from_dirty_text(content):
+        segments = []
+        for segment in items:
+            if not isinstance(segment, dict):
+                continue
+            text = extract_text(segment)
+            if text and text.strip() not in self.seen_texts:
+                segments.append(segment)
+                self.seen_texts.add(text.strip())
+
+        if self.near_duplicates is not None:
+            segments = self.near_duplicates.filter(segments)
+
+        print(f"✅ JSON válido encontrado con {len(items)} elementos ({len(segments)} nuevos)")
+        return segments
+
+
+def extract_json_from_dirty_text(content, similarity_threshold=0.7):
     """Extrae JSON de texto sucio de IA, manejando múltiples fragmentos y texto basura"""
     print("🔍 Extrayendo JSON de texto sucio...")
-    
-    # Separar el contenido por bloques usando líneas vacías
-    blocks = re.split(r'\n\s*\n+', content.strip())
-    
-    json_objects = []
-    
-    for i, block in enumerate(blocks):
-        if not block.strip():
-            continue
-            
-        print(f"📝 Procesando bloque {i+1}: {block[:100]}...")
-        
-        # Buscar patrones que parezcan arrays JSON
-        json_patterns = [
-            r'\[[\s\S]*?\]',  # Cualquier array
-        ]
-        
-        for pattern in json_patterns:
-            matches = re.findall(pattern, block, re.MULTILINE | re.DOTALL)
-            for match in matches:
-                # Verificar que el match contenga palabras clave de podcast
-                if any(keyword in match.lower() for keyword in ['hablante', 'voz', 'texto', 'locutor']):
-                    try:
-                        # Limpiar el JSON encontrado
-                        clean_json = clean_json_string(match)
-                        print(f"🧹 JSON limpiado: {clean_json[:150]}...")
-                        
-                        parsed = json.loads(clean_json)
-                        
-                        # Verificar que tenga la estructura correcta
-                        if is_valid_podcast_json(parsed):
-                            json_objects.append(parsed)
-                            print(f"✅ JSON válido encontrado con {len(parsed)} elementos")
-                    except json.JSONDecodeError as e:
-                        print(f"⚠️ Error parsing JSON en bloque {i+1}: {e}")
-                        print(f"   JSON problemático: {clean_json[:200]}...")
-                        continue
-    
+
+    # Una sola pasada del tokenizador incremental sobre todo el contenido
+    parser = IncrementalScriptParser(similarity_threshold)
+    combined_segments = parser.feed(content)
+    if parser.near_duplicates is not None and parser.near_duplicates.dropped:
+        print(f"🧹 {len(parser.near_duplicates.dropped)} turnos casi duplicados descartados")
+
     # Si no encontramos JSONs válidos, buscar líneas que parezcan diálogo
-    if not json_objects:
+    if not combined_segments:
         print("⚠️ No se encontró JSON válido, buscando formato [VOZ] alternativo...")
         return extract_voice_format_fallback(content)
-    
-    # Combinar todos los JSONs encontrados y eliminar duplicados
-    combined_segments = []
-    seen_texts = set()  # Para evitar duplicados
-    
-    for json_obj in json_objects:
-        if isinstance(json_obj, list):
-            for segment in json_obj:
-                text = extract_text(segment)
-                if text and text.strip() not in seen_texts:
-                    combined_segments.append(segment)
-                    seen_texts.add(text.strip())
-        elif isinstance(json_obj, dict) and 'podcast' in json_obj:
-            for segment in json_obj['podcast']:
-                text = extract_text(segment)
-                if text and text.strip() not in seen_texts:
-                    combined_segments.append(segment)
-                    seen_texts.add(text.strip())
-    
+
     print(f"🎯 Total de segmentos únicos extraídos: {len(combined_segments)}")
     return combined_segments
 
@@ -177,7 +330,7 @@ def extract_voice_format_fallback(content):
     
     return segments
 
-def parse_script_file(file_path):
+def parse_script_file(file_path, similarity_threshold=0.7, voice_style='argentina'):
     """Parsea archivo que puede contener JSON sucio o formato tradicional [VOZ]"""
     with open(file_path, 'r', encoding='utf-8') as file:
         content = file.read()
@@ -185,37 +338,88 @@ def parse_script_file(file_path):
     print(f"📖 Parseando archivo: {file_path}")
     
     # Intentar extraer JSON del texto sucio
-    segments = extract_json_from_dirty_text(content)
+    segments = extract_json_from_dirty_text(content, similarity_threshold)
     
     if not segments:
         print("❌ No se pudo extraer contenido válido del archivo")
         return []
     
     # Convertir segmentos JSON a TextBlocks
-    blocks = []
-    for segment in segments:
-        # Extraer información del segmento
-        speaker = extract_speaker(segment)
-        text = extract_text(segment)
-        
-        if not text.strip():
-            continue
-            
-        # Mapear hablante a voz
-        voice = map_speaker_to_voice(speaker)
-        
-        blocks.append(TextBlock(
-            text=text.strip(),
-            voice=voice,
-            speed='Rápida'  # Mantener velocidad rápida por defecto
-        ))
-        
-        print(f"🎙️ Bloque creado: {speaker} -> {voice}")
-        print(f"   Texto: '{text[:60]}...'")
-    
+    blocks = [block for block in (segment_to_block(segment, voice_style) for segment in segments)
+              if block is not None]
+
     print(f"✅ Parser completado: {len(blocks)} bloques de audio detectados")
     return blocks
 
+def segment_to_block(segment, voice_style='argentina'):
+    """Convierte un segmento JSON en TextBlock (None si no tiene texto)"""
+    # Extraer información del segmento
+    speaker = extract_speaker(segment)
+    text = extract_text(segment)
+    
+    if not text.strip():
+        return None
+        
+    # Mapear hablante a voz
+    voice = map_speaker_to_voice(speaker, voice_style)
+    
+    print(f"🎙️ Bloque creado: {speaker} -> {voice}")
+    print(f"   Texto: '{text[:60]}...'")
+    return TextBlock(
+        text=text.strip(),
+        voice=voice,
+        speed='Rápida'  # Mantener velocidad rápida por defecto
+    )
+
+async def follow_script_file(file_path, poll_interval=0.5, idle_timeout=120, similarity_threshold=0.7,
+                             voice_style='argentina'):
+    """
+    Sigue un guión mientras n8n le va agregando fragmentos (como ``tail -f``)
+
+    Genera TextBlocks en cuanto se cierra cada array JSON válido. Termina
+    cuando el archivo deja de crecer durante ``idle_timeout`` segundos o
+    cuando se renombra/elimina (el flujo lo renombra al terminar).
+    """
+    import codecs
+
+    while not os.path.exists(file_path):
+        print(f"⏳ Esperando a que exista {file_path}...")
+        await asyncio.sleep(poll_interval)
+
+    parser = IncrementalScriptParser(similarity_threshold)
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    print(f"👀 Siguiendo guión: {file_path}")
+
+    with open(file_path, 'rb') as f:
+        inode = os.fstat(f.fileno()).st_ino
+        last_growth = time.monotonic()
+        while True:
+            data = f.read()
+            if data:
+                last_growth = time.monotonic()
+                for segment in parser.feed(decoder.decode(data)):
+                    block = segment_to_block(segment, voice_style)
+                    if block is not None:
+                        yield block
+                continue
+
+            try:
+                replaced = os.stat(file_path).st_ino != inode
+            except FileNotFoundError:
+                replaced = True
+            if replaced:
+                print("📁 El guión fue renombrado o eliminado, fin del seguimiento")
+                break
+            if time.monotonic() - last_growth > idle_timeout:
+                print(f"⏱️ Sin cambios en {idle_timeout}s, fin del seguimiento")
+                break
+            await asyncio.sleep(poll_interval)
+
+    for segment in parser.feed(decoder.decode(b'', final=True)):
+        block = segment_to_block(segment, voice_style)
+        if block is not None:
+            yield block
+
 def extract_speaker(segment):
     """Extrae el hablante del segmento JSON"""
     speaker_keys = ['hablante', 'locutor', 'voz', 'speaker']
@@ -253,6 +457,15 @@ def map_speaker_to_voice(speaker, voice_style='argentina'):
         'espana': {
             'VOZ1': "es-ES-ElviraNeural", # Mujer España
             'VOZ2': "es-ES-AlvaroNeural"  # Hombre España
+        },
+        # Motores locales sin conexión (--tts local)
+        'piper': {
+            'VOZ1': "es_AR-daniela-high", # Mujer Argentina
+            'VOZ2': "es_MX-ald-medium"    # Hombre México
+        },
+        'espeak': {
+            'VOZ1': "es-419+f3",          # Mujer latinoamericana
+            'VOZ2': "es-419+m3"           # Hombre latinoamericano
         }
     }
     
@@ -268,17 +481,437 @@ def map_speaker_to_voice(speaker, voice_style='argentina'):
         # Default a VOZ1 si no se reconoce
         return style['VOZ1']
 
-def main(script_path, output_file="output_podcast.mp3"):
-    model = PodcastModel()
-    model.text_blocks = parse_script_file(script_path)
-    model.generate_audio(output_file)
+class PodcastBatchRunner:
+    """
+    Genera muchos podcasts en un único proceso y event loop (modo lote).
+
+    Los trabajos entran en una cola, ya sea desde una lista de pares
+    guión/salida, un directorio vigilado o un servicio HTTP local, y
+    ``max_jobs`` workers los procesan a la vez en modo streaming. Todos
+    comparten la caché TTS, el post-procesador y un semáforo global por
+    backend, así que ``max_concurrency`` (o la del backend, p. ej. un proceso
+    por núcleo para el motor local) limita las síntesis simultáneas de todo
+    el proceso y no las de cada podcast. Cada backend TTS (y con él las conexiones a
+    Edge TTS o el pool de procesos del motor local) también es uno solo
+    para todo el lote; cada trabajo puede elegir cuál usar.
+    """
+
+    def __init__(self, max_concurrency=4, max_jobs=2, cache=None, max_chars=3000,
+                 similarity_threshold=0.7, post_processor=None, backend=None, backends=None, max_retries=4):
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.max_jobs = max(1, int(max_jobs))
+        self.cache = cache
+        self.max_chars = max_chars
+        self.similarity_threshold = similarity_threshold
+        self.post_processor = post_processor
+        self.max_retries = max_retries
+        self.backend = backend or EdgeTTSBackend(max_connections=self.max_concurrency)
+        self.backends = dict(backends or {})  # Backends elegibles por trabajo (nombre -> TTSBackend)
+        self.backends.setdefault(self.backend.name, self.backend)
+        self.jobs = []  # Historial de trabajos (dicts con id, guion, salida, estado...)
+        self.queue = None
+        self.semaphores = {}  # Un semáforo global por backend
+        self.workers = []
+
+    async def start(self):
+        """Crea la cola, los semáforos globales y los workers dentro del loop actual"""
+        self.queue = asyncio.Queue()
+        self.semaphores = {name: asyncio.Semaphore(backend.max_concurrency or self.max_concurrency)
+                           for name, backend in self.backends.items()}
+        self.workers = [asyncio.ensure_future(self.worker()) for _ in range(self.max_jobs)]
+
+    async def stop(self):
+        """Cancela los workers (y los trabajos que estén en curso) y cierra el backend"""
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+        for backend in self.backends.values():
+            backend.report()
+            await backend.close()
+
+    def submit(self, script_path, output_file=None, tts=None):
+        """
+        Encola un guión; la salida por defecto es el mismo nombre con
+        extensión .mp3 y el backend, el del lote
+
+        Raises:
+            ValueError: Si ``tts`` no es uno de los backends disponibles
+        """
+        if tts and tts not in self.backends:
+            raise ValueError(f"Backend TTS desconocido: {tts} (opciones: {', '.join(self.backends)})")
+        output_file = output_file or os.path.splitext(script_path)[0] + '.mp3'
+        job = {
+            'id': len(self.jobs) + 1,
+            'guion': script_path,
+            'salida': output_file,
+            'tts': tts or self.backend.name,
+            'estado': 'en cola',
+            'error': None,
+            'segundos': None
+        }
+        self.jobs.append(job)
+        self.queue.put_nowait(job)
+        print(f"📥 Trabajo {job['id']} en cola: {script_path} -> {output_file} ({job['tts']})")
+        return job
+
+    async def worker(self):
+        while True:
+            job = await self.queue.get()
+            try:
+                await self.run_job(job)
+            finally:
+                self.queue.task_done()
+
+    async def run_job(self, job):
+        """Parsea el guión y genera su podcast con los recursos compartidos"""
+        job['estado'] = 'procesando'
+        started = time.monotonic()
+        print(f"🚀 Trabajo {job['id']}: {job['guion']}")
+        try:
+            backend = self.backends[job['tts']]
+            blocks = parse_script_file(job['guion'], self.similarity_threshold, backend.voice_style)
+            if not blocks:
+                raise ValueError("el guión no tiene bloques de audio")
+            model = PodcastModel(max_concurrency=backend.max_concurrency or self.max_concurrency,
+                                 cache=self.cache, max_tts_chars=self.max_chars,
+                                 post_processor=self.post_processor,
+                                 tts_semaphore=self.semaphores[job['tts']], backend=backend,
+                                 max_retries=self.max_retries)
+            model.text_blocks = blocks
+            if not await model.generate_audio_streaming_async(job['salida']):
+                raise ValueError("no se generó audio")
+        except asyncio.CancelledError:
+            job['estado'] = 'cancelado'
+            raise
+        except Exception as e:
+            job['estado'] = 'error'
+            job['error'] = str(e)
+            print(f"❌ Trabajo {job['id']} falló: {e}")
+        else:
+            job['estado'] = 'listo'
+            print(f"✅ Trabajo {job['id']} listo: {job['salida']}")
+        finally:
+            job['segundos'] = round(time.monotonic() - started, 1)
+
+    async def watch_directory(self, directory, output_dir=None, poll_interval=2.0, stable_seconds=5.0):
+        """
+        Encola cada ``*.txt`` nuevo o modificado de ``directory``
+
+        Un guión se encola cuando su tamaño y fecha no cambian durante
+        ``stable_seconds`` (n8n lo escribe por partes). Se omiten los que ya
+        tienen un MP3 más reciente y los ``*_guion.txt`` que genera el propio
+        podcast.
+        """
+        output_dir = output_dir or directory
+        seen = {}  # ruta -> (firma, momento en que se vio por primera vez)
+        done = {}  # ruta -> firma ya encolada
+        print(f"👀 Vigilando {directory} (salida en {output_dir})")
+
+        while True:
+            for name in sorted(os.listdir(directory)):
+                if not name.endswith('.txt'):
+                    continue
+                path = os.path.join(directory, name)
+                output_file = os.path.join(output_dir, os.path.splitext(name)[0] + '.mp3')
+                if name.endswith('_guion.txt') and os.path.exists(
+                        os.path.join(output_dir, name[:-len('_guion.txt')] + '.mp3')):
+                    continue  # Transcripción de un podcast ya generado
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+
+                signature = (stat.st_mtime, stat.st_size)
+                if done.get(path) == signature:
+                    continue
+                if os.path.exists(output_file) and os.path.getmtime(output_file) >= stat.st_mtime:
+                    done[path] = signature
+                    continue
+                if path not in seen or seen[path][0] != signature:
+                    seen[path] = (signature, time.monotonic())
+                    continue
+                if time.monotonic() - seen[path][1] < stable_seconds:
+                    continue
+
+                done[path] = signature
+                self.submit(path, output_file)
+            await asyncio.sleep(poll_interval)
+
+    async def serve(self, host='127.0.0.1', port=8765, input_root=None, output_root=None):
+        """
+        Servicio HTTP local para encolar trabajos desde n8n
+
+        - ``POST /trabajos`` con ``{"guion": "...", "salida": "...", "tts": "..."}``
+          (salida y tts opcionales; JSON con ``Content-Type: application/json``)
+        - ``GET /trabajos`` y ``GET /trabajos/<id>`` para consultar el estado
+
+        Las rutas relativas se resuelven contra ``input_root`` (guiones) y
+        ``output_root`` (MP3, por defecto el mismo); se rechaza cualquier ruta
+        que salga de ellos, así un pedido no puede leer ni pisar otros archivos.
+        """
+        from aiohttp import web
+
+        input_root = os.path.realpath(input_root or os.getcwd())
+        output_root = os.path.realpath(output_root or input_root)
+
+        def resolve(root, path):
+            resolved = os.path.realpath(os.path.join(root, path))
+            return resolved if os.path.commonpath([root, resolved]) == root else None
+
+        async def create_job(request):
+            # Exigir JSON también impide los POST text/plain de otros orígenes (sin preflight CORS)
+            if request.content_type != 'application/json':
+                return web.json_response({'error': 'Se espera Content-Type: application/json'}, status=415)
+            try:
+                data = await request.json()
+            except ValueError:
+                return web.json_response({'error': 'JSON inválido'}, status=400)
+            if not isinstance(data, dict):
+                return web.json_response({'error': 'Se espera un objeto JSON'}, status=400)
+            for field, required in (('guion', True), ('salida', False), ('tts', False)):
+                value = data.get(field)
+                if (value is not None or required) and not (isinstance(value, str) and value):
+                    return web.json_response({'error': f"El campo '{field}' debe ser un texto no vacío"},
+                                             status=400)
+
+            script_path = resolve(input_root, data['guion'])
+            if script_path is None:
+                return web.json_response({'error': f'El guión debe estar dentro de {input_root}'}, status=403)
+            if not os.path.isfile(script_path):
+                return web.json_response({'error': f"No existe {data['guion']}"}, status=404)
+            output_name = data.get('salida') or os.path.splitext(os.path.basename(script_path))[0] + '.mp3'
+            output_file = resolve(output_root, output_name)
+            if output_file is None or not output_file.lower().endswith('.mp3'):
+                return web.json_response({'error': f'La salida debe ser un .mp3 dentro de {output_root}'},
+                                         status=403)
+            try:
+                return web.json_response(self.submit(script_path, output_file, data.get('tts')), status=202)
+            except ValueError as e:
+                return web.json_response({'error': str(e)}, status=400)
+
+        async def list_jobs(request):
+            return web.json_response(self.jobs)
+
+        async def get_job(request):
+            job_id = request.match_info['id']
+            if not job_id.isdigit() or not 0 < int(job_id) <= len(self.jobs):
+                return web.json_response({'error': f'No existe el trabajo {job_id}'}, status=404)
+            return web.json_response(self.jobs[int(job_id) - 1])
+
+        app = web.Application()
+        app.add_routes([
+            web.post('/trabajos', create_job),
+            web.get('/trabajos', list_jobs),
+            web.get('/trabajos/{id}', get_job)
+        ])
+        runner = web.AppRunner(app)
+        await runner.setup()
+        await web.TCPSite(runner, host, port).start()
+        print(f"🌐 Servicio escuchando en http://{host}:{port}/trabajos "
+              f"(guiones en {input_root}, salida en {output_root})")
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await runner.cleanup()
+
+    async def run(self, pairs=(), watch_dir=None, output_dir=None, address=None, stable_seconds=5.0,
+                  service_root=None):
+        """
+        Procesa ``pairs`` y, si se pide, queda vigilando un directorio o
+        sirviendo por HTTP hasta que se interrumpa (Ctrl+C)
+        """
+        await self.start()
+        try:
+            for job in pairs:
+                try:
+                    self.submit(*job)
+                except ValueError as e:
+                    print(f"❌ {job[0]} omitido: {e}")
+            daemons = []
+            if watch_dir:
+                daemons.append(self.watch_directory(watch_dir, output_dir, stable_seconds=stable_seconds))
+            if address:
+                daemons.append(self.serve(*address, input_root=service_root, output_root=output_dir))
+            if daemons:
+                await asyncio.gather(*daemons)
+            else:
+                await self.queue.join()
+        finally:
+            await self.stop()
+            done = sum(1 for job in self.jobs if job['estado'] == 'listo')
+            print(f"📊 Lote terminado: {done}/{len(self.jobs)} podcasts generados")
+        return self.jobs
+
+def read_job_list(list_path):
+    """
+    Lee una lista de trabajos: una línea por podcast con la ruta del guión
+    y, opcionalmente, separados por tabuladores, el MP3 de salida y el
+    backend TTS. Ignora líneas vacías y comentarios (#).
+    """
+    jobs = []
+    with open(list_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            script_path, output_file, tts = (line.split('\t') + ['', ''])[:3]
+            jobs.append((script_path.strip(), output_file.strip() or None, tts.strip() or None))
+    return jobs
+
+def main(script_path, output_file="output_podcast.mp3", max_concurrency=4, cache=None, streaming=False,
+         max_chars=3000, follow=False, idle_timeout=120, similarity_threshold=0.7, post_processor=None,
+         backend=None, max_retries=4):
+    model = PodcastModel(max_concurrency=max_concurrency, cache=cache, max_tts_chars=max_chars,
+                         post_processor=post_processor, backend=backend, max_retries=max_retries)
+    voice_style = model.backend.voice_style
+    if follow:
+        # La síntesis arranca mientras el guión todavía se está escribiendo
+        model.text_blocks = []
+        model.generate_audio_streaming(output_file, source=follow_script_file(
+            script_path, idle_timeout=idle_timeout, similarity_threshold=similarity_threshold,
+            voice_style=voice_style))
+        print(f"✅ Podcast generado: {output_file}")
+        return
+
+    model.text_blocks = parse_script_file(script_path, similarity_threshold, voice_style)
+    if streaming:
+        model.generate_audio_streaming(output_file)
+    else:
+        model.generate_audio(output_file)
     print(f"✅ Podcast generado: {output_file}")
 
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("Uso: python main.py ruta/al/guion.txt [salida.mp3]")
-    else:
-        script_path = sys.argv[1]
-        output_file = sys.argv[2] if len(sys.argv) > 2 else "output_podcast.mp3"
-        main(script_path, output_file)
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Genera un podcast MP3 a partir de un guión")
+    parser.add_argument("script_path", nargs="?", help="Ruta al guión (.txt)")
+    parser.add_argument("output_file", nargs="?", default=None,
+                        help="Archivo MP3 de salida (default: output_podcast.mp3; en modo lote, "
+                             "el nombre del guión con extensión .mp3)")
+    parser.add_argument("--concurrencia", type=int, default=None,
+                        help="Máximo de bloques sintetizados en paralelo "
+                             "(default: 4, o un proceso por núcleo con --tts local)")
+    parser.add_argument("--cache-dir", default=None,
+                        help="Directorio de la caché de audio TTS (default: ~/.cache/podcast_tts)")
+    parser.add_argument("--cache-max-mb", type=int, default=500,
+                        help="Tamaño máximo de la caché en MB (default: 500)")
+    parser.add_argument("--sin-cache", action="store_true",
+                        help="Sintetizar todos los bloques sin usar la caché")
+    parser.add_argument("--streaming", action="store_true",
+                        help="Escribir el MP3 en orden a medida que llega cada bloque, sin temporales")
+    parser.add_argument("--max-caracteres", type=int, default=3000,
+                        help="Bloques más largos se dividen por oraciones y se sintetizan en paralelo (default: 3000)")
+    parser.add_argument("--seguir", action="store_true",
+                        help="Seguir el guión mientras se escribe y sintetizar cada fragmento al cerrarse (implica --streaming)")
+    parser.add_argument("--seguir-timeout", type=float, default=120,
+                        help="Segundos sin cambios en el guión para terminar el seguimiento (default: 120)")
+    parser.add_argument("--umbral-similitud", type=float, default=0.7,
+                        help="Similitud (Jaccard) a partir de la cual un turno del fragmento siguiente "
+                             "se considera casi duplicado; 0 desactiva el filtro (default: 0.7)")
+    parser.add_argument("--postproceso", action="store_true",
+                        help="Normalizar sonoridad por voz, agregar pausas entre hablantes y música en una sola pasada de ffmpeg")
+    parser.add_argument("--pausa", type=float, default=0.35,
+                        help="Pausa en segundos al cambiar de hablante (con --postproceso, default: 0.35)")
+    parser.add_argument("--lufs", type=float, default=-16.0,
+                        help="Sonoridad objetivo EBU R128 en LUFS (con --postproceso, default: -16)")
+    parser.add_argument("--ganancia", action="append", default=[], metavar="VOZ=DB",
+                        help="Ajuste manual por voz, p. ej. es-AR-TomasNeural=+1.5 (repetible)")
+    parser.add_argument("--musica", default=None,
+                        help="Música de fondo en bucle, atenuada automáticamente bajo la voz (con --postproceso)")
+    parser.add_argument("--musica-volumen", type=float, default=-20.0,
+                        help="Volumen de la música en dB (default: -20)")
+    parser.add_argument("--lote", default=None, metavar="LISTA",
+                        help="Archivo con un trabajo por línea: guión y, opcionalmente, tabulador y MP3 de salida")
+    parser.add_argument("--vigilar", default=None, metavar="DIR",
+                        help="Vigilar un directorio y generar un podcast por cada .txt nuevo o modificado")
+    parser.add_argument("--salida-dir", default=None,
+                        help="Directorio de los MP3 generados con --vigilar (default: el vigilado) o "
+                             "con --servicio (default: el de --servicio-raiz)")
+    parser.add_argument("--estable", type=float, default=5.0,
+                        help="Segundos sin cambios para considerar terminado un guión vigilado (default: 5)")
+    parser.add_argument("--servicio", default=None, metavar="[HOST:]PUERTO",
+                        help="Servicio HTTP local para encolar trabajos (POST /trabajos), p. ej. 8765")
+    parser.add_argument("--servicio-raiz", default=None, metavar="DIR",
+                        help="Directorio del que --servicio acepta guiones; se rechazan rutas fuera de él "
+                             "(default: el actual)")
+    parser.add_argument("--podcasts-simultaneos", type=int, default=2,
+                        help="Podcasts generados a la vez en modo lote; --concurrencia es el límite global (default: 2)")
+    parser.add_argument("--tts", choices=["edge", "local", "mock"], default="edge",
+                        help="Backend de síntesis: edge (Edge TTS, con conexiones reutilizadas), local "
+                             "(Piper o eSpeak-NG sin conexión) o mock (silencio simulado sin red, "
+                             "para medir rendimiento); en modo lote cada trabajo puede elegir otro (default: edge)")
+    parser.add_argument("--motor-local", choices=list(LocalTTSBackend.ENGINES), default="piper",
+                        help="Motor de --tts local (default: piper)")
+    parser.add_argument("--modelos-piper", default=None,
+                        help="Directorio con los modelos .onnx de Piper (default: ~/.local/share/piper)")
+    parser.add_argument("--procesos", type=int, default=None,
+                        help="Procesos del motor local (default: uno por núcleo)")
+    parser.add_argument("--reintentos", type=int, default=4,
+                        help="Reintentos por bloque, con backoff exponencial y jitter, antes de omitirlo (default: 4)")
+    parser.add_argument("--tts-rps", type=float, default=10.0,
+                        help="Pedidos por segundo iniciales al servicio TTS; la tasa baja sola ante "
+                             "rechazos por carga y vuelve a subir con los éxitos (default: 10)")
+    parser.add_argument("--mock-latencia", type=float, default=0.3,
+                        help="Latencia en segundos de cada pedido con --tts mock (default: 0.3)")
+    parser.add_argument("--mock-fallos", type=float, default=0.0,
+                        help="Probabilidad de fallo de cada pedido con --tts mock (default: 0)")
+    parser.add_argument("--mock-simultaneos", type=int, default=None,
+                        help="Pedidos simultáneos que acepta el TTS simulado; el resto se rechaza")
+    parser.add_argument("--mock-rps", type=float, default=None,
+                        help="Pedidos por segundo que acepta el TTS simulado; el resto se rechaza")
+    args = parser.parse_args()
+
+    batch_mode = args.lote or args.vigilar or args.servicio
+    if not batch_mode and not args.script_path:
+        parser.error("falta script_path (o usar --lote, --vigilar o --servicio)")
+
+    cache = None if args.sin_cache else TTSCache(args.cache_dir, args.cache_max_mb * 1024 * 1024)
+
+    post_processor = None
+    if args.postproceso or args.musica:
+        voice_gains = {}
+        for item in args.ganancia:
+            voice, _, gain = item.partition('=')
+            try:
+                voice_gains[voice.strip()] = float(gain)
+            except ValueError:
+                parser.error(f"--ganancia inválida: {item} (formato VOZ=DB)")
+        post_processor = PodcastPostProcessor(gap=args.pausa, voice_gains=voice_gains, target_lufs=args.lufs,
+                                              music_path=args.musica, music_volume_db=args.musica_volumen)
+
+    # Los backends no abren conexiones ni procesos hasta el primer pedido
+    backends = {
+        "edge": EdgeTTSBackend(max_connections=args.concurrencia or 4,
+                               rate_limiter=AdaptiveRateLimiter(args.tts_rps)),
+        "local": LocalTTSBackend(args.motor_local, args.modelos_piper, args.procesos),
+        "mock": MockTTSBackend(latency=args.mock_latencia, failure_rate=args.mock_fallos,
+                               max_concurrent=args.mock_simultaneos, requests_per_second=args.mock_rps,
+                               rate_limiter=AdaptiveRateLimiter(args.tts_rps))
+    }
+    backend = backends[args.tts]
+    concurrency = args.concurrencia or backend.max_concurrency or 4
+
+    if batch_mode:
+        # Un solo proceso y event loop para todos los podcasts
+        pairs = read_job_list(args.lote) if args.lote else []
+        if args.script_path:
+            pairs.insert(0, (args.script_path, args.output_file, None))
+        address = None
+        if args.servicio:
+            host, _, port = args.servicio.rpartition(':')
+            if not port.isdigit():
+                parser.error(f"--servicio inválido: {args.servicio} (formato [HOST:]PUERTO)")
+            address = (host or '127.0.0.1', int(port))
+        runner = PodcastBatchRunner(args.concurrencia or 4, args.podcasts_simultaneos, cache, args.max_caracteres,
+                                    args.umbral_similitud, post_processor, backend, backends, args.reintentos)
+        try:
+            asyncio.run(runner.run(pairs, args.vigilar, args.salida_dir, address, args.estable,
+                                   args.servicio_raiz))
+        except KeyboardInterrupt:
+            print("🛑 Modo lote detenido")
+        sys.exit(0 if all(job['estado'] == 'listo' for job in runner.jobs) else 1)
 
+    main(args.script_path, args.output_file or "output_podcast.mp3", concurrency, cache, args.streaming,
+         args.max_caracteres, args.seguir, args.seguir_timeout, args.umbral_similitud, post_processor, backend,
+         args.reintentos)
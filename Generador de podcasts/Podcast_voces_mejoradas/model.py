@@ -1,8 +1,13 @@
 import os
 import asyncio
+import hashlib
+import json
+import random
+import re
 import subprocess
-import edge_tts
 from datetime import timedelta
+from mp3_utils import mp3_duration, mp3_duration_bytes, concat_mp3_files, join_mp3_bytes, Mp3StreamWriter
+from tts_backends import EdgeTTSBackend, TTSError, TTSThrottled
 
 class TextBlock:
     def __init__(self, text='', voice='es-MX-DaliaNeural', speed='Normal'):
@@ -11,12 +16,122 @@ class TextBlock:
         self.speed = speed  # Agregar atributo de velocidad
         self.duration = 0  # Duración en segundos del audio generado
         self.start_time = 0  # Tiempo de inicio en el podcast completo
+        self.words = []  # (inicio, fin, palabra) en segundos, relativos al bloque
+
+class TTSCache:
+    """
+    Caché en disco de audio sintetizado, direccionada por contenido.
+
+    La clave es un hash de (texto limpio, voz, velocidad), así que un bloque
+    que no cambió entre ejecuciones se reutiliza aunque cambie su posición.
+    Al superar ``max_bytes`` se eliminan primero los archivos usados hace más
+    tiempo (LRU por fecha de modificación, que se actualiza en cada acierto).
+    """
+
+    def __init__(self, cache_dir=None, max_bytes=500 * 1024 * 1024):
+        self.cache_dir = cache_dir or os.path.join(os.path.expanduser('~'), '.cache', 'podcast_tts')
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(clean_text, voice, rate, backend='edge'):
+        """Hash estable del contenido que determina el audio generado (incluido el backend)"""
+        payload = '\x00'.join((backend, clean_text, voice, rate)).encode('utf-8')
+        return hashlib.sha256(payload).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f'{key}.mp3')
+
+    def get_bytes(self, key):
+        """Devuelve el audio cacheado en memoria, o None si no está"""
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            os.utime(path)
+        except OSError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return data
+
+    def get_words(self, key):
+        """Devuelve las marcas de palabra guardadas junto al audio ([] si no hay)"""
+        try:
+            with open(self._path(key)[:-4] + '.words.json', 'r', encoding='utf-8') as f:
+                return [tuple(word) for word in json.load(f)]
+        except (OSError, ValueError):
+            return []
+
+    def put_bytes(self, key, data, words=None):
+        """Guarda ``data`` (y sus marcas de palabra) en la caché con escritura atómica"""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        files = [(path, data)]
+        if words:
+            files.insert(0, (path[:-4] + '.words.json',
+                             json.dumps(words, ensure_ascii=False).encode('utf-8')))
+
+        for target, content in files:
+            tmp_path = f'{target}.{os.getpid()}.tmp'
+            try:
+                with open(tmp_path, 'wb') as f:
+                    f.write(content)
+                os.replace(tmp_path, target)
+            except OSError as e:
+                print(f"⚠️ No se pudo guardar en caché {key}: {e}")
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                return
+
+    def evict(self):
+        """Elimina las entradas menos usadas hasta quedar bajo ``max_bytes``"""
+        entries = []
+        total = 0
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith('.mp3'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+
+        if total <= self.max_bytes:
+            return
+
+        for _, size, path in sorted(entries):
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            words_path = path[:-4] + '.words.json'
+            if os.path.exists(words_path):
+                os.remove(words_path)
+            total -= size
+            if total <= self.max_bytes:
+                break
+
 
 class PodcastModel:
-    def __init__(self):
+    def __init__(self, max_concurrency=4, cache=None, max_tts_chars=3000, post_processor=None,
+                 tts_semaphore=None, backend=None, max_retries=4, backoff_base=1.0, backoff_max=30.0):
         self.text_blocks = [TextBlock()]  # Inicia con un bloque de texto
         self.available_voices = self.get_available_voices()
-        self.max_tts_chars = 3000  # Edge TTS permite textos más largos
+        self.max_tts_chars = max_tts_chars  # Bloques más largos se dividen por oraciones
+        self.max_concurrency = max(1, int(max_concurrency))  # Síntesis simultáneas
+        self.cache = cache  # TTSCache opcional; None desactiva la caché
+        self.post_processor = post_processor  # PodcastPostProcessor opcional
+        self.tts_semaphore = tts_semaphore  # Semáforo compartido entre podcasts (modo lote)
+        self.backend = backend or EdgeTTSBackend(max_connections=self.max_concurrency)  # TTSBackend
+        self.max_retries = max_retries  # Reintentos por bloque (compartidos entre sus fragmentos)
+        self.backoff_base = backoff_base  # Espera del primer reintento; se duplica en cada uno
+        self.backoff_max = backoff_max
         self.speed_map = {
             'Muy lenta': '-50%',
             'Lenta': '-25%',
@@ -37,6 +152,21 @@ class PodcastModel:
         }
         return voices
 
+    def get_voice_descriptions(self):
+        """Descripción de cada voz para el guión y los metadatos"""
+        return {
+            'es-AR-ElenaNeural': '[VOZ1] (Mujer Argentina)',
+            'es-AR-TomasNeural': '[VOZ2] (Hombre Argentina)',
+            'es-MX-DaliaNeural': '[VOZ1] (Mujer México)',
+            'es-MX-JorgeNeural': '[VOZ2] (Hombre México)',
+            'es-CO-SalomeNeural': '[VOZ1] (Mujer Colombia)',
+            'es-CO-GonzaloNeural': '[VOZ2] (Hombre Colombia)',
+            'es_AR-daniela-high': '[VOZ1] (Mujer Argentina, Piper)',
+            'es_MX-ald-medium': '[VOZ2] (Hombre México, Piper)',
+            'es-419+f3': '[VOZ1] (Mujer, eSpeak-NG)',
+            'es-419+m3': '[VOZ2] (Hombre, eSpeak-NG)'
+        }
+
     def add_text_block(self):
         """Añade un nuevo bloque de texto"""
         self.text_blocks.append(TextBlock())
@@ -46,60 +176,317 @@ class PodcastModel:
         temp_files = []
         current_time = 0.0  # Tiempo acumulado en segundos
 
-        # Procesar cada bloque de texto y generar un archivo temporal
+        # Preparar los trabajos de síntesis (uno por bloque con texto)
+        jobs = []
         for idx, block in enumerate(self.text_blocks):
             if not block.text.strip():
                 print(f"Bloque de texto {idx + 1} está vacío. Se omitirá.")
                 continue
+            jobs.append((block, f'temp_{idx}.wav'))
 
-            temp_file = f'temp_{idx}.wav'
-            
+        # Sintetizar todos los bloques en un único event loop, con concurrencia limitada
+        asyncio.run(self.run_with_backend(self.synthesize_blocks_async(jobs)))
+
+        # Calcular timestamps en el orden original del guión
+        for block, temp_file in jobs:
             # Establecer tiempo de inicio para este bloque
             block.start_time = current_time
-            
-            # Ejecutar Edge TTS de forma asíncrona
-            asyncio.run(self.generate_edge_audio_async(
-                block.text, temp_file, block.voice, block.speed
-            ))
 
             if os.path.exists(temp_file) and os.path.getsize(temp_file) > 1000:
                 # Calcular duración del archivo de audio generado
-                duration = self.get_audio_duration(temp_file)
+                duration = self.get_audio_duration(temp_file, block)
                 block.duration = duration
                 current_time += duration
                 
                 temp_files.append(temp_file)
                 print(f"✅ Archivo temporal creado: {temp_file} (duración: {duration:.2f}s)")
             else:
+                block.duration = 0
                 print(f"❌ Error generando el archivo de audio {temp_file}, se omitirá.")
 
         # Combinar todos los archivos temporales usando ffmpeg
         if temp_files:
             self.combine_audio_files(temp_files, file_name)
             print(f"✅ Podcast generado exitosamente: {file_name}")
+            if self.post_processor is not None:
+                self.post_processor.process(file_name, self.text_blocks)
             
-            # Generar guión con timestamps
+            # Generar guión con timestamps, subtítulos y tiempos para Vidazor
             self.generate_transcript_with_timestamps(file_name)
+            self.generate_subtitles(file_name)
+            self.generate_slide_timings(file_name)
 
         # Eliminar archivos temporales
         for temp_file in temp_files:
             if os.path.exists(temp_file):
                 os.remove(temp_file)
 
-    def get_audio_duration(self, audio_file):
-        """Obtiene la duración en segundos de un archivo de audio usando ffprobe"""
+    async def synthesize_blocks_async(self, jobs, synthesize=None):
+        """
+        Sintetiza los bloques de forma concurrente dentro de un mismo event loop.
+
+        ``jobs`` es una lista de tuplas (TextBlock, archivo_destino). Un semáforo
+        limita las peticiones simultáneas a ``max_concurrency`` y ``gather``
+        devuelve los resultados en el mismo orden que los trabajos.
+        ``synthesize`` permite inyectar una corrutina alternativa con la misma
+        firma que ``synthesize_text_async`` (por ejemplo, un TTS falso local).
+        """
+        semaphore = self.make_semaphore()
+
+        async def run(block, temp_file):
+            data = await self.synthesize_block_async(block, semaphore, synthesize)
+            if data:
+                with open(temp_file, 'wb') as f:
+                    f.write(data)
+            return data
+
+        print(f"🎙️ Sintetizando {len(jobs)} bloques (hasta {self.max_concurrency} en paralelo)...")
+        results = await asyncio.gather(*(run(block, temp_file) for block, temp_file in jobs))
+        self.report_cache()
+        return results
+
+    async def synthesize_block_async(self, block, semaphore, synthesize=None):
+        """
+        Devuelve el audio MP3 de un bloque completo (b'' si falla).
+
+        Con caché activa solo se llama al TTS si el bloque no está cacheado.
+        Los bloques que superan ``max_tts_chars`` se dividen por oraciones y
+        los fragmentos se sintetizan en paralelo (cada uno ocupa un lugar del
+        semáforo); después se unen frame a frame, así que para los timestamps
+        siguen contando como un único TextBlock. Las marcas de palabra de los
+        fragmentos se desplazan y quedan en ``block.words``.
+
+        Un fragmento sin audio se reintenta con backoff exponencial con
+        jitter (fuera del semáforo, para no bloquear a los demás) mientras
+        quede presupuesto: el bloque entero tiene ``max_retries`` reintentos.
+        """
+        synthesize = synthesize or self.synthesize_text_async
+        block.words = []
+        cache = self.active_cache()
+        if cache is not None:
+            key = self.cache_key(block)
+            data = self.cache.get_bytes(key)
+            if data is not None:
+                block.words = self.cache.get_words(key)
+                return data
+
+        pieces = self.split_text_into_segments(block.text, self.max_tts_chars)
+        if len(pieces) > 1:
+            print(f"✂️ Bloque de {len(block.text)} caracteres dividido en {len(pieces)} fragmentos")
+
+        retries_left = self.max_retries
+
+        async def run_piece(number, piece):
+            nonlocal retries_left
+            attempt = 0
+            while True:
+                async with semaphore:
+                    result = await synthesize(piece, block.voice, block.speed)
+                if len(result[0]) > 1000 or retries_left <= 0:
+                    return result
+                retries_left -= 1
+                attempt += 1
+                delay = min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1))
+                delay = random.uniform(delay / 2, delay)
+                print(f"🔁 Reintento {attempt} del fragmento {number}/{len(pieces)} en {delay:.1f}s "
+                      f"(quedan {retries_left} para el bloque)")
+                await asyncio.sleep(delay)
+
+        results = await asyncio.gather(*(run_piece(number, piece) for number, piece in enumerate(pieces, 1)))
+
+        chunks = []
+        rates = set()
+        words = []
+        offset = 0.0
+        for number, (data, used_rate, piece_words) in enumerate(results, 1):
+            if len(data) <= 1000:
+                print(f"⚠️ Fragmento {number}/{len(pieces)} sin audio, se omitirá: '{pieces[number - 1][:50]}...'")
+                continue
+            try:
+                piece_duration = mp3_duration_bytes(data)
+            except ValueError as e:
+                print(f"⚠️ Fragmento {number}/{len(pieces)} inválido, se omitirá: {e}")
+                continue
+            chunks.append(data)
+            rates.add(used_rate)
+            words.extend((offset + start, offset + end, word) for start, end, word in piece_words)
+            offset += piece_duration
+
+        if not chunks:
+            return b''
         try:
-            result = subprocess.run([
-                'ffprobe', '-v', 'quiet', '-show_entries', 'format=duration',
-                '-of', 'default=noprint_wrappers=1:nokey=1', audio_file
-            ], capture_output=True, text=True, check=True)
-            
-            duration = float(result.stdout.strip())
-            return duration
-        except (subprocess.CalledProcessError, ValueError) as e:
+            data = join_mp3_bytes(chunks) if len(chunks) > 1 else chunks[0]
+        except ValueError as e:
+            print(f"❌ No se pudieron unir los fragmentos del bloque: {e}")
+            return b''
+        block.words = words
+
+        # Solo se cachea el bloque completo y con una única velocidad aplicada
+        if cache is not None and len(chunks) == len(pieces) and len(rates) == 1:
+            cache.put_bytes(self.cache_key(block, rates.pop()), data, words)
+        return data
+
+    def generate_audio_streaming(self, file_name='podcast.mp3', source=None):
+        """
+        Genera el podcast en modo streaming, sin archivos temporales por bloque
+
+        El audio de cada bloque se recibe en memoria desde el stream de Edge TTS
+        y se añade al MP3 final en orden en cuanto el bloque está listo; los
+        timestamps se calculan sobre la marcha. ``source`` es un iterador
+        asíncrono opcional de TextBlocks (modo seguimiento): cada bloque se
+        empieza a sintetizar en cuanto llega.
+        """
+        return asyncio.run(self.run_with_backend(self.generate_audio_streaming_async(file_name, source=source)))
+
+    async def run_with_backend(self, coro):
+        """Ejecuta ``coro`` y cierra las conexiones del backend TTS antes de salir del event loop"""
+        try:
+            return await coro
+        finally:
+            self.backend.report()
+            await self.backend.close()
+
+    async def generate_audio_streaming_async(self, file_name='podcast.mp3', source=None, synthesize=None):
+        """
+        Versión asíncrona de ``generate_audio_streaming`` para correr varios
+        podcasts en un mismo event loop (modo lote)
+
+        El post-procesado con ffmpeg se ejecuta en un hilo para no frenar la
+        síntesis de los demás podcasts. Devuelve True si se generó el audio.
+        """
+        if not await self.stream_blocks_async(file_name, synthesize=synthesize, source=source):
+            return False
+        print(f"✅ Podcast generado exitosamente: {file_name}")
+        if self.post_processor is not None:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, self.post_processor.process, file_name, self.text_blocks)
+        self.generate_transcript_with_timestamps(file_name)
+        self.generate_subtitles(file_name)
+        self.generate_slide_timings(file_name)
+        return True
+
+    def make_semaphore(self):
+        """Semáforo de síntesis: el compartido si lo hay, si no uno propio de ``max_concurrency``"""
+        if self.tts_semaphore is not None:
+            return self.tts_semaphore
+        return asyncio.Semaphore(self.max_concurrency)
+
+    async def stream_blocks_async(self, file_name, synthesize=None, source=None):
+        """
+        Sintetiza los bloques concurrentemente y los escribe en orden en ``file_name``.
+
+        ``synthesize`` permite inyectar una corrutina con la firma de
+        ``synthesize_text_async``. Si se indica ``source`` (iterador
+        asíncrono de TextBlocks) los bloques se agregan a ``text_blocks`` a
+        medida que llegan. Devuelve True si se escribió audio.
+        """
+        semaphore = self.make_semaphore()
+        pending = asyncio.Queue()
+
+        async def iterate_blocks():
+            for block in list(self.text_blocks):
+                yield block
+
+        async def produce():
+            # Lanza la síntesis de cada bloque apenas está disponible
+            try:
+                idx = len(self.text_blocks) if source is not None else 0
+                async for block in (source if source is not None else iterate_blocks()):
+                    if source is not None:
+                        self.text_blocks.append(block)
+                    if not block.text.strip():
+                        print(f"Bloque de texto {idx + 1} está vacío. Se omitirá.")
+                    else:
+                        task = asyncio.ensure_future(self.synthesize_block_async(block, semaphore, synthesize))
+                        await pending.put((idx, block, task))
+                    idx += 1
+            finally:
+                await pending.put(None)
+
+        print(f"🎙️ Sintetizando bloques en streaming (hasta {self.max_concurrency} en paralelo)...")
+        producer = asyncio.ensure_future(produce())
+        tasks = []
+        writer = Mp3StreamWriter(file_name)
+        current_time = 0.0
+
+        try:
+            # Escribir en el orden del guión a medida que cada bloque termina
+            while True:
+                item = await pending.get()
+                if item is None:
+                    break
+                idx, block, task = item
+                tasks.append(task)
+                data = await task
+                block.start_time = current_time
+                block.duration = 0
+
+                if len(data) <= 1000:
+                    print(f"❌ Error generando el audio del bloque {idx + 1}, se omitirá.")
+                    continue
+                try:
+                    block.duration = writer.append(data, f'bloque {idx + 1}')
+                except ValueError as e:
+                    print(f"❌ Bloque {idx + 1} descartado: {e}")
+                    continue
+
+                current_time += block.duration
+                print(f"✅ Bloque {idx + 1} añadido en {self.format_timestamp(block.start_time)} "
+                      f"(duración: {block.duration:.2f}s)")
+
+            await producer  # Propaga errores de la fuente
+
+            if not writer.frame_count:
+                writer.abort()
+                return False
+            writer.close()
+            return True
+        except BaseException:
+            producer.cancel()
+            while not pending.empty():
+                item = pending.get_nowait()
+                if item is not None:
+                    tasks.append(item[2])
+            for task in tasks:
+                task.cancel()
+            writer.abort()
+            raise
+        finally:
+            self.report_cache()
+
+    def cache_key(self, block, rate=None):
+        """Clave de caché de un bloque (por defecto con la velocidad solicitada)"""
+        rate = rate or self.speed_map[block.speed]
+        return TTSCache.make_key(self.clean_text_for_tts(block.text), block.voice, rate,
+                                 self.backend.cache_namespace)
+
+    def active_cache(self):
+        """La caché TTS, salvo que el backend no deba cachearse (p. ej. el simulado)"""
+        if self.backend.cache_namespace is None:
+            return None
+        return self.cache
+
+    def report_cache(self):
+        """Aplica el límite de la caché y muestra aciertos y fallos"""
+        if self.cache is not None:
+            self.cache.evict()
+            print(f"💾 Caché TTS: {self.cache.hits} aciertos, {self.cache.misses} bloques sintetizados")
+
+    def get_audio_duration(self, audio_file, block=None):
+        """
+        Obtiene la duración en segundos de un archivo de audio
+
+        Se calcula en proceso leyendo las cabeceras de frame MP3 (Edge TTS
+        entrega MP3 aunque el temporal se llame .wav). Si falla, se estima a
+        partir del texto del bloque correspondiente.
+        """
+        try:
+            return mp3_duration(audio_file)
+        except (OSError, ValueError) as e:
             print(f"❌ Error calculando duración de {audio_file}: {e}")
             # Estimación basada en caracteres (aprox 10-15 caracteres por segundo)
-            estimated_duration = len(self.text_blocks[0].text) / 12.0
+            text = block.text if block is not None else ''
+            estimated_duration = len(text) / 12.0
             return estimated_duration
 
     def format_timestamp(self, seconds):
@@ -120,14 +507,7 @@ class PodcastModel:
         transcript_file = f"{base_name}_guion.txt"
         
         # Mapeo de voces a descripción
-        voice_descriptions = {
-            'es-AR-ElenaNeural': '[VOZ1] (Mujer Argentina)',
-            'es-AR-TomasNeural': '[VOZ2] (Hombre Argentina)',
-            'es-MX-DaliaNeural': '[VOZ1] (Mujer México)',
-            'es-MX-JorgeNeural': '[VOZ2] (Hombre México)',
-            'es-CO-SalomeNeural': '[VOZ1] (Mujer Colombia)',
-            'es-CO-GonzaloNeural': '[VOZ2] (Hombre Colombia)'
-        }
+        voice_descriptions = self.get_voice_descriptions()
         
         try:
             with open(transcript_file, 'w', encoding='utf-8') as f:
@@ -153,8 +533,161 @@ class PodcastModel:
         except Exception as e:
             print(f"❌ Error generando guión: {e}")
 
+    def format_cue_time(self, seconds, separator='.'):
+        """Convierte segundos a HH:MM:SS.mmm (SRT usa ',' como separador)"""
+        millis = int(round(seconds * 1000))
+        hours, millis = divmod(millis, 3600000)
+        minutes, millis = divmod(millis, 60000)
+        secs, millis = divmod(millis, 1000)
+        return f"{hours:02d}:{minutes:02d}:{secs:02d}{separator}{millis:03d}"
+
+    def format_slide_time(self, seconds):
+        """Convierte segundos al formato de slides.schema.json de Vidazor (MM:SS.mmm)"""
+        millis = int(round(seconds * 1000))
+        hours, millis = divmod(millis, 3600000)
+        minutes, millis = divmod(millis, 60000)
+        secs, millis = divmod(millis, 1000)
+        text = f"{hours:02d}:{minutes:02d}:{secs:02d}" if hours else f"{minutes:02d}:{secs:02d}"
+        return f"{text}.{millis:03d}" if millis else text
+
+    def align_words(self, block):
+        """
+        Recupera la puntuación de las marcas WordBoundary del bloque
+
+        Edge TTS informa solo las palabras; se ubican en orden dentro del texto
+        limpio y cada una incorpora los signos pegados a ella (¿Qué, verdes.).
+        """
+        text = self.clean_text_for_tts(block.text)
+        positions = []
+        cursor = 0
+        for _, _, word in block.words:
+            found = text.find(word, cursor)
+            positions.append(found)
+            if found != -1:
+                cursor = found + len(word)
+
+        tokens = []
+        previous_end = 0
+        for i, (start, end, word) in enumerate(block.words):
+            token = word
+            found = positions[i]
+            if found != -1:
+                following = next((pos for pos in positions[i + 1:] if pos != -1), len(text))
+                begin, finish = found, found + len(word)
+                while begin > previous_end and not text[begin - 1].isspace():
+                    begin -= 1
+                while finish < following and not text[finish].isspace():
+                    finish += 1
+                token = text[begin:finish]
+                previous_end = finish
+            tokens.append((block.start_time + start, block.start_time + end, token))
+        return tokens
+
+    def collect_cues(self, max_chars=42, max_duration=5.0):
+        """
+        Agrupa las palabras en cues de subtítulos (tiempos absolutos)
+
+        Un cue se cierra al final de una oración, al superar ``max_chars`` o
+        ``max_duration`` y siempre al terminar el bloque. Los bloques sin
+        marcas de palabra generan un único cue con todo su texto.
+        """
+        cues = []
+        for block in self.text_blocks:
+            if not block.text.strip() or block.duration <= 0:
+                continue
+            block_end = block.start_time + block.duration
+            if not block.words:
+                cues.append((block.start_time, block_end, self.clean_text_for_tts(block.text)))
+                continue
+
+            current = []
+            for start, end, token in self.align_words(block):
+                if current:
+                    text = ' '.join(t for _, _, t in current)
+                    if len(text) + len(token) + 1 > max_chars or end - current[0][0] > max_duration:
+                        cues.append((current[0][0], current[-1][1], text))
+                        current = []
+                current.append((start, min(end, block_end), token))
+                if token[-1] in '.!?…':
+                    cues.append((current[0][0], current[-1][1], ' '.join(t for _, _, t in current)))
+                    current = []
+            if current:
+                cues.append((current[0][0], current[-1][1], ' '.join(t for _, _, t in current)))
+        return cues
+
+    def generate_subtitles(self, audio_file):
+        """Genera subtítulos SRT y WebVTT con tiempos a nivel de palabra"""
+        base_name = os.path.splitext(audio_file)[0]
+        cues = self.collect_cues()
+        if not cues:
+            return
+
+        try:
+            with open(f"{base_name}.srt", 'w', encoding='utf-8') as f:
+                for number, (start, end, text) in enumerate(cues, 1):
+                    f.write(f"{number}\n{self.format_cue_time(start, ',')} --> {self.format_cue_time(end, ',')}\n{text}\n\n")
+
+            with open(f"{base_name}.vtt", 'w', encoding='utf-8') as f:
+                f.write("WEBVTT\n\n")
+                for start, end, text in cues:
+                    f.write(f"{self.format_cue_time(start)} --> {self.format_cue_time(end)}\n{text}\n\n")
+
+            print(f"✅ Subtítulos generados: {base_name}.srt / {base_name}.vtt ({len(cues)} cues)")
+        except Exception as e:
+            print(f"❌ Error generando subtítulos: {e}")
+
+    def generate_slide_timings(self, audio_file):
+        """
+        Genera ``<base>_slides.json`` con una slide por bloque, válido para Vidazor
+
+        Cada slide sigue slides.schema.json: inicio/fin reales del bloque,
+        título tomado de la primera oración, las oraciones como puntos y la
+        voz en las notas. Así el video puede usar estos tiempos directamente.
+        """
+        base_name = os.path.splitext(audio_file)[0]
+        voice_descriptions = self.get_voice_descriptions()
+        slides = []
+
+        for block in self.text_blocks:
+            if not block.text.strip() or block.duration <= 0:
+                continue
+            sentences = [s.strip() for s in re.split(r'(?<=[.!?…])\s+', block.text.strip()) if s.strip()]
+            title = sentences[0].rstrip('.:;,')
+            if len(title) > 80:
+                title = title[:77].rstrip() + '...'
+            slides.append({
+                "inicio": self.format_slide_time(block.start_time),
+                "fin": self.format_slide_time(block.start_time + block.duration),
+                "titulo": title or block.text.strip()[:80],
+                "puntos": [sentence[:500] for sentence in sentences[:10]],
+                "notas": voice_descriptions.get(block.voice, '[VOZ] (Voz)')
+            })
+
+        if not slides:
+            return
+        try:
+            with open(f"{base_name}_slides.json", 'w', encoding='utf-8') as f:
+                json.dump(slides, f, ensure_ascii=False, indent=2)
+            print(f"✅ Tiempos de slides para Vidazor: {base_name}_slides.json")
+        except Exception as e:
+            print(f"❌ Error generando tiempos de slides: {e}")
+
     def combine_audio_files(self, input_files, output_file):
-        """Combina múltiples archivos de audio usando ffmpeg"""
+        """
+        Combina múltiples archivos de audio
+
+        Si todos los segmentos son MP3 con los mismos parámetros (lo normal con
+        Edge TTS) se unen frame a frame sin recodificar; si no, se transcodifica
+        con ffmpeg.
+        """
+        if output_file.lower().endswith('.mp3'):
+            try:
+                frame_count = concat_mp3_files(input_files, output_file)
+                print(f"⚡ Audio unido sin recodificar ({frame_count} frames)")
+                return
+            except (OSError, ValueError) as e:
+                print(f"⚠️ No se puede unir sin recodificar, transcodificando con ffmpeg: {e}")
+
         if len(input_files) == 1:
             # Si solo hay un archivo, simplemente convertirlo a MP3
             subprocess.run([
@@ -221,33 +754,86 @@ class PodcastModel:
         return clean_text
 
     async def generate_edge_audio_async(self, text, temp_file, voice_code, speed):
-        """Genera audio usando Edge TTS (Microsoft) - GRATIS"""
+        """
+        Genera audio usando Edge TTS (Microsoft) - GRATIS
+
+        Devuelve la velocidad aplicada o None si la síntesis falló.
+        """
+        data, used_rate, _ = await self.synthesize_text_async(text, voice_code, speed)
+        if data:
+            with open(temp_file, 'wb') as f:
+                f.write(data)
+        return used_rate
+
+    async def synthesize_text_async(self, text, voice_code, speed):
+        """
+        Sintetiza un texto en memoria con el backend TTS configurado (un intento)
+
+        Si el backend tiene limitador de tasa, se espera un token antes del
+        pedido y se le informa el resultado para que ajuste la tasa. Devuelve
+        una tupla (bytes MP3, velocidad aplicada, palabras), donde palabras son
+        tuplas (inicio, fin, texto) en segundos. Si la síntesis falla devuelve
+        (b'', None, []) y los reintentos quedan a cargo del bloque.
+        """
+        # Limpiar el texto de caracteres problemáticos
+        clean_text = self.clean_text_for_tts(text)
+        limiter = self.backend.rate_limiter
+        if limiter is not None:
+            await limiter.acquire()
+
         try:
-            # Limpiar el texto de caracteres problemáticos
-            clean_text = self.clean_text_for_tts(text)
-            
-            # Usar Edge TTS simple sin SSML complejo
-            communicate = edge_tts.Communicate(
-                text=clean_text, 
-                voice=voice_code,
-                rate=self.speed_map[speed]  # Aplicar velocidad directamente
-            )
-            await communicate.save(temp_file)
-            print(f"✅ Audio generado con Edge TTS ({voice_code}): '{clean_text[:50]}...'")
-            
-        except Exception as e:
-            print(f"❌ Error con configuración de velocidad, usando modo básico: {e}")
-            # Fallback completamente básico
-            try:
-                clean_text = self.clean_text_for_tts(text)
-                communicate = edge_tts.Communicate(text=clean_text, voice=voice_code)
-                await communicate.save(temp_file)
-                print(f"✅ Audio generado (modo básico): '{clean_text[:50]}...'")
-            except Exception as e2:
-                print(f"❌ Error crítico con Edge TTS: {e2}")
+            # Aplicar la velocidad directamente, sin SSML complejo
+            data, words = await self.backend.synthesize(clean_text, voice_code, self.speed_map[speed])
+        except TTSThrottled as e:
+            if limiter is not None and limiter.on_throttle():
+                print(f"🐢 {self.backend.name} rechazó el pedido ({e}), tasa reducida a {limiter.rate:.1f} pedidos/s")
+            return b'', None, []
+        except TTSError as e:
+            print(f"❌ Error con {self.backend.name}: {e}")
+            return b'', None, []
+
+        if limiter is not None:
+            limiter.on_success()
+        print(f"✅ Audio generado con {self.backend.name} ({voice_code}): '{clean_text[:50]}...'")
+        return data, self.speed_map[speed], words
 
     def split_text_into_segments(self, text, max_chars):
-        """Divide el texto en segmentos más pequeños basados en el límite de caracteres"""
+        """
+        Divide el texto en segmentos de hasta ``max_chars`` caracteres
+
+        Se corta en límites de oración (. ! ? … ; :) agrupando oraciones
+        consecutivas; solo una oración que por sí sola supera el límite se
+        divide por palabras.
+        """
+        text = text.strip()
+        if len(text) <= max_chars:
+            return [text] if text else []
+
+        sentences = [s for s in re.split(r'(?<=[.!?…;:])\s+', text) if s]
+        segments = []
+        current_segment = ""
+
+        for sentence in sentences:
+            if len(sentence) > max_chars:
+                if current_segment:
+                    segments.append(current_segment)
+                    current_segment = ""
+                segments.extend(self.split_words(sentence, max_chars))
+            elif not current_segment:
+                current_segment = sentence
+            elif len(current_segment) + len(sentence) + 1 <= max_chars:  # +1 para el espacio
+                current_segment += " " + sentence
+            else:
+                segments.append(current_segment)
+                current_segment = sentence
+
+        if current_segment:  # Añadir el último segmento si queda algo
+            segments.append(current_segment)
+
+        return segments
+
+    def split_words(self, text, max_chars):
+        """Divide el texto por palabras basándose en el límite de caracteres"""
         words = text.split()
         segments = []
         current_segment = ""
@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+"""
+Utilidades MP3 en proceso (sin ffprobe).
+
+Edge TTS entrega MP3 (audio-24khz-48kbitrate-mono-mp3), así que la duración
+de cada bloque se obtiene recorriendo las cabeceras de frame MPEG: cada
+frame aporta un número fijo de muestras y la suma dividida por la
+frecuencia de muestreo da la duración exacta.
+"""
+
+import os
+from collections import namedtuple
+
+# Versiones MPEG según los bits 19-20 de la cabecera
+MPEG_VERSIONS = {0b00: '2.5', 0b10: '2', 0b11: '1'}
+
+# Capas según los bits 17-18
+MPEG_LAYERS = {0b01: 3, 0b10: 2, 0b11: 1}
+
+# Bitrates en kbps indexados por (versión MPEG-1 o no, capa)
+BITRATES = {
+    (True, 1): [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+    (True, 2): [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+    (True, 3): [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    (False, 1): [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+    (False, 2): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    (False, 3): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+
+SAMPLE_RATES = {
+    '1': [44100, 48000, 32000],
+    '2': [22050, 24000, 16000],
+    '2.5': [11025, 12000, 8000],
+}
+
+FrameHeader = namedtuple('FrameHeader', [
+    'version', 'layer', 'bitrate', 'sample_rate', 'channels', 'samples', 'length'
+])
+
+
+def parse_frame_header(data, offset=0):
+    """
+    Interpreta la cabecera de 4 bytes de un frame MPEG en ``offset``.
+
+    Devuelve un FrameHeader o None si los bytes no son una cabecera válida.
+    """
+    if offset + 4 > len(data):
+        return None
+
+    b0, b1, b2, b3 = data[offset], data[offset + 1], data[offset + 2], data[offset + 3]
+    if b0 != 0xFF or (b1 & 0xE0) != 0xE0:
+        return None
+
+    version = MPEG_VERSIONS.get((b1 >> 3) & 0x03)
+    layer = MPEG_LAYERS.get((b1 >> 1) & 0x03)
+    bitrate_index = (b2 >> 4) & 0x0F
+    rate_index = (b2 >> 2) & 0x03
+    if version is None or layer is None or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+
+    is_v1 = version == '1'
+    bitrate = BITRATES[(is_v1, layer)][bitrate_index] * 1000
+    sample_rate = SAMPLE_RATES[version][rate_index]
+    padding = (b2 >> 1) & 0x01
+    channels = 1 if (b3 >> 6) == 0b11 else 2
+
+    if layer == 1:
+        samples = 384
+        length = (12 * bitrate // sample_rate + padding) * 4
+    else:
+        samples = 1152 if (layer == 2 or is_v1) else 576
+        length = samples // 8 * bitrate // sample_rate + padding
+
+    return FrameHeader(version, layer, bitrate, sample_rate, channels, samples, length)
+
+
+def side_info_size(header):
+    """Tamaño de la side info de Layer III que precede a una cabecera Xing/Info"""
+    if header.version == '1':
+        return 17 if header.channels == 1 else 32
+    return 9 if header.channels == 1 else 17
+
+
+def is_info_frame(data, offset, header):
+    """True si el frame en ``offset`` es una cabecera Xing/Info (sin audio)"""
+    if header.layer != 3:
+        return False
+    tag_offset = offset + 4 + side_info_size(header)
+    return data[tag_offset:tag_offset + 4] in (b'Xing', b'Info')
+
+
+def skip_id3v2(data):
+    """Devuelve el offset del primer byte tras una etiqueta ID3v2 (0 si no hay)"""
+    if len(data) >= 10 and data[:3] == b'ID3':
+        size = 0
+        for byte in data[6:10]:
+            size = (size << 7) | (byte & 0x7F)
+        footer = 10 if data[5] & 0x10 else 0
+        return 10 + size + footer
+    return 0
+
+
+def iter_frames(data):
+    """
+    Recorre los frames MPEG de ``data`` y genera tuplas (offset, FrameHeader).
+
+    Si aparece basura entre frames se resincroniza buscando la siguiente
+    cabecera válida.
+    """
+    offset = skip_id3v2(data)
+    end = len(data)
+
+    while offset + 4 <= end:
+        header = parse_frame_header(data, offset)
+        if header is None or header.length <= 0:
+            offset = data.find(b'\xff', offset + 1)
+            if offset == -1:
+                return
+            continue
+        if offset + header.length > end:
+            return  # Frame truncado al final del archivo
+        yield offset, header
+        offset += header.length
+
+
+def mp3_duration_bytes(data):
+    """
+    Duración en segundos de un MP3 en memoria.
+
+    Raises:
+        ValueError: Si no se encuentra ningún frame MPEG válido
+    """
+    samples = 0
+    sample_rate = None
+    for index, (offset, header) in enumerate(iter_frames(data)):
+        if index == 0 and is_info_frame(data, offset, header):
+            continue  # El frame Xing/Info no contiene audio
+        samples += header.samples
+        sample_rate = header.sample_rate
+
+    if not sample_rate:
+        raise ValueError("No se encontraron frames MPEG válidos")
+    return samples / sample_rate
+
+
+def mp3_duration(path):
+    """
+    Duración en segundos de un archivo MP3.
+
+    Raises:
+        OSError: Si el archivo no se puede leer
+        ValueError: Si no contiene frames MPEG válidos
+    """
+    with open(path, 'rb') as f:
+        return mp3_duration_bytes(f.read())
+
+
+def join_mp3_bytes(chunks):
+    """
+    Une fragmentos MP3 en memoria descartando sus etiquetas ID3 y frames Xing/Info.
+
+    Raises:
+        ValueError: Si los fragmentos no comparten parámetros o alguno no
+            contiene frames válidos
+    """
+    joined = bytearray()
+    signature = None
+    for number, data in enumerate(chunks, 1):
+        found = False
+        for index, (offset, header) in enumerate(iter_frames(data)):
+            if index == 0 and is_info_frame(data, offset, header):
+                continue
+            current = stream_signature(header)
+            if signature is not None and current != signature:
+                raise ValueError(f"Parámetros MP3 distintos en el fragmento {number}: {current} != {signature}")
+            signature = current
+            joined += data[offset:offset + header.length]
+            found = True
+        if not found:
+            raise ValueError(f"No se encontraron frames MPEG válidos en el fragmento {number}")
+    return bytes(joined)
+
+
+def stream_signature(header):
+    """Parámetros que deben coincidir para unir dos streams sin recodificar"""
+    return (header.version, header.layer, header.sample_rate, header.channels)
+
+
+def build_info_frame(template, data, frame_count, byte_count, vbr):
+    """
+    Construye un frame Xing/Info con el número de frames y bytes del stream.
+
+    ``template`` es la cabecera del primer frame de audio (``data`` son sus
+    bytes); se reutiliza sin padding. Devuelve None si el frame es demasiado
+    pequeño para alojar la etiqueta.
+    """
+    header_bytes = bytearray(data[:4])
+    header_bytes[2] &= 0xFD  # Sin padding
+    length = template.length - ((data[2] >> 1) & 0x01)
+    tag_offset = 4 + side_info_size(template)
+    if tag_offset + 16 > length:
+        return None
+
+    frame = bytearray(length)
+    frame[:4] = header_bytes
+    frame[tag_offset:tag_offset + 4] = b'Xing' if vbr else b'Info'
+    frame[tag_offset + 4:tag_offset + 8] = (0x01 | 0x02).to_bytes(4, 'big')  # Frames + bytes
+    frame[tag_offset + 8:tag_offset + 12] = frame_count.to_bytes(4, 'big')
+    frame[tag_offset + 12:tag_offset + 16] = (byte_count + length).to_bytes(4, 'big')
+    return bytes(frame)
+
+
+def silent_mp3_bytes(seconds, sample_rate=24000, bitrate=48000, channels=1):
+    """
+    MP3 Layer III de silencio con la duración pedida (redondeada a frames).
+
+    Por defecto usa los mismos parámetros que Edge TTS, así el audio se puede
+    unir con el real. Cada frame es una cabecera seguida de side info y datos
+    en cero, que los decodificadores interpretan como silencio.
+
+    Raises:
+        ValueError: Si la combinación de frecuencia y bitrate no es válida
+    """
+    version = next((v for v, rates in SAMPLE_RATES.items() if sample_rate in rates), None)
+    if version is None:
+        raise ValueError(f"Frecuencia de muestreo no soportada: {sample_rate}")
+    bitrates = BITRATES[(version == '1', 3)]
+    if bitrate // 1000 not in bitrates[1:]:
+        raise ValueError(f"Bitrate no soportado para MPEG {version}: {bitrate}")
+
+    version_bits = {v: k for k, v in MPEG_VERSIONS.items()}[version]
+    header = bytes([
+        0xFF,
+        0xE0 | (version_bits << 3) | (0b01 << 1) | 0x01,  # Layer III, sin CRC
+        (bitrates.index(bitrate // 1000) << 4) | (SAMPLE_RATES[version].index(sample_rate) << 2),
+        0xC0 if channels == 1 else 0x00  # Mono o estéreo
+    ])
+    frame_header = parse_frame_header(header)
+    frame = header + bytes(frame_header.length - 4)
+    frames = max(1, round(seconds * sample_rate / frame_header.samples))
+    return frame * frames
+
+
+class Mp3StreamWriter:
+    """
+    Escribe un MP3 de forma incremental a partir de fragmentos MP3 completos.
+
+    Cada ``append`` descarta etiquetas ID3 y frames Xing/Info del fragmento,
+    verifica que los parámetros coincidan con lo ya escrito y añade los
+    frames al archivo. Al crear el archivo se reserva el frame Info, que se
+    completa en ``close`` con los totales (Xing si el bitrate varió). Se
+    escribe en un temporal junto al destino y se renombra al cerrar, así dos
+    trabajos en el mismo directorio no comparten archivos intermedios.
+    """
+
+    def __init__(self, output_path):
+        self.output_path = output_path
+        self.tmp_path = f'{output_path}.{os.getpid()}.{id(self):x}.part'
+        self.file = None
+        self.signature = None
+        self.first_frame = None
+        self.info_length = 0
+        self.bitrates = set()
+        self.frame_count = 0
+        self.byte_count = 0
+        self.samples = 0
+
+    @property
+    def duration(self):
+        """Duración en segundos del audio escrito hasta ahora"""
+        return self.samples / self.signature[2] if self.signature else 0.0
+
+    def append(self, data, source='fragmento'):
+        """
+        Añade los frames de ``data`` y devuelve la duración en segundos añadida.
+
+        Raises:
+            ValueError: Si el fragmento no tiene frames válidos o sus
+                parámetros difieren de los ya escritos
+        """
+        frames = []
+        # La firma solo se fija cuando el fragmento completo es válido y se va a escribir
+        signature = self.signature
+        for index, (offset, header) in enumerate(iter_frames(data)):
+            if index == 0 and is_info_frame(data, offset, header):
+                continue
+            current = stream_signature(header)
+            if signature is not None and current != signature:
+                raise ValueError(f"Parámetros MP3 distintos en {source}: {current} != {signature}")
+            signature = current
+            frames.append((header, data[offset:offset + header.length]))
+
+        if not frames:
+            raise ValueError(f"No se encontraron frames MPEG válidos en {source}")
+        self.signature = signature
+
+        if self.file is None:
+            self.file = open(self.tmp_path, 'wb')
+            self.first_frame = frames[0]
+            placeholder = build_info_frame(frames[0][0], frames[0][1], 0, 0, False)
+            if placeholder:
+                self.file.write(placeholder)
+                self.info_length = len(placeholder)
+
+        samples = 0
+        for header, frame in frames:
+            self.file.write(frame)
+            self.bitrates.add(header.bitrate)
+            self.byte_count += len(frame)
+            samples += header.samples
+        self.frame_count += len(frames)
+        self.samples += samples
+        return samples / self.signature[2]
+
+    def close(self):
+        """Completa el frame Info y mueve el archivo a su destino. Devuelve los frames escritos."""
+        if self.file is None:
+            raise ValueError("No hay audio para unir")
+
+        if self.info_length:
+            header, frame = self.first_frame
+            info_frame = build_info_frame(header, frame, self.frame_count, self.byte_count,
+                                          len(self.bitrates) > 1)
+            self.file.seek(0)
+            self.file.write(info_frame)
+        self.file.close()
+        self.file = None
+        os.replace(self.tmp_path, self.output_path)
+        return self.frame_count
+
+    def abort(self):
+        """Descarta el archivo parcial"""
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+
+def concat_mp3_files(input_paths, output_path):
+    """
+    Une archivos MP3 frame a frame, sin recodificar.
+
+    Devuelve el número de frames escritos.
+
+    Raises:
+        ValueError: Si las entradas no comparten versión, capa, frecuencia
+            y canales, o si alguna no contiene frames válidos
+    """
+    writer = Mp3StreamWriter(output_path)
+    try:
+        for path in input_paths:
+            with open(path, 'rb') as f:
+                writer.append(f.read(), path)
+        return writer.close()
+    except BaseException:
+        writer.abort()
+        raise
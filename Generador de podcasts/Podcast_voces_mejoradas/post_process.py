@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Post-procesado del podcast en un único grafo de filtros de ffmpeg.
+
+A partir de la lista de TextBlock (con start_time y duration ya medidos) se
+insertan pausas entre hablantes como frames MP3 de silencio (sin
+decodificar), se aplica a cada turno la ganancia de su voz y, opcionalmente,
+se mezcla una música de fondo que baja sola cuando hay voz (ducking). Todo
+sale en una sola codificación, con un grafo lineal en la duración del audio
+y no en la cantidad de turnos.
+"""
+
+import json
+import os
+import re
+import subprocess
+import tempfile
+import threading
+
+from mp3_utils import Mp3StreamWriter, is_info_frame, iter_frames, silent_mp3_bytes
+
+
+class PodcastPostProcessor:
+    """
+    Construye y ejecuta el grafo de post-procesado del podcast.
+
+    La normalización EBU R128 se hace por voz: la sonoridad integrada y el
+    true peak de cada voz se miden una vez con ``loudnorm`` y se guardan en
+    caché; después cada turno recibe la ganancia lineal que lo lleva a
+    ``target_lufs`` (limitada por el margen de true peak, como el modo
+    ``linear`` de loudnorm). Así no hace falta una segunda pasada por
+    podcast y las voces argentinas, mexicanas y colombianas quedan parejas.
+    """
+
+    MAX_MEASURE_BLOCKS = 30  # Turnos usados para medir una voz nueva
+
+    def __init__(self, gap=0.35, voice_gains=None, target_lufs=-16.0, true_peak=-1.5,
+                 music_path=None, music_volume_db=-20.0, bitrate='64k', cache_path=None):
+        self.gap = gap
+        self.voice_gains = voice_gains or {}
+        self.target_lufs = target_lufs
+        self.true_peak = true_peak
+        self.music_path = music_path
+        self.music_volume_db = music_volume_db
+        self.bitrate = bitrate
+        self.cache_path = cache_path or os.path.join(
+            os.path.expanduser('~'), '.cache', 'podcast_tts', 'loudness.json')
+        self.measurements = self._load_cache()
+        self.lock = threading.Lock()  # Varios podcasts pueden post-procesarse a la vez (modo lote)
+
+    def _load_cache(self):
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_cache(self):
+        os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+        tmp_path = f'{self.cache_path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.measurements, f, indent=2)
+        os.replace(tmp_path, self.cache_path)
+
+    def measure_voice(self, audio_file, voice, blocks):
+        """
+        Mide la sonoridad de una voz con loudnorm (solo si no está en caché)
+
+        Se seleccionan hasta ``MAX_MEASURE_BLOCKS`` turnos de esa voz con
+        ``aselect`` y se analiza sin codificar.
+        """
+        if voice in self.measurements:
+            return self.measurements[voice]
+
+        ranges = '+'.join(f"between(t,{block.start_time:.3f},{block.start_time + block.duration:.3f})"
+                          for block in blocks[:self.MAX_MEASURE_BLOCKS])
+        try:
+            result = subprocess.run([
+                'ffmpeg', '-hide_banner', '-nostats', '-i', audio_file,
+                '-af', f"aselect='{ranges}',loudnorm=I={self.target_lufs}:TP={self.true_peak}:print_format=json",
+                '-f', 'null', '-'
+            ], capture_output=True, text=True)
+        except OSError:
+            result = None
+
+        match = result and re.search(r'\{[^{}]*"input_i"[^{}]*\}', result.stderr)
+        if not match or result.returncode != 0:
+            print(f"⚠️ No se pudo medir la sonoridad de {voice}, se usará ganancia 0 dB")
+            return None
+
+        data = json.loads(match.group(0))
+        measurement = {key: float(data[key]) for key in ('input_i', 'input_tp', 'input_lra', 'input_thresh')}
+        if measurement['input_i'] == float('-inf'):
+            return None
+        with self.lock:
+            self.measurements[voice] = measurement
+            self._save_cache()
+        print(f"📏 Sonoridad de {voice}: {measurement['input_i']:.1f} LUFS, TP {measurement['input_tp']:.1f} dBTP")
+        return measurement
+
+    def voice_gain_db(self, measurement, voice):
+        """Ganancia lineal hacia ``target_lufs`` sin pasar el true peak, más el ajuste manual de la voz"""
+        gain = 0.0
+        if measurement:
+            gain = self.target_lufs - measurement['input_i']
+            gain = min(gain, self.true_peak - measurement['input_tp'])
+        return gain + self.voice_gains.get(voice, 0.0)
+
+    def insert_gaps(self, data, blocks, output_path):
+        """
+        Copia los frames de ``data`` a ``output_path`` insertando una pausa de
+        frames de silencio al cambiar de hablante.
+
+        Los cortes caen en el límite de frame más cercano al final de cada
+        turno, que es donde empezó el MP3 de la síntesis siguiente. Devuelve
+        los nuevos tiempos de inicio por turno.
+
+        Raises:
+            ValueError: Si ``data`` no tiene frames MP3 válidos
+        """
+        frames = [(offset, header) for index, (offset, header) in enumerate(iter_frames(data))
+                  if not (index == 0 and is_info_frame(data, offset, header))]
+        if not frames:
+            raise ValueError("No se encontraron frames MPEG válidos")
+        first = frames[0][1]
+        gap_frames = round(self.gap * first.sample_rate / first.samples) if first.layer == 3 else 0
+        gap = gap_frames * first.samples / first.sample_rate
+        silence = (silent_mp3_bytes(gap, first.sample_rate, first.bitrate, first.channels)
+                   if gap_frames else b'')
+
+        starts = []
+        cuts = []  # Muestra del audio original tras la que va cada pausa
+        inserted = 0.0
+        for i, block in enumerate(blocks):
+            starts.append(block.start_time + inserted)
+            if silence and i + 1 < len(blocks) and blocks[i + 1].voice != block.voice:
+                cuts.append(round((block.start_time + block.duration) * first.sample_rate))
+                inserted += gap
+
+        writer = Mp3StreamWriter(output_path)
+        try:
+            chunk = bytearray()
+            position = 0
+            cut_index = 0
+            for offset, header in frames:
+                if cut_index < len(cuts) and position >= cuts[cut_index] - header.samples // 2:
+                    if chunk:
+                        writer.append(bytes(chunk), 'audio ensamblado')
+                        chunk = bytearray()
+                    writer.append(silence, 'pausa')
+                    cut_index += 1
+                chunk += data[offset:offset + header.length]
+                position += header.samples
+            if chunk:
+                writer.append(bytes(chunk), 'audio ensamblado')
+            writer.close()
+        except BaseException:
+            writer.abort()
+            raise
+        return starts
+
+    def build_filter_graph(self, blocks, starts, gains, sample_rate):
+        """
+        Arma el grafo: un único volume cuya ganancia cambia con asendcmd en
+        cada cambio de voz y, si hay música, ducking con sidechaincompress.
+        """
+        audio_format = f"aformat=sample_fmts=fltp:sample_rates={sample_rate}:channel_layouts=mono"
+        commands = []
+        for i, block in enumerate(blocks):
+            if i == 0 or gains[block.voice] != gains[blocks[i - 1].voice]:
+                # En medio de la pausa (si la hay), para que el cambio no caiga sobre la voz
+                previous_end = starts[i - 1] + blocks[i - 1].duration if i else 0.0
+                at = (previous_end + starts[i]) / 2
+                commands.append(f"{at:.3f} volume@voz volume {gains[block.voice]:.2f}dB")
+
+        limit = min(1.0, max(0.0625, 10 ** (self.true_peak / 20)))
+        parts = [f"[0:a]asendcmd=c='{';'.join(commands)}',"
+                 f"volume@voz=volume={gains[blocks[0].voice]:.2f}dB,{audio_format}[voice]"]
+
+        if self.music_path:
+            parts.append("[voice]asplit=2[vmain][vside]")
+            parts.append(f"[1:a]{audio_format},volume={self.music_volume_db:.1f}dB[bed]")
+            parts.append("[bed][vside]sidechaincompress=threshold=0.02:ratio=10:attack=20:release=600[ducked]")
+            parts.append(f"[vmain][ducked]amix=inputs=2:duration=first:normalize=0,alimiter=limit={limit:.4f}[out]")
+        else:
+            parts.append(f"[voice]alimiter=limit={limit:.4f}[out]")
+
+        return ';\n'.join(parts)
+
+    def process(self, audio_file, text_blocks):
+        """
+        Re-codifica ``audio_file`` en su lugar con el grafo completo
+
+        Actualiza ``start_time`` de los bloques para reflejar las pausas
+        insertadas. Devuelve True si el post-procesado se aplicó.
+        """
+        blocks = [block for block in text_blocks if block.text.strip() and block.duration > 0]
+        if not blocks:
+            return False
+
+        with open(audio_file, 'rb') as f:
+            data = f.read()
+        first_frame = next(iter_frames(data), None)
+        if first_frame is None:
+            print(f"⚠️ {audio_file} no es un MP3 válido, se omite el post-procesado")
+            return False
+        sample_rate = first_frame[1].sample_rate
+
+        # Ganancia por voz a partir de mediciones cacheadas (o nuevas)
+        gains = {}
+        for voice in dict.fromkeys(block.voice for block in blocks):
+            voice_blocks = [block for block in blocks if block.voice == voice]
+            gains[voice] = self.voice_gain_db(self.measure_voice(audio_file, voice, voice_blocks), voice)
+            print(f"🎚️ {voice}: {gains[voice]:+.1f} dB")
+
+        gapped_tmp = f'{audio_file}.{os.getpid()}.gaps.mp3'
+        output_tmp = f'{audio_file}.{os.getpid()}.post.mp3'
+        graph_file = None
+        try:
+            starts = self.insert_gaps(data, blocks, gapped_tmp)
+
+            # El grafo va en un archivo: en la línea de comandos crece con los turnos
+            with tempfile.NamedTemporaryFile('w', suffix='.ffgraph', delete=False, encoding='utf-8') as f:
+                f.write(self.build_filter_graph(blocks, starts, gains, sample_rate))
+                graph_file = f.name
+
+            command = ['ffmpeg', '-hide_banner', '-y', '-i', gapped_tmp]
+            if self.music_path:
+                command += ['-stream_loop', '-1', '-i', self.music_path]
+            command += ['-filter_complex_script', graph_file, '-map', '[out]',
+                        '-c:a', 'libmp3lame', '-b:a', self.bitrate, output_tmp]
+            result = subprocess.run(command, capture_output=True, text=True)
+            error = result.stderr.strip()[-500:] if result.returncode != 0 else None
+        except (OSError, ValueError) as e:
+            error = str(e)
+        finally:
+            for path in (gapped_tmp, graph_file):
+                if path and os.path.exists(path):
+                    os.remove(path)
+
+        if error is not None:
+            print(f"❌ Error en el post-procesado: {error}")
+            if os.path.exists(output_tmp):
+                os.remove(output_tmp)
+            return False
+        os.replace(output_tmp, audio_file)
+
+        # Los bloques sin audio quedan al final del turno anterior
+        start_by_block = {id(block): start for block, start in zip(blocks, starts)}
+        current = 0.0
+        for block in text_blocks:
+            if id(block) in start_by_block:
+                block.start_time = start_by_block[id(block)]
+                current = block.start_time + block.duration
+            else:
+                block.start_time = current
+
+        print(f"✅ Post-procesado aplicado ({len(blocks)} turnos, pausa {self.gap:.2f}s"
+              f"{', con música' if self.music_path else ''})")
+        return True
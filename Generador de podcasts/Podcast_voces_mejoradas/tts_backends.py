@@ -0,0 +1,532 @@
+#!/usr/bin/env python3
+"""
+Backends de síntesis de voz para el generador de podcasts.
+
+Todos exponen la misma corrutina ``synthesize(text, voice, rate)``, que
+devuelve (bytes MP3, palabras) con palabras como tuplas (inicio, fin, texto)
+en segundos, y lanzan ``TTSError`` si la síntesis falla. PodcastModel solo
+habla con esta interfaz, así que el mismo flujo sirve para Edge TTS, para
+los motores locales sin conexión (Piper o eSpeak-NG) o para el backend
+simulado.
+"""
+
+import asyncio
+import io
+import json
+import os
+import random
+import ssl
+import subprocess
+import time
+import wave
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from xml.sax.saxutils import escape, unescape
+
+import aiohttp
+import certifi
+# EdgeTTSBackend reutiliza utilidades internas (no públicas) de edge_tts para
+# armar el protocolo del websocket. Están verificadas con edge-tts==7.2.3, la
+# versión fijada en requirements.txt: revisar estos imports antes de actualizarla.
+from edge_tts.communicate import (
+    connect_id,
+    date_to_string,
+    get_headers_and_data,
+    mkssml,
+    remove_incompatible_characters,
+    split_text_by_byte_length,
+    ssml_headers_plus_data,
+)
+from edge_tts.constants import SEC_MS_GEC_VERSION, WSS_HEADERS, WSS_URL
+from edge_tts.data_classes import TTSConfig
+from edge_tts.drm import DRM
+
+from mp3_utils import mp3_duration_bytes, silent_mp3_bytes
+
+
+class TTSError(Exception):
+    """La síntesis de un texto falló"""
+
+
+class TTSThrottled(TTSError):
+    """El servicio rechazó la petición por exceso de carga"""
+
+
+def rate_to_speed(rate):
+    """Convierte una velocidad de Edge TTS ('+25%') en un factor (1.25)"""
+    return 1 + int(rate.strip().rstrip('%')) / 100
+
+
+def estimate_word_timings(text, duration):
+    """
+    Reparte ``duration`` entre las palabras de ``text`` según su largo.
+
+    Para motores que no informan marcas de palabra; alcanza para cortar
+    subtítulos en lugares razonables.
+    """
+    words = []
+    tokens = text.split()
+    total = sum(len(token) + 1 for token in tokens) or 1
+    current = 0.0
+    for token in tokens:
+        length = (len(token) + 1) / total * duration
+        words.append((current, current + length * 0.9, token))
+        current += length
+    return words
+
+
+class AdaptiveRateLimiter:
+    """
+    Token bucket cuya tasa se adapta al throttling observado (AIMD).
+
+    Cada pedido consume un token; los tokens se reponen a ``rate`` por
+    segundo hasta un máximo de ``burst`` (nunca más que la tasa actual, así
+    tras un recorte no sale una ráfaga grande). Cada éxito suma
+    ``increase`` pedidos/s hasta ``max_rate`` y cada rechazo por carga
+    multiplica la tasa por ``decrease`` hasta ``min_rate``. Los rechazos que
+    llegan juntos (``cooldown`` segundos) cuentan como uno solo, para que una
+    ráfaga de errores de pedidos concurrentes no hunda la tasa al mínimo.
+    """
+
+    def __init__(self, rate=10.0, burst=None, min_rate=0.5, max_rate=50.0,
+                 increase=0.2, decrease=0.5, cooldown=1.0):
+        self.rate = float(rate)
+        self.burst = float(burst or max(1.0, rate))
+        self.min_rate = min_rate
+        self.max_rate = max(max_rate, self.rate)
+        self.increase = increase
+        self.decrease = decrease
+        self.cooldown = cooldown
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.last_decrease = float('-inf')
+        self.throttled = 0
+
+    @property
+    def capacity(self):
+        return max(1.0, min(self.burst, self.rate))
+
+    def refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        """Espera hasta que haya un token disponible y lo consume"""
+        while True:
+            self.refill()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def on_success(self):
+        self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def on_throttle(self):
+        """Registra un rechazo por carga; devuelve True si se redujo la tasa"""
+        self.throttled += 1
+        now = time.monotonic()
+        if now - self.last_decrease < self.cooldown:
+            return False
+        self.last_decrease = now
+        self.rate = max(self.min_rate, self.rate * self.decrease)
+        self.tokens = min(self.tokens, 0.0)
+        return True
+
+
+class TTSBackend:
+    """
+    Interfaz común de los backends de TTS.
+
+    Las subclases implementan ``synthesize`` y, si mantienen conexiones,
+    ``close``. Un backend puede cerrarse y volver a usarse en otro event
+    loop: los recursos se crean de nuevo en el primer uso.
+    """
+
+    name = 'base'
+    voice_style = 'argentina'  # Estilo de map_speaker_to_voice para VOZ1/VOZ2
+    max_concurrency = None  # Síntesis simultáneas sugeridas (None: la de --concurrencia)
+    rate_limiter = None  # AdaptiveRateLimiter opcional (servicios remotos)
+
+    @property
+    def cache_namespace(self):
+        """
+        Parte de la clave de la caché TTS que distingue el audio de este
+        backend; None si su audio no debe cachearse
+        """
+        return self.name
+
+    async def synthesize(self, text, voice, rate):
+        """Devuelve (bytes MP3, palabras) o lanza TTSError"""
+        raise NotImplementedError
+
+    async def close(self):
+        """Libera las conexiones abiertas"""
+
+    def report(self):
+        """Muestra estadísticas de uso (si el backend las lleva)"""
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+
+class EdgeTTSBackend(TTSBackend):
+    """
+    Edge TTS reutilizando sesión y conexiones.
+
+    ``edge_tts.Communicate`` abre una sesión HTTP, un contexto SSL y un
+    websocket nuevos por cada bloque. Este backend habla el mismo protocolo
+    (con las utilidades de edge_tts) sobre una única sesión y deja los
+    websockets abiertos en un pool para el siguiente bloque, ahorrando el
+    handshake TCP + TLS + websocket. Si el servicio cerró una conexión
+    ociosa se abre otra y se repite el pedido; si eso pasa
+    ``MAX_REUSE_FAILURES`` veces seguidas se deja de reutilizar y se usa una
+    conexión por bloque, pero siempre sobre la misma sesión.
+    """
+
+    name = 'edge'
+    MAX_REUSE_FAILURES = 3
+
+    def __init__(self, max_connections=4, connect_timeout=10, receive_timeout=60, reuse_connections=True,
+                 rate_limiter=None):
+        self.max_connections = max(1, int(max_connections))
+        self.rate_limiter = rate_limiter or AdaptiveRateLimiter()
+        self.timeout = aiohttp.ClientTimeout(total=None, sock_connect=connect_timeout, sock_read=receive_timeout)
+        self.reuse_connections = reuse_connections
+        self.session = None
+        self.ssl_context = None
+        self.idle = []  # Websockets libres para el próximo pedido (hasta max_connections)
+        self.reuse_failures = 0
+        self.opened = 0
+        self.reused = 0
+
+    async def get_session(self):
+        if self.session is None or self.session.closed:
+            self.ssl_context = ssl.create_default_context(cafile=certifi.where())
+            self.session = aiohttp.ClientSession(
+                # Sin límite en el conector: los websockets abiertos ocupan lugares del pool
+                # de aiohttp y la concurrencia ya la limita el semáforo del modelo
+                connector=aiohttp.TCPConnector(limit=0, ttl_dns_cache=300),
+                trust_env=True,
+                timeout=self.timeout
+            )
+        return self.session
+
+    async def connect(self):
+        """Abre un websocket nuevo; ante un 403 corrige el desfase de reloj y reintenta una vez"""
+        session = await self.get_session()
+        for attempt in range(2):
+            try:
+                websocket = await session.ws_connect(
+                    f"{WSS_URL}&ConnectionId={connect_id()}"
+                    f"&Sec-MS-GEC={DRM.generate_sec_ms_gec()}"
+                    f"&Sec-MS-GEC-Version={SEC_MS_GEC_VERSION}",
+                    compress=15,
+                    headers=WSS_HEADERS,
+                    ssl=self.ssl_context
+                )
+                self.opened += 1
+                return websocket
+            except aiohttp.ClientResponseError as e:
+                if e.status == 429:
+                    raise TTSThrottled(f"Edge TTS respondió 429: {e.message}") from e
+                if e.status != 403 or attempt:
+                    raise
+                DRM.handle_client_response_error(e)
+
+    async def synthesize(self, text, voice, rate):
+        websocket = None
+        while self.idle and websocket is None:
+            websocket = self.idle.pop()
+            if websocket.closed:
+                websocket = None
+
+        try:
+            config = TTSConfig(voice, rate, '+0%', '+0Hz', 'WordBoundary')
+            texts = list(split_text_by_byte_length(escape(remove_incompatible_characters(text)), 4096))
+            if websocket is not None:
+                try:
+                    result = await self.run_turns(websocket, config, texts)
+                    self.reused += 1
+                    self.reuse_failures = 0
+                    return await self.release(websocket, result)
+                except (aiohttp.ClientError, ConnectionError, asyncio.TimeoutError):
+                    # La conexión ociosa ya no sirve: se repite con una nueva
+                    await websocket.close()
+                    self.reuse_failures += 1
+                    if self.reuse_failures >= self.MAX_REUSE_FAILURES and self.reuse_connections:
+                        print("⚠️ Edge TTS cierra las conexiones ociosas, se usará una por bloque")
+                        self.reuse_connections = False
+
+            websocket = await self.connect()
+            return await self.release(websocket, await self.run_turns(websocket, config, texts))
+        except (TTSError, asyncio.CancelledError):
+            if websocket is not None:
+                await websocket.close()
+            raise
+        except Exception as e:
+            if websocket is not None:
+                await websocket.close()
+            raise TTSError(f"{type(e).__name__}: {e}") from e
+
+    async def release(self, websocket, result):
+        """Devuelve el websocket al pool (o lo cierra) y pasa el resultado"""
+        if self.reuse_connections and not websocket.closed and len(self.idle) < self.max_connections:
+            self.idle.append(websocket)
+        else:
+            await websocket.close()
+        return result
+
+    async def run_turns(self, websocket, config, texts):
+        """Envía cada fragmento de SSML por ``websocket`` y junta audio y marcas de palabra"""
+        audio = bytearray()
+        words = []
+        offset_compensation = 0
+        last_offset = 0
+
+        for partial_text in texts:
+            await websocket.send_str(
+                f"X-Timestamp:{date_to_string()}\r\n"
+                "Content-Type:application/json; charset=utf-8\r\n"
+                "Path:speech.config\r\n\r\n"
+                '{"context":{"synthesis":{"audio":{"metadataoptions":{'
+                '"sentenceBoundaryEnabled":"false","wordBoundaryEnabled":"true"},'
+                '"outputFormat":"audio-24khz-48kbitrate-mono-mp3"}}}}\r\n'
+            )
+            await websocket.send_str(ssml_headers_plus_data(connect_id(), date_to_string(),
+                                                            mkssml(config, partial_text)))
+
+            while True:
+                message = await websocket.receive()
+                if message.type == aiohttp.WSMsgType.TEXT:
+                    encoded = message.data.encode('utf-8')
+                    headers, data = get_headers_and_data(encoded, encoded.find(b"\r\n\r\n"))
+                    path = headers.get(b"Path")
+                    if path == b"audio.metadata":
+                        for start, duration, word in self.parse_metadata(data):
+                            start += offset_compensation
+                            words.append((start / 10_000_000, (start + duration) / 10_000_000, word))
+                            last_offset = start + duration
+                    elif path == b"turn.end":
+                        # Mismo relleno medio que agrega edge_tts entre fragmentos
+                        offset_compensation = last_offset + 8_750_000
+                        break
+                elif message.type == aiohttp.WSMsgType.BINARY:
+                    if len(message.data) < 2:
+                        raise TTSError("Mensaje binario sin cabecera")
+                    header_length = int.from_bytes(message.data[:2], 'big')
+                    headers, data = get_headers_and_data(message.data, header_length)
+                    if headers.get(b"Path") == b"audio" and headers.get(b"Content-Type") == b"audio/mpeg":
+                        audio.extend(data)
+                elif message.type == aiohttp.WSMsgType.ERROR:
+                    raise ConnectionError(f"Error en el websocket: {message.data}")
+                else:
+                    raise ConnectionError("El servicio cerró la conexión")
+
+        if not audio:
+            raise TTSError("Edge TTS no devolvió audio")
+        return bytes(audio), words
+
+    @staticmethod
+    def parse_metadata(data):
+        """Genera (offset, duración, palabra) en unidades de 100 ns de un mensaje audio.metadata"""
+        for item in json.loads(data)["Metadata"]:
+            if item["Type"] == "WordBoundary":
+                yield item["Data"]["Offset"], item["Data"]["Duration"], unescape(item["Data"]["text"]["Text"])
+
+    async def close(self):
+        while self.idle:
+            await self.idle.pop().close()
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    def report(self):
+        if self.opened:
+            print(f"🔌 Edge TTS: {self.opened} conexiones abiertas, {self.reused} pedidos con conexión reutilizada, "
+                  f"{self.rate_limiter.throttled} rechazos por carga (tasa final {self.rate_limiter.rate:.1f} pedidos/s)")
+
+
+class MockTTSBackend(TTSBackend):
+    """
+    Backend simulado para medir rendimiento y concurrencia sin red.
+
+    Devuelve silencio MP3 con los parámetros de Edge TTS y una duración
+    proporcional al texto (``chars_per_second`` a velocidad normal), con
+    marcas de palabra repartidas según su largo. Se puede configurar:
+
+    - ``latency`` y ``jitter``: segundos de espera por pedido
+    - ``failure_rate``: probabilidad de que un pedido falle (TTSError)
+    - ``max_concurrent``: pedidos simultáneos aceptados; el resto se
+      rechaza con TTSThrottled, como un servicio saturado
+    - ``requests_per_second``: límite de pedidos por segundo (ventana de
+      un segundo); los excedentes también se rechazan con TTSThrottled
+
+    ``rate_limiter`` es el limitador del lado del cliente, para probar cómo
+    se adapta a esos rechazos.
+    """
+
+    name = 'mock'
+    cache_namespace = None  # El silencio simulado nunca se cachea
+
+    def __init__(self, latency=0.3, jitter=0.1, failure_rate=0.0, max_concurrent=None,
+                 requests_per_second=None, chars_per_second=14.0, seed=None, rate_limiter=None):
+        self.latency = latency
+        self.rate_limiter = rate_limiter
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.max_concurrent = max_concurrent
+        self.requests_per_second = requests_per_second
+        self.chars_per_second = chars_per_second
+        self.random = random.Random(seed)
+        self.recent = []  # Momentos de los pedidos del último segundo
+        self.active = 0
+        self.stats = {'pedidos': 0, 'fallos': 0, 'rechazos': 0, 'pico': 0}
+
+    async def synthesize(self, text, voice, rate):
+        self.stats['pedidos'] += 1
+        now = time.monotonic()
+        self.recent = [t for t in self.recent if now - t < 1.0]
+        if self.requests_per_second and len(self.recent) >= self.requests_per_second:
+            self.stats['rechazos'] += 1
+            raise TTSThrottled(f"Más de {self.requests_per_second} pedidos por segundo")
+        if self.max_concurrent and self.active >= self.max_concurrent:
+            self.stats['rechazos'] += 1
+            raise TTSThrottled(f"Más de {self.max_concurrent} pedidos simultáneos")
+        self.recent.append(now)
+
+        self.active += 1
+        self.stats['pico'] = max(self.stats['pico'], self.active)
+        try:
+            await asyncio.sleep(max(0.0, self.latency + self.random.uniform(-self.jitter, self.jitter)))
+            if self.random.random() < self.failure_rate:
+                self.stats['fallos'] += 1
+                raise TTSError("Fallo simulado")
+        finally:
+            self.active -= 1
+
+        duration = max(0.5, len(text) / (self.chars_per_second * rate_to_speed(rate)))
+        return silent_mp3_bytes(duration), estimate_word_timings(text, duration)
+
+    def report(self):
+        stats = self.stats
+        if not stats['pedidos']:
+            return
+        print(f"🧪 TTS simulado: {stats['pedidos']} pedidos, {stats['fallos']} fallos, "
+              f"{stats['rechazos']} rechazados, pico de {stats['pico']} simultáneos"
+              + (f", tasa final {self.rate_limiter.rate:.1f} pedidos/s" if self.rate_limiter else ''))
+
+
+# Modelos de Piper ya cargados en cada proceso del pool (uno por voz)
+_PIPER_VOICES = {}
+
+
+def _piper_wav(text, voice, speed, models_dir):
+    """WAV de Piper; el modelo ONNX se carga una sola vez por proceso"""
+    from piper import PiperVoice
+
+    model = _PIPER_VOICES.get(voice)
+    if model is None:
+        model = PiperVoice.load(os.path.join(models_dir, f'{voice}.onnx'))
+        _PIPER_VOICES[voice] = model
+
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wav_file:
+        if hasattr(model, 'synthesize_wav'):  # piper-tts >= 1.3
+            from piper import SynthesisConfig
+            model.synthesize_wav(text, wav_file, syn_config=SynthesisConfig(length_scale=1 / speed))
+        else:
+            model.synthesize(text, wav_file, length_scale=1 / speed)
+    return buffer.getvalue()
+
+
+def _synthesize_local(engine, text, voice, rate, models_dir):
+    """
+    Se ejecuta en un proceso del pool: sintetiza con el motor local y
+    codifica a MP3 con los mismos parámetros que Edge TTS (24 kHz, mono,
+    48 kbps), así el audio se une y se cachea igual que el de Edge.
+    """
+    speed = rate_to_speed(rate)
+    if engine == 'piper':
+        wav = _piper_wav(text, voice, speed, models_dir)
+    else:
+        wav = subprocess.run(
+            ['espeak-ng', '-v', voice, '-s', str(round(175 * speed)), '--stdout', text],
+            capture_output=True, check=True
+        ).stdout
+
+    return subprocess.run([
+        'ffmpeg', '-hide_banner', '-loglevel', 'error', '-f', 'wav', '-i', 'pipe:0',
+        '-ar', '24000', '-ac', '1', '-c:a', 'libmp3lame', '-b:a', '48k',
+        '-map_metadata', '-1', '-id3v2_version', '0', '-write_xing', '0', '-f', 'mp3', 'pipe:1'
+    ], input=wav, capture_output=True, check=True).stdout
+
+
+class LocalTTSBackend(TTSBackend):
+    """
+    Síntesis sin conexión con Piper o eSpeak-NG en un pool de procesos.
+
+    La inferencia de Piper es CPU pura, así que cada bloque se sintetiza en
+    un proceso distinto (por defecto uno por núcleo) y los modelos quedan
+    cargados en cada proceso entre bloques. Las voces salen del estilo
+    ``piper`` o ``espeak`` de ``map_speaker_to_voice``; los modelos de Piper
+    (``<voz>.onnx`` y su ``.onnx.json``) se buscan en ``models_dir``. Como
+    ninguno de los dos motores informa marcas de palabra, se estiman a partir
+    de la duración real del audio.
+    """
+
+    name = 'local'
+    ENGINES = ('piper', 'espeak')
+
+    def __init__(self, engine='piper', models_dir=None, workers=None):
+        if engine not in self.ENGINES:
+            raise ValueError(f"Motor local desconocido: {engine} (opciones: {', '.join(self.ENGINES)})")
+        self.engine = engine
+        self.voice_style = engine
+        self.models_dir = models_dir or os.path.join(os.path.expanduser('~'), '.local', 'share', 'piper')
+        self.workers = max(1, int(workers or os.cpu_count() or 1))
+        self.max_concurrency = self.workers
+        self.pool = None
+
+    @property
+    def cache_namespace(self):
+        # Las voces ya nombran el modelo; el directorio distingue copias distintas del mismo
+        if self.engine == 'piper':
+            return f'local:piper:{os.path.abspath(self.models_dir)}'
+        return f'local:{self.engine}'
+
+    async def synthesize(self, text, voice, rate):
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(max_workers=self.workers)
+        pool = self.pool
+        loop = asyncio.get_running_loop()
+        try:
+            data = await loop.run_in_executor(pool, _synthesize_local,
+                                              self.engine, text, voice, rate, self.models_dir)
+            duration = mp3_duration_bytes(data)
+        except ImportError as e:
+            raise TTSError("Piper no está instalado (pip install piper-tts)") from e
+        except FileNotFoundError as e:
+            raise TTSError(f"No se encontró {e.filename} (¿falta instalar {self.engine} o el modelo de la voz?)") from e
+        except subprocess.CalledProcessError as e:
+            raise TTSError(f"{e.cmd[0]} falló: {e.stderr.decode('utf-8', 'replace').strip()[-300:]}") from e
+        except ValueError as e:
+            raise TTSError(f"Audio inválido de {self.engine}: {e}") from e
+        except BrokenProcessPool as e:
+            # Se recrea en el próximo pedido; los demás pedidos del mismo pool roto no tocan el nuevo
+            if self.pool is pool:
+                self.pool = None
+            pool.shutdown(wait=False, cancel_futures=True)  # Libera su hilo de gestión y procesos restantes
+            raise TTSError(f"Un proceso de {self.engine} terminó de forma inesperada") from e
+        return data, estimate_word_timings(text, duration)
+
+    async def close(self):
+        if self.pool is not None:
+            pool, self.pool = self.pool, None
+            # shutdown espera a los procesos hijos: hacerlo fuera del event loop
+            await asyncio.get_running_loop().run_in_executor(
+                None, lambda: pool.shutdown(cancel_futures=True))
@@ -1,101 +1,188 @@
 #!/usr/bin/env python3
 """
 Script para limpiar y arreglar el guión de slides.
-Elimina duplicados y llena gaps de tiempo.
+Elimina duplicados, resuelve solapamientos y llena gaps de tiempo.
+
+El motor (TimelineEngine) trabaja con tiempos enteros en milisegundos y
+también se usa en proceso desde generate_video.py (--normalize-timeline).
 """
 
 import json
 import sys
 from typing import List, Dict, Any
 
+# Gap mínimo (ms) a partir del cual se inserta una slide de relleno
+FILL_GAP_MS = 2000
+
+
+def parse_time_ms(value: Any) -> int:
+    """
+    Convierte MM:SS, HH:MM:SS (con .mmm opcional) o segundos numéricos a milisegundos.
+
+    Raises:
+        ValueError: Si el formato no es válido
+    """
+    if isinstance(value, (int, float)):
+        return int(round(value * 1000))
+
+    text = str(value).strip()
+    parts = text.split(':')
+    try:
+        if len(parts) == 1:
+            return int(round(float(text) * 1000))
+        if len(parts) == 2:
+            hours, minutes, seconds = 0, int(parts[0]), parts[1]
+        elif len(parts) == 3:
+            hours, minutes, seconds = int(parts[0]), int(parts[1]), parts[2]
+        else:
+            raise ValueError
+        whole, _, fraction = seconds.partition('.')
+        millis = int((fraction + '000')[:3]) if fraction else 0
+        return ((hours * 60 + minutes) * 60 + int(whole)) * 1000 + millis
+    except ValueError:
+        raise ValueError(f"Formato de tiempo inválido: {value}")
+
+
+def format_time_ms(ms: int) -> str:
+    """Convierte milisegundos a MM:SS o HH:MM:SS, con .mmm solo si hace falta."""
+    hours, rest = divmod(ms, 3600000)
+    minutes, rest = divmod(rest, 60000)
+    secs, millis = divmod(rest, 1000)
+    text = f"{hours:02d}:{minutes:02d}:{secs:02d}" if hours else f"{minutes:02d}:{secs:02d}"
+    return f"{text}.{millis:03d}" if millis else text
+
+
 def time_to_seconds(time_str: str) -> float:
     """Convierte tiempo MM:SS a segundos."""
     try:
-        if ':' in time_str:
-            parts = time_str.split(':')
-            if len(parts) == 2:
-                minutes, seconds = parts
-                return int(minutes) * 60 + int(seconds)
-            elif len(parts) == 3:
-                hours, minutes, seconds = parts
-                return int(hours) * 3600 + int(minutes) * 60 + int(seconds)
-        return float(time_str)
-    except:
+        return parse_time_ms(time_str) / 1000
+    except ValueError:
         return 0.0
 
+
 def seconds_to_time(seconds: float) -> str:
     """Convierte segundos a formato MM:SS."""
-    minutes = int(seconds // 60)
-    secs = int(seconds % 60)
-    return f"{minutes:02d}:{secs:02d}"
+    return format_time_ms(int(round(seconds * 1000)))
 
-def clean_script(script_text: str) -> List[Dict[str, Any]]:
-    """Limpia el script eliminando duplicados y organizando por tiempo."""
-    
-    # Parsear todas las secciones del script
-    all_slides = []
-    
-    # Dividir por secciones (arrays JSON separados)
-    sections = script_text.strip().split('\n]\n\n[')
-    
-    for i, section in enumerate(sections):
-        # Limpiar y formar JSON válido
-        if not section.startswith('['):
-            section = '[' + section
-        if not section.endswith(']'):
-            section = section + ']'
-        
+
+def split_sections(script_text: str) -> List[Any]:
+    """
+    Extrae todos los arrays/objetos JSON consecutivos del texto.
+
+    Usa ``JSONDecoder.raw_decode`` desde cada '[' o '{' en lugar de partir por
+    un separador literal, así tolera espacios, texto intermedio o arrays pegados.
+    """
+    decoder = json.JSONDecoder()
+    sections = []
+    pos = 0
+    length = len(script_text)
+
+    while pos < length:
+        candidates = [i for i in (script_text.find('[', pos), script_text.find('{', pos)) if i != -1]
+        if not candidates:
+            break
+        start = min(candidates)
         try:
-            slides = json.loads(section)
-            all_slides.extend(slides)
-        except json.JSONDecodeError as e:
-            print(f"Error parseando sección {i+1}: {e}")
+            value, end = decoder.raw_decode(script_text, start)
+        except json.JSONDecodeError:
+            pos = start + 1
             continue
-    
-    # Eliminar duplicados basado en tiempo de inicio
-    seen_times = set()
-    unique_slides = []
-    
-    for slide in all_slides:
-        inicio_sec = time_to_seconds(slide['inicio'])
-        if inicio_sec not in seen_times:
-            seen_times.add(inicio_sec)
-            unique_slides.append(slide)
-        else:
-            print(f"Eliminando duplicado en {slide['inicio']}: {slide['titulo']}")
-    
-    # Ordenar por tiempo de inicio
-    unique_slides.sort(key=lambda x: time_to_seconds(x['inicio']))
-    
-    # Verificar y llenar gaps
-    print("\n🔍 Analizando timeline:")
-    for i, slide in enumerate(unique_slides):
-        inicio_sec = time_to_seconds(slide['inicio'])
-        fin_sec = time_to_seconds(slide['fin'])
-        print(f"  {slide['inicio']}-{slide['fin']}: {slide['titulo']}")
-        
-        # Verificar gap con la siguiente slide
-        if i < len(unique_slides) - 1:
-            next_inicio_sec = time_to_seconds(unique_slides[i+1]['inicio'])
-            if fin_sec < next_inicio_sec:
-                gap_duration = next_inicio_sec - fin_sec
-                print(f"  ⚠️  GAP: {seconds_to_time(fin_sec)}-{seconds_to_time(next_inicio_sec)} ({gap_duration:.0f}s)")
-                
-                # Crear slide de relleno para gaps grandes (>2 segundos)
-                if gap_duration > 2:
+        sections.append(value)
+        pos = end
+
+    return sections
+
+
+class TimelineEngine:
+    """
+    Normaliza el timeline de slides en una sola pasada O(n log n).
+
+    - Duplicados: misma marca de inicio (al milisegundo), se conserva la primera.
+    - Solapamientos: la slide anterior se recorta al inicio de la siguiente.
+    - Gaps: se reportan y, si superan ``fill_gap_ms``, se rellenan con una
+      slide de transición.
+    """
+
+    def __init__(self, fill_gap_ms: int = FILL_GAP_MS, verbose: bool = True):
+        self.fill_gap_ms = fill_gap_ms
+        self.verbose = verbose
+        self.events: List[Dict[str, Any]] = []
+
+    def _log(self, kind: str, message: str, **info: Any) -> None:
+        self.events.append({"type": kind, **info})
+        if self.verbose:
+            print(message)
+
+    def normalize(self, slides: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Devuelve una nueva lista de slides ordenada, sin duplicados ni solapes."""
+        intervals = []
+        for order, slide in enumerate(slides):
+            try:
+                start, end = parse_time_ms(slide['inicio']), parse_time_ms(slide['fin'])
+            except (KeyError, ValueError) as e:
+                self._log('invalid', f"  ⚠️  Slide {order + 1} descartada: {e}", index=order)
+                continue
+            intervals.append((start, order, end, slide))
+
+        # Ordenar por inicio y, ante empates, por orden de aparición
+        intervals.sort(key=lambda item: (item[0], item[1]))
+
+        kept: List[List[Any]] = []
+        for start, order, end, slide in intervals:
+            if kept and kept[-1][0] == start:
+                self._log('duplicate', f"Eliminando duplicado en {slide['inicio']}: {slide.get('titulo', '')}",
+                          start_ms=start)
+                continue
+            kept.append([start, end, slide])
+
+        result: List[Dict[str, Any]] = []
+        for i, (start, end, slide) in enumerate(kept):
+            next_start = kept[i + 1][0] if i + 1 < len(kept) else None
+
+            if next_start is not None and end > next_start:
+                self._log('overlap', f"  ✂️  Solape: {format_time_ms(start)}-{format_time_ms(end)} "
+                                     f"recortada a {format_time_ms(next_start)}",
+                          start_ms=start, end_ms=end, clipped_ms=next_start)
+                end = next_start
+
+            if end <= start:
+                self._log('invalid', f"  ⚠️  Slide en {format_time_ms(start)} sin duración, descartada",
+                          start_ms=start)
+                continue
+
+            result.append(dict(slide, inicio=format_time_ms(start), fin=format_time_ms(end)))
+
+            if next_start is not None and end < next_start:
+                gap = next_start - end
+                self._log('gap', f"  ⚠️  GAP: {format_time_ms(end)}-{format_time_ms(next_start)} ({gap / 1000:.1f}s)",
+                          start_ms=end, end_ms=next_start)
+                if gap > self.fill_gap_ms:
                     fill_slide = {
-                        "inicio": seconds_to_time(fin_sec),
-                        "fin": seconds_to_time(next_inicio_sec),
+                        "inicio": format_time_ms(end),
+                        "fin": format_time_ms(next_start),
                         "titulo": "Transición",
                         "puntos": ["Continuamos...", "Próximo tema"]
                     }
-                    unique_slides.append(fill_slide)
-                    print(f"  ✅ Agregada slide de relleno: {fill_slide['inicio']}-{fill_slide['fin']}")
-    
-    # Re-ordenar después de agregar rellenos
-    unique_slides.sort(key=lambda x: time_to_seconds(x['inicio']))
-    
-    return unique_slides
+                    result.append(fill_slide)
+                    self._log('fill', f"  ✅ Agregada slide de relleno: {fill_slide['inicio']}-{fill_slide['fin']}",
+                              start_ms=end, end_ms=next_start)
+
+        return result
+
+
+def clean_script(script_text: str) -> List[Dict[str, Any]]:
+    """Limpia el script eliminando duplicados y organizando por tiempo."""
+
+    # Parsear todas las secciones del script
+    all_slides = []
+    for section in split_sections(script_text):
+        if isinstance(section, list):
+            all_slides.extend(item for item in section if isinstance(item, dict))
+        elif isinstance(section, dict):
+            all_slides.append(section)
+
+    print("\n🔍 Analizando timeline:")
+    return TimelineEngine().normalize(all_slides)
 
 def main():
     if len(sys.argv) != 2:
@@ -3,7 +3,8 @@
 Script para generar videos MP4 sincronizados con diapositivas desde texto/JSON y audio.
 
 Uso:
-    python generate_video.py input_txt_path audio_path output_video_path
+    python generate_video.py input_txt_path audio_path output_video_path [--variants blue,green]
+    python generate_video.py --resume job_dir
 
 Args:
     input_txt_path: Ruta completa al archivo TXT/MD con JSON o texto con bloques [HH:MM - HH:MM]
@@ -12,37 +13,120 @@ Args:
 """
 
 import argparse
+import ast
 import json
+import math
 import os
+import random
 import re
 import subprocess
 import sys
 import hashlib
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import List, Dict, Any, Tuple, Optional
+from typing import List, Dict, Any, Iterator, Tuple, Optional
 
 # Dependencias externas
 try:
     from PIL import Image, ImageDraw, ImageFont
     import jsonschema
+    import numpy as np
 except ImportError as e:
     print(f"Error: Falta instalar dependencias. Ejecuta: pip install -r requirements.txt")
     print(f"Error específico: {e}")
     sys.exit(1)
 
+from fix_script import TimelineEngine, format_time_ms, parse_time_ms
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin coordinación entre procesos
+    fcntl = None
+
 
 class VideoGeneratorError(Exception):
     """Excepción personalizada para errores del generador de video."""
     pass
 
 
+class Slide:
+    """
+    Slide ya parseada e inmutable.
+
+    Se construye una sola vez tras la extracción: los tiempos quedan en
+    milisegundos enteros y el hash del contenido (título, puntos, notas) se
+    precalcula, así ninguna etapa posterior vuelve a parsear ``inicio``/``fin``.
+    El hash no incluye los tiempos: mover un límite no obliga a re-renderizar.
+    """
+
+    __slots__ = ('index', 'start_ms', 'end_ms', 'titulo', 'puntos', 'notas', 'content_hash')
+
+    def __init__(self, index: int, start_ms: int, end_ms: int, titulo: str,
+                 puntos: Tuple[str, ...] = (), notas: Optional[str] = None,
+                 content_hash: Optional[str] = None):
+        if content_hash is None:
+            payload = json.dumps([titulo, list(puntos), notas], ensure_ascii=False)
+            content_hash = hashlib.sha256(payload.encode('utf-8')).hexdigest()
+        for name, value in (('index', index), ('start_ms', start_ms), ('end_ms', end_ms),
+                            ('titulo', titulo), ('puntos', tuple(puntos)), ('notas', notas),
+                            ('content_hash', content_hash)):
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError("Slide es inmutable; usa with_times()")
+
+    @classmethod
+    def from_dict(cls, index: int, data: Dict[str, Any]) -> 'Slide':
+        """Crea la slide desde el dict validado por el schema."""
+        return cls(index, parse_time_ms(data['inicio']), parse_time_ms(data['fin']),
+                   data.get('titulo') or f'Slide {index}', data.get('puntos', []), data.get('notas'))
+
+    def with_times(self, start_ms: int, end_ms: int) -> 'Slide':
+        """Copia con otros tiempos, conservando el hash de contenido."""
+        return Slide(self.index, start_ms, end_ms, self.titulo, self.puntos, self.notas, self.content_hash)
+
+    @property
+    def start(self) -> float:
+        return self.start_ms / 1000
+
+    @property
+    def end(self) -> float:
+        return self.end_ms / 1000
+
+    @property
+    def duration_ms(self) -> int:
+        return self.end_ms - self.start_ms
+
+    @property
+    def inicio(self) -> str:
+        return format_time_ms(self.start_ms)
+
+    @property
+    def fin(self) -> str:
+        return format_time_ms(self.end_ms)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Representación del schema de slides (para slides.json)."""
+        data = {"inicio": self.inicio, "fin": self.fin, "titulo": self.titulo, "puntos": list(self.puntos)}
+        if self.notas is not None:
+            data["notas"] = self.notas
+        return data
+
+    def __repr__(self) -> str:
+        return f"Slide({self.index}, {self.inicio}-{self.fin}, {self.titulo!r})"
+
+
 class StyleManager:
     """Maneja los diferentes estilos de diapositivas y su selección aleatoria."""
     
-    def __init__(self):
-        # Solo estilos universales que funcionan con cualquier cantidad de conceptos
-        self.available_styles = [
+    def __init__(self, available_styles: Optional[List[str]] = None):
+        # Por defecto solo estilos universales que funcionan con cualquier cantidad de conceptos
+        self.available_styles = list(available_styles or [
             'minimal_clean',
             'minimal_clean_green',
             'minimal_clean_orange', 
@@ -52,7 +136,7 @@ class StyleManager:
             'banner_style_green',
             'banner_style_orange',
             'banner_style_purple'
-        ]
+        ])
         
         self.last_style = None
         # Contadores para distribución uniforme
@@ -146,23 +230,671 @@ class StyleManager:
         return random.choice(list(self.color_palettes.values()))
 
 
+class StyleExpression:
+    """
+    Expresión de una plantilla de estilo, validada y compilada una sola vez.
+
+    Solo admite aritmética, comparaciones, condicionales, índices y llamadas a
+    funciones con nombre (las del entorno de dibujo); nada de atributos ni builtins.
+    """
+
+    ALLOWED_NODES = (ast.Expression, ast.BinOp, ast.UnaryOp, ast.BoolOp, ast.Compare, ast.IfExp,
+                     ast.Call, ast.Name, ast.Load, ast.Constant, ast.Subscript, ast.Slice,
+                     ast.Tuple, ast.List, ast.operator, ast.unaryop, ast.boolop, ast.cmpop)
+    # Funciones puras: una expresión que solo usa estas y nombres estáticos se evalúa al compilar
+    PURE_FUNCTIONS = {'min': min, 'max': max, 'len': len, 'int': int, 'abs': abs, 'round': round,
+                      'str': str, 'range': range, 'cos': math.cos, 'sin': math.sin}
+    CONSTANTS = {'pi': math.pi}
+
+    def __init__(self, source: str, where: str):
+        self.source = source
+        try:
+            tree = ast.parse(source, mode='eval')
+        except SyntaxError as e:
+            raise VideoGeneratorError(f"Expresión inválida en {where}: {source} ({e.msg})")
+        for node in ast.walk(tree):
+            if not isinstance(node, self.ALLOWED_NODES) or (
+                    isinstance(node, ast.Call) and not isinstance(node.func, ast.Name)):
+                raise VideoGeneratorError(f"Expresión no permitida en {where}: {source}")
+        self.names = {node.id for node in ast.walk(tree) if isinstance(node, ast.Name)}
+        self.code = compile(tree, f"<estilo {where}>", 'eval')
+
+    def is_static(self, static_names) -> bool:
+        return all(name in static_names or name in self.PURE_FUNCTIONS or name in self.CONSTANTS
+                   for name in self.names)
+
+    def __call__(self, env: Dict[str, Any]) -> Any:
+        # El entorno se usa como globals; debe traer '__builtins__' vacío
+        return eval(self.code, env)
+
+
+class CompiledStyle:
+    """
+    Estilo compilado: paleta propia (opcional) y lista de operaciones de dibujo.
+
+    Cada operación es una tupla ``(tipo, condición, ...)`` con sus expresiones
+    ya compiladas (o plegadas a constantes); renderizar una slide solo recorre
+    esta lista.
+    """
+
+    def __init__(self, name: str, palette: Optional[Dict[str, Tuple[int, ...]]],
+                 seed: Optional[int], slide_vars: List[Tuple[str, Any]], ops: List[tuple],
+                 static_env: Dict[str, Any]):
+        self.name = name
+        self.palette = palette
+        self.seed = seed
+        self.slide_vars = slide_vars
+        self.ops = ops
+        self.static_env = static_env
+
+    @staticmethod
+    def _value(expr: Any, env: Dict[str, Any]) -> Any:
+        return expr(env) if isinstance(expr, StyleExpression) else expr
+
+    def draw(self, renderer: 'SlideRenderer', draw, title: str, concepts: List[str],
+             palette: Dict[str, Any]) -> None:
+        """Ejecuta las operaciones compiladas sobre ``draw`` (la paleta propia del estilo tiene prioridad)."""
+        palette = self.palette or palette
+
+        def bb(text: str, size: int) -> Tuple[int, int, int, int]:
+            return renderer._text_bbox(draw, text, renderer._get_font(size))
+
+        env = dict(self.static_env)
+        env.update(title=title, concepts=concepts, N=len(concepts), bb=bb,
+                   tw=lambda text, size: bb(text, size)[2] - bb(text, size)[0],
+                   th=lambda text, size: bb(text, size)[3] - bb(text, size)[1])
+        if self.seed is not None:
+            env['randint'] = random.Random(self.seed).randint
+
+        self._set_vars(self.slide_vars, env)
+        self._run(self.ops, renderer, draw, env, palette)
+
+    def _set_vars(self, variables: List[Tuple[str, Any]], env: Dict[str, Any]) -> None:
+        for name, expr in variables:
+            env[name] = self._value(expr, env)
+
+    def _run(self, ops: List[tuple], renderer: 'SlideRenderer', draw, env: Dict[str, Any],
+             palette: Dict[str, Any]) -> None:
+        value = self._value
+        for op in ops:
+            kind, when = op[0], op[1]
+            if when is not None and not value(when, env):
+                continue
+
+            if kind == 'shape':
+                _, _, method, coords, pairs, fill, outline, width = op
+                xy = [value(c, env) for c in coords]
+                if pairs:
+                    xy = list(zip(xy[0::2], xy[1::2]))
+                kwargs = {}
+                if fill:
+                    kwargs['fill'] = palette[fill]
+                if outline:
+                    kwargs['outline'] = palette[outline]
+                if width is not None:
+                    kwargs['width'] = width
+                getattr(draw, method)(xy, **kwargs)
+
+            elif kind == 'text':
+                _, _, text, size, x, y, fill = op
+                renderer._draw_text(draw, (value(x, env), value(y, env)), value(text, env),
+                                    fill=palette[fill], font=renderer._get_font(size))
+
+            elif kind == 'concepts':
+                _, _, items, start, variables, body = op
+                items = value(items, env)
+                env['n'] = len(items)
+                for i, concept in renderer._iter_concepts(draw, items, start):
+                    env['i'], env['concept'] = i, concept
+                    self._set_vars(variables, env)
+                    self._run(body, renderer, draw, env, palette)
+
+            elif kind == 'each':
+                _, _, var, iterable, variables, body = op
+                for item in value(iterable, env):
+                    env[var] = item
+                    self._set_vars(variables, env)
+                    self._run(body, renderer, draw, env, palette)
+
+            elif kind == 'wrap':
+                _, _, text, size, max_width, variables, body = op
+                lines = renderer._wrap_words(draw, value(text, env), renderer._get_font(size),
+                                             value(max_width, env))
+                env['L'] = len(lines)
+                for k, line in enumerate(lines):
+                    env['k'], env['line'] = k, line
+                    self._set_vars(variables, env)
+                    self._run(body, renderer, draw, env, palette)
+
+            elif kind == 'group':
+                _, _, variables, body = op
+                self._set_vars(variables, env)
+                self._run(body, renderer, draw, env, palette)
+
+            elif kind == 'layer':
+                renderer._select_layer(draw, op[2])
+
+
+class StyleRegistry:
+    """
+    Registro declarativo de estilos de slide.
+
+    Los estilos se declaran como plantillas JSON (``styles.json`` y archivos
+    adicionales): variables de geometría, slots de paleta (``primary``,
+    ``accent``…) y operaciones de dibujo sobre regiones de título y conceptos.
+    Cada plantilla se compila una vez al tamaño del lienzo: las expresiones que
+    solo dependen del lienzo se pliegan a constantes y los ``scatter`` con
+    semilla se expanden a formas fijas.
+    """
+
+    SHAPES = {'rect': 'rectangle', 'ellipse': 'ellipse', 'line': 'line', 'polygon': 'polygon'}
+    DEFAULT_TEMPLATES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'styles.json')
+
+    def __init__(self, width: int, height: int, template_paths: Optional[List[str]] = None):
+        self.width = width
+        self.height = height
+        self.templates: Dict[str, Dict[str, Any]] = {}
+        for path in [self.DEFAULT_TEMPLATES] + list(template_paths or []):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.templates.update(json.load(f))
+            except (OSError, json.JSONDecodeError) as e:
+                raise VideoGeneratorError(f"No se pudieron cargar plantillas de estilo de {path}: {e}")
+
+        self.styles = {name: self._compile(name) for name in self.templates}
+
+    @property
+    def names(self) -> List[str]:
+        return list(self.styles)
+
+    @property
+    def universal(self) -> List[str]:
+        """Estilos que funcionan con cualquier cantidad de conceptos (rotación por defecto)."""
+        return [name for name in self.styles if self._template(name).get('universal')]
+
+    def get(self, name: str) -> CompiledStyle:
+        return self.styles[name]
+
+    def _template(self, name: str, seen: Tuple[str, ...] = ()) -> Dict[str, Any]:
+        """Plantilla con su cadena de ``extends`` resuelta."""
+        if name not in self.templates:
+            raise VideoGeneratorError(f"Estilo desconocido en plantillas: {name}")
+        if name in seen:
+            raise VideoGeneratorError(f"Herencia circular de estilos: {' -> '.join(seen + (name,))}")
+        template = self.templates[name]
+        if 'extends' not in template:
+            return template
+        merged = dict(self._template(template['extends'], seen + (name,)))
+        merged.update({key: value for key, value in template.items() if key != 'extends'})
+        return merged
+
+    def _compile(self, name: str) -> CompiledStyle:
+        template = self._template(name)
+        static_env = {'__builtins__': {}, 'W': self.width, 'H': self.height,
+                      **StyleExpression.PURE_FUNCTIONS, **StyleExpression.CONSTANTS}
+
+        palette = template.get('palette')
+        if palette is not None:
+            palette = {slot: tuple(color) for slot, color in palette.items()}
+
+        slide_vars = self._compile_vars(template.get('vars', {}), static_env, name)
+        ops = self._compile_ops(template.get('ops', []), static_env, name)
+        return CompiledStyle(name, palette, template.get('seed'), slide_vars, ops, static_env)
+
+    def _expr(self, value: Any, static_env: Dict[str, Any], where: str) -> Any:
+        """Compila una expresión; si solo depende de valores estáticos la pliega a constante."""
+        if not isinstance(value, str):
+            return value
+        expr = StyleExpression(value, where)
+        return expr(static_env) if expr.is_static(static_env) else expr
+
+    def _compile_vars(self, variables: Dict[str, Any], static_env: Dict[str, Any],
+                      where: str) -> List[Tuple[str, Any]]:
+        """Variables en orden; las estáticas pasan al entorno de compilación."""
+        compiled = []
+        for var_name, source in variables.items():
+            value = self._expr(source, static_env, f"{where}.{var_name}")
+            if isinstance(value, StyleExpression):
+                compiled.append((var_name, value))
+            else:
+                static_env[var_name] = value
+        return compiled
+
+    def _compile_ops(self, ops: List[Dict[str, Any]], static_env: Dict[str, Any], where: str) -> List[tuple]:
+        compiled = []
+        for index, spec in enumerate(ops):
+            kind = spec.get('op')
+            op_where = f"{where}[{index}:{kind}]"
+            when = self._expr(spec['when'], static_env, op_where) if 'when' in spec else None
+            if when is not None and not isinstance(when, StyleExpression):
+                if not when:
+                    continue
+                when = None
+
+            if kind in self.SHAPES:
+                pairs = kind in ('line', 'polygon')
+                coords = spec['points'] if pairs else spec['box']
+                compiled.append(('shape', when, self.SHAPES[kind],
+                                 [self._expr(c, static_env, op_where) for c in coords], pairs,
+                                 spec.get('fill'), spec.get('outline'), spec.get('width')))
+
+            elif kind == 'text':
+                compiled.append(('text', when, self._expr(spec['text'], static_env, op_where), spec['size'],
+                                 self._expr(spec['x'], static_env, op_where),
+                                 self._expr(spec['y'], static_env, op_where), spec.get('fill', 'text')))
+
+            elif kind == 'scatter':
+                # Decoración con semilla: se expande al compilar a formas con coordenadas fijas
+                rng = random.Random(spec.get('seed', 0))
+                for _ in range(spec['count']):
+                    local_env = dict(static_env, randint=rng.randint)
+                    for var_name, source in spec.get('vars', {}).items():
+                        local_env[var_name] = self._expr(source, local_env, f"{op_where}.{var_name}")
+                    local_env.pop('randint')
+                    compiled.extend(self._compile_ops(spec['ops'], local_env, op_where))
+
+            elif kind == 'concepts':
+                compiled.append(('concepts', when, self._expr(spec.get('items', 'concepts'), static_env, op_where),
+                                 spec.get('start', 0),
+                                 *self._compile_block(spec, static_env, op_where, ('i', 'concept', 'n'))))
+
+            elif kind == 'each':
+                compiled.append(('each', when, spec['var'], self._expr(spec['in'], static_env, op_where),
+                                 *self._compile_block(spec, static_env, op_where, (spec['var'],))))
+
+            elif kind == 'wrap':
+                compiled.append(('wrap', when, self._expr(spec['text'], static_env, op_where), spec['size'],
+                                 self._expr(spec['max_width'], static_env, op_where),
+                                 *self._compile_block(spec, static_env, op_where, ('k', 'line', 'L'))))
+
+            elif kind == 'group':
+                compiled.append(('group', when, *self._compile_block(spec, static_env, op_where)))
+
+            elif kind == 'layer':
+                compiled.append(('layer', when, spec.get('index')))
+
+            else:
+                raise VideoGeneratorError(f"Operación de estilo desconocida en {op_where}")
+        return compiled
+
+    def _compile_block(self, spec: Dict[str, Any], static_env: Dict[str, Any], where: str,
+                       bound: Tuple[str, ...] = ()) -> Tuple[List[Tuple[str, Any]], List[tuple]]:
+        """
+        Variables y operaciones de un bloque anidado. Sus variables y las que
+        liga el bloque (``bound``) cambian en cada iteración, así que nunca se pliegan.
+        """
+        variables = [(name, StyleExpression(source, f"{where}.{name}") if isinstance(source, str) else source)
+                     for name, source in spec.get('vars', {}).items()]
+        dynamic = set(bound) | {name for name, _ in variables}
+        local_env = {key: value for key, value in static_env.items() if key not in dynamic}
+        return variables, self._compile_ops(spec.get('ops', []), local_env, where)
+
+
+def font_key(font: ImageFont.ImageFont) -> Tuple[Any, ...]:
+    """
+    Clave estable de una fuente para las cachés de glifos y medidas.
+
+    ``id(font)`` no sirve: un id puede reutilizarse para otra fuente si la
+    primera se libera. Las FreeType se identifican por archivo, nombre y
+    tamaño (la fuente por defecto de Pillow se carga desde memoria).
+    """
+    if isinstance(font, ImageFont.FreeTypeFont):
+        path = font.path if isinstance(font.path, str) else '<default>'
+        return (path, font.getname(), font.size)
+    return ('<bitmap>', id(font))  # Vive en _font_cache mientras exista el generador
+
+
+class GlyphAtlas:
+    """
+    Backend de texto basado en un atlas de glifos.
+
+    Cada (fuente, tamaño, glifo) se rasteriza una sola vez con Pillow; los
+    strings se componen después desde los bitmaps cacheados con NumPy y se
+    pintan con una única operación de máscara. El avance y el kerning por
+    pares se obtienen de ``font.getlength`` para que el layout coincida con
+    ``ImageDraw.text`` (tolerancia de ±1 px por redondeo de la pluma).
+    """
+
+    def __init__(self):
+        # (font_key, glifo) -> (máscara uint8 o None, offset_x, offset_y)
+        self._glyphs: Dict[Tuple[Any, str], Tuple[Optional[np.ndarray], int, int]] = {}
+        # (font_key, glifo) -> avance en píxeles (float)
+        self._advances: Dict[Tuple[Any, str], float] = {}
+        # (font_key, glifo_izq, glifo_der) -> ajuste de kerning en píxeles
+        self._kerning: Dict[Tuple[Any, str, str], float] = {}
+        self._lock = threading.Lock()
+
+    def _glyph(self, font: ImageFont.FreeTypeFont, char: str) -> Tuple[Optional[np.ndarray], int, int]:
+        """Obtiene (rasterizando si hace falta) el bitmap de un glifo."""
+        key = (font_key(font), char)
+        glyph = self._glyphs.get(key)
+        if glyph is None:
+            left, top, right, bottom = font.getbbox(char)
+            if right <= left or bottom <= top:
+                glyph = (None, left, top)  # Espacios y glifos sin tinta
+            else:
+                canvas = Image.new('L', (right - left, bottom - top), 0)
+                ImageDraw.Draw(canvas).text((-left, -top), char, fill=255, font=font)
+                glyph = (np.asarray(canvas), left, top)
+            with self._lock:
+                self._glyphs[key] = glyph
+        return glyph
+
+    def _advance(self, font: ImageFont.FreeTypeFont, char: str) -> float:
+        key = (font_key(font), char)
+        advance = self._advances.get(key)
+        if advance is None:
+            advance = font.getlength(char)
+            with self._lock:
+                self._advances[key] = advance
+        return advance
+
+    def _kern(self, font: ImageFont.FreeTypeFont, left: str, right: str) -> float:
+        key = (font_key(font), left, right)
+        kern = self._kerning.get(key)
+        if kern is None:
+            kern = font.getlength(left + right) - self._advance(font, left) - self._advance(font, right)
+            with self._lock:
+                self._kerning[key] = kern
+        return kern
+
+    def layout(self, text: str, font: ImageFont.FreeTypeFont, origin_x: float = 0.0) -> List[Tuple[np.ndarray, int, int]]:
+        """Calcula la posición entera de cada glifo con tinta del string."""
+        placed = []
+        pen = origin_x
+        previous = None
+
+        for char in text:
+            if previous is not None:
+                pen += self._kern(font, previous, char)
+            mask, offset_x, offset_y = self._glyph(font, char)
+            if mask is not None:
+                placed.append((mask, int(round(pen)) + offset_x, offset_y))
+            pen += self._advance(font, char)
+            previous = char
+
+        return placed
+
+    def render_mask(self, text: str, font: ImageFont.FreeTypeFont,
+                    origin_x: float = 0.0) -> Optional[Tuple[np.ndarray, int, int]]:
+        """Compone la máscara alfa del string; devuelve (máscara, x, y) relativos al origen."""
+        placed = self.layout(text, font, origin_x)
+        if not placed:
+            return None
+
+        min_x = min(x for _, x, _ in placed)
+        min_y = min(y for _, _, y in placed)
+        max_x = max(x + mask.shape[1] for mask, x, _ in placed)
+        max_y = max(y + mask.shape[0] for mask, _, y in placed)
+
+        canvas = np.zeros((max_y - min_y, max_x - min_x), dtype=np.uint8)
+        for mask, x, y in placed:
+            h, w = mask.shape
+            region = canvas[y - min_y:y - min_y + h, x - min_x:x - min_x + w]
+            # Los glifos que se solapan se combinan por máximo, como hace FreeType en Pillow
+            np.maximum(region, mask, out=region)
+
+        return canvas, min_x, min_y
+
+    def draw_text(self, draw, xy: Tuple[float, float], text: str, fill, font: ImageFont.FreeTypeFont) -> None:
+        """Equivalente a ``draw.text(xy, text, fill=fill, font=font)`` usando el atlas."""
+        x, y = xy
+        base_x, base_y = int(x), int(y)
+        rendered = self.render_mask(text, font, origin_x=x - base_x)
+        if rendered is None:
+            return
+        mask, offset_x, offset_y = rendered
+        draw.bitmap((base_x + offset_x, base_y + offset_y), Image.fromarray(mask, 'L'), fill=fill)
+
+
+class LayeredDraw:
+    """
+    Proxy de ImageDraw que separa en capas lo que dibuja cada concepto.
+
+    Las operaciones del fondo y del título se aplican directamente sobre la
+    imagen base; las de cada concepto se graban y, al terminar, se reproducen
+    sobre una copia de la base y sobre una máscara para producir una capa RGBA
+    transparente por bullet (pixel-idéntica a la slide completa).
+    """
+
+    def __init__(self, image: Image.Image):
+        self.image = image
+        self.base = ImageDraw.Draw(image)
+        self.layer_ops: Dict[int, List[Tuple[str, tuple, dict]]] = {}
+        self.active: Optional[int] = None
+
+    def select(self, index: Optional[int]) -> None:
+        """Activa la capa del concepto ``index`` (None vuelve a la base)."""
+        self.active = index
+        if index is not None:
+            self.layer_ops.setdefault(index, [])
+
+    def _op(self, name: str, args: tuple, kwargs: dict) -> None:
+        if self.active is None:
+            getattr(self.base, name)(*args, **kwargs)
+        else:
+            self.layer_ops[self.active].append((name, args, kwargs))
+
+    def text(self, *args, **kwargs) -> None:
+        self._op('text', args, kwargs)
+
+    def bitmap(self, *args, **kwargs) -> None:
+        self._op('bitmap', args, kwargs)
+
+    def ellipse(self, *args, **kwargs) -> None:
+        self._op('ellipse', args, kwargs)
+
+    def rectangle(self, *args, **kwargs) -> None:
+        self._op('rectangle', args, kwargs)
+
+    def line(self, *args, **kwargs) -> None:
+        self._op('line', args, kwargs)
+
+    def polygon(self, *args, **kwargs) -> None:
+        self._op('polygon', args, kwargs)
+
+    def textbbox(self, *args, **kwargs):
+        return self.base.textbbox(*args, **kwargs)
+
+    def compose_layers(self) -> List[Image.Image]:
+        """Reproduce las operaciones de cada concepto y devuelve sus capas RGBA en orden."""
+        layers = []
+
+        for index in sorted(self.layer_ops):
+            ops = self.layer_ops[index]
+            if not ops:
+                continue
+
+            painted = self.image.copy()
+            painted_draw = ImageDraw.Draw(painted)
+            mask = Image.new('L', self.image.size, 0)
+            mask_draw = ImageDraw.Draw(mask)
+
+            for name, args, kwargs in ops:
+                getattr(painted_draw, name)(*args, **kwargs)
+                mask_kwargs = {key: (255 if key in ('fill', 'outline') and value is not None else value)
+                               for key, value in kwargs.items()}
+                getattr(mask_draw, name)(*args, **mask_kwargs)
+
+            # Alfa binaria: los bordes antialias ya están mezclados con la base en 'painted'
+            layer = painted.convert('RGBA')
+            layer.putalpha(mask.point(lambda v: 255 if v else 0))
+            layers.append(layer)
+
+        return layers
+
+
+class StoryboardBuilder:
+    """
+    Poster y storyboard de miniaturas a partir de los frames ya renderizados.
+
+    Cada slide se reduce a una miniatura al renderizarse; al final se arman
+    las hojas de sprites con NumPy y un índice WebVTT (``#xywh=``) para el
+    scrubbing del reproductor, sin volver a decodificar el MP4 de salida.
+    """
+
+    def __init__(self, thumb_width: int = 160, thumb_height: int = 90,
+                 columns: int = 10, rows: int = 10, poster_slide: int = 1):
+        self.thumb_width = thumb_width
+        self.thumb_height = thumb_height
+        self.columns = columns
+        self.rows = rows
+        self.poster_slide = poster_slide
+        self.thumbs: Dict[int, np.ndarray] = {}
+        self.poster: Optional[Image.Image] = None
+
+    def add_frame(self, slide_num: int, image: Image.Image) -> None:
+        """Registra el frame completo de una slide."""
+        if slide_num == self.poster_slide:
+            self.poster = image.convert('RGB')
+        thumb = image.convert('RGB').resize((self.thumb_width, self.thumb_height), Image.BILINEAR)
+        self.thumbs[slide_num] = np.asarray(thumb)
+
+    def add_frame_from_files(self, slide_num: int, paths: List[str]) -> None:
+        """Registra una slide ya renderizada en disco (base + capas de revelado, si las hay)."""
+        frame = Image.open(paths[0]).convert('RGBA')
+        for layer_path in paths[1:]:
+            frame = Image.alpha_composite(frame, Image.open(layer_path).convert('RGBA'))
+        self.add_frame(slide_num, frame)
+
+    @staticmethod
+    def _vtt_time(seconds: float) -> str:
+        total_ms = int(round(seconds * 1000))
+        hours, rest = divmod(total_ms, 3600000)
+        minutes, rest = divmod(rest, 60000)
+        secs, millis = divmod(rest, 1000)
+        return f"{hours:02d}:{minutes:02d}:{secs:02d}.{millis:03d}"
+
+    def write(self, slides: List[Slide], output_video_path: str) -> Dict[str, Any]:
+        """
+        Escribe ``<video>_poster.jpg``, las hojas ``<video>_storyboard[_NNN].jpg``
+        y ``<video>_storyboard.vtt`` junto al video de salida.
+        """
+        base = os.path.splitext(output_video_path)[0]
+        out_dir = os.path.dirname(output_video_path)
+        written: Dict[str, Any] = {"poster": None, "sheets": [], "vtt": f"{base}_storyboard.vtt"}
+
+        if self.poster is not None:
+            written["poster"] = f"{base}_poster.jpg"
+            self.poster.save(written["poster"], 'JPEG', quality=90)
+
+        per_sheet = self.columns * self.rows
+        indices = sorted(self.thumbs)
+        sheet_count = (len(indices) + per_sheet - 1) // per_sheet
+        cues = []
+
+        for sheet_num in range(sheet_count):
+            chunk = indices[sheet_num * per_sheet:(sheet_num + 1) * per_sheet]
+            rows_used = (len(chunk) + self.columns - 1) // self.columns
+            cols_used = min(len(chunk), self.columns)
+            sheet = np.zeros((rows_used * self.thumb_height, cols_used * self.thumb_width, 3), dtype=np.uint8)
+
+            sheet_path = f"{base}_storyboard.jpg" if sheet_count == 1 else f"{base}_storyboard_{sheet_num + 1:03d}.jpg"
+            for pos, slide_num in enumerate(chunk):
+                x = (pos % self.columns) * self.thumb_width
+                y = (pos // self.columns) * self.thumb_height
+                sheet[y:y + self.thumb_height, x:x + self.thumb_width] = self.thumbs[slide_num]
+                cues.append((slide_num, os.path.relpath(sheet_path, out_dir), x, y))
+
+            Image.fromarray(sheet).save(sheet_path, 'JPEG', quality=80)
+            written["sheets"].append(sheet_path)
+
+        with open(written["vtt"], 'w', encoding='utf-8') as f:
+            f.write("WEBVTT\n\n")
+            for slide_num, sheet_name, x, y in cues:
+                slide = slides[slide_num - 1]
+                f.write(f"{self._vtt_time(slide.start)} --> {self._vtt_time(slide.end)}\n")
+                f.write(f"{sheet_name}#xywh={x},{y},{self.thumb_width},{self.thumb_height}\n\n")
+
+        print(f"Poster y storyboard generados: {len(cues)} miniaturas en {len(written['sheets'])} hoja(s)")
+        return written
+
+
 class SlideRenderer:
     """Clase para renderizar slides como imágenes PNG."""
     
-    def __init__(self, width: int = 1280, height: int = 720):
+    TEXT_BACKENDS = ('pillow', 'atlas')
+
+    def __init__(self, width: int = 1280, height: int = 720, text_backend: str = 'pillow',
+                 style_templates: Optional[List[str]] = None, styles: Optional[List[str]] = None):
         self.width = width
         self.height = height
+
+        # Backend de texto: 'pillow' (ImageDraw.text) o 'atlas' (GlyphAtlas)
+        if text_backend not in self.TEXT_BACKENDS:
+            raise VideoGeneratorError(f"Backend de texto desconocido: {text_backend}")
+        self.glyph_atlas = GlyphAtlas() if text_backend == 'atlas' else None
         
-        # Inicializar StyleManager
-        self.style_manager = StyleManager()
+        # Estilos declarados en plantillas JSON, compilados una vez al tamaño del lienzo
+        self.style_registry = StyleRegistry(width, height, style_templates)
+        unknown = [style for style in styles or [] if style not in self.style_registry.styles]
+        if unknown:
+            raise VideoGeneratorError(
+                f"Estilos desconocidos: {', '.join(unknown)}. Disponibles: {', '.join(self.style_registry.names)}")
+        
+        # Inicializar StyleManager (rotación: estilos pedidos o los universales)
+        self.style_manager = StyleManager(styles or self.style_registry.universal)
         
         # Colores base (se actualizarán por slide)
         self.bg_color = (25, 25, 35)
         self.title_color = (255, 255, 255)
         self.bullet_color = (220, 220, 225)
         self.accent_color = (100, 149, 237)
-        
+
+        # Cachés de fuentes y medidas de texto (compartidas entre slides y variantes)
+        self._font_cache: Dict[int, ImageFont.ImageFont] = {}
+        self._font_lock = threading.Lock()
+        self._bbox_cache: Dict[Tuple[Any, str], Tuple[int, int, int, int]] = {}
+
     def _get_font(self, size: int) -> ImageFont.ImageFont:
+        """Obtiene fuente cacheada por tamaño."""
+        font = self._font_cache.get(size)
+        if font is None:
+            # Los hilos de render comparten la caché: una sola fuente por tamaño
+            with self._font_lock:
+                font = self._font_cache.get(size)
+                if font is None:
+                    font = self._load_font(size)
+                    self._font_cache[size] = font
+        return font
+
+    def _text_bbox(self, draw, text: str, font: ImageFont.ImageFont) -> Tuple[int, int, int, int]:
+        """
+        Mide el texto una sola vez por (fuente, texto).
+
+        El layout de texto no depende de la paleta, así que las variantes
+        de un mismo guion reutilizan las medidas ya calculadas.
+        """
+        key = (font_key(font), text)
+        bbox = self._bbox_cache.get(key)
+        if bbox is None:
+            bbox = draw.textbbox((0, 0), text, font=font)
+            self._bbox_cache[key] = bbox
+        return bbox
+
+    def _draw_text(self, draw, xy: Tuple[float, float], text: str, fill, font: ImageFont.ImageFont) -> None:
+        """Dibuja texto con el backend configurado."""
+        if self.glyph_atlas is not None and isinstance(font, ImageFont.FreeTypeFont):
+            self.glyph_atlas.draw_text(draw, xy, text, fill, font)
+        else:
+            draw.text(xy, text, fill=fill, font=font)
+
+    def _iter_concepts(self, draw, concepts: List[str], start: int = 0):
+        """
+        Itera los conceptos como ``enumerate``; si se renderiza por capas,
+        activa la capa de cada concepto mientras se dibuja.
+        """
+        for i, concept in enumerate(concepts):
+            self._select_layer(draw, start + i)
+            yield i, concept
+        self._select_layer(draw, None)
+
+    def _select_layer(self, draw, index: Optional[int]) -> None:
+        """Activa una capa de concepto cuando ``draw`` es un LayeredDraw."""
+        if isinstance(draw, LayeredDraw):
+            draw.select(index)
+
+    def _load_font(self, size: int) -> ImageFont.ImageFont:
         """Obtiene fuente con fallback a fuente por defecto."""
         try:
             # Intentar fuentes comunes en Linux
@@ -179,894 +911,133 @@ class SlideRenderer:
         # Fallback a fuente por defecto
         return ImageFont.load_default()
     
-    # ====== MÉTODOS DE ESTILOS DE DIAPOSITIVAS ======
-    
-    def _render_minimal_clean(self, draw, title: str, concepts: List[str], palette: dict):
-        """Estilo 1: Minimal Clean - Texto centrado con elementos decorativos de fondo."""
-        # Elementos decorativos de fondo (formas geométricas sutiles)
-        import random
-        random.seed(42)  # Para consistencia
-        
-        # Círculos decorativos de fondo
-        for i in range(6):
-            x = random.randint(100, self.width - 100)
-            y = random.randint(100, self.height - 100)
-            radius = random.randint(30, 80)
-            # Usar color secondary con baja opacidad visual (círculo grande + pequeño)
-            draw.ellipse([x-radius, y-radius, x+radius, y+radius], 
-                        outline=palette['secondary'], width=2)
-        
-        # Rectángulos decorativos en las esquinas
-        draw.rectangle([50, 50, 200, 120], outline=palette['accent'], width=3)
-        draw.rectangle([self.width-200, self.height-120, self.width-50, self.height-50], 
-                      outline=palette['accent'], width=3)
-        
-        # Título centrado
-        title_font = self._get_font(52)
-        title_bbox = draw.textbbox((0, 0), title, font=title_font)
-        title_width = title_bbox[2] - title_bbox[0]
-        title_x = (self.width - title_width) // 2
-        title_y = 120
-        
-        draw.text((title_x, title_y), title, fill=palette['text'], font=title_font)
-        
-        # Línea decorativa bajo el título
-        line_y = title_y + 80
-        line_margin = 300
-        draw.line([(line_margin, line_y), (self.width - line_margin, line_y)], 
-                 fill=palette['primary'], width=4)
-        
-        # Conceptos centrados verticalmente (acepta cualquier cantidad)
-        concept_font = self._get_font(36)
-        concept_spacing = 60
-        start_y = line_y + 100
-        
-        # Ajustar espaciado si hay muchos conceptos
-        if len(concepts) > 4:
-            concept_spacing = min(60, (self.height - start_y - 100) // len(concepts))
-        
-        for i, concept in enumerate(concepts):
-            concept_bbox = draw.textbbox((0, 0), concept, font=concept_font)
-            concept_width = concept_bbox[2] - concept_bbox[0]
-            concept_x = (self.width - concept_width) // 2
-            concept_y = start_y + (i * concept_spacing)
-            
-            # Bullet point minimalista
-            bullet_x = concept_x - 30
-            draw.ellipse([bullet_x, concept_y + 12, bullet_x + 8, concept_y + 20], 
-                        fill=palette['accent'])
-            
-            draw.text((concept_x, concept_y), concept, fill=palette['text'], font=concept_font)
-    
-    def _render_minimal_clean_green(self, draw, title: str, concepts: List[str], palette: dict):
-        """Variación Verde de Minimal Clean - Modo oscuro con tonos verdes."""
-        green_palette = {
-            'bg': (15, 25, 15),
-            'primary': (46, 125, 50),
-            'secondary': (76, 175, 80),
-            'text': (255, 255, 255),
-            'accent': (129, 199, 132)
-        }
-        
-        # Reutilizar la lógica del minimal_clean original con nueva paleta
-        self._render_minimal_clean_base(draw, title, concepts, green_palette)
-    
-    def _render_minimal_clean_orange(self, draw, title: str, concepts: List[str], palette: dict):
-        """Variación Naranja de Minimal Clean - Modo oscuro con tonos naranjas."""
-        orange_palette = {
-            'bg': (25, 15, 10),
-            'primary': (255, 152, 0),
-            'secondary': (255, 183, 77),
-            'text': (255, 255, 255),
-            'accent': (255, 204, 128)
-        }
-        
-        # Reutilizar la lógica del minimal_clean original con nueva paleta
-        self._render_minimal_clean_base(draw, title, concepts, orange_palette)
-    
-    def _render_minimal_clean_purple(self, draw, title: str, concepts: List[str], palette: dict):
-        """Variación Púrpura de Minimal Clean - Modo oscuro con tonos púrpuras."""
-        purple_palette = {
-            'bg': (20, 15, 25),
-            'primary': (156, 39, 176),
-            'secondary': (186, 104, 200),
-            'text': (255, 255, 255),
-            'accent': (206, 147, 216)
-        }
-        
-        # Reutilizar la lógica del minimal_clean original con nueva paleta
-        self._render_minimal_clean_base(draw, title, concepts, purple_palette)
-    
-    def _render_minimal_clean_base(self, draw, title: str, concepts: List[str], palette: dict):
-        """Método base para todas las variaciones de minimal_clean."""
-        # Elementos decorativos de fondo (formas geométricas sutiles)
-        import random
-        random.seed(42)  # Para consistencia
-        
-        # Círculos decorativos de fondo
-        for i in range(6):
-            x = random.randint(100, self.width - 100)
-            y = random.randint(100, self.height - 100)
-            radius = random.randint(30, 80)
-            # Usar color secondary con baja opacidad visual (círculo grande + pequeño)
-            draw.ellipse([x-radius, y-radius, x+radius, y+radius], 
-                        outline=palette['secondary'], width=2)
-        
-        # Rectángulos decorativos en las esquinas
-        draw.rectangle([50, 50, 200, 120], outline=palette['accent'], width=3)
-        draw.rectangle([self.width-200, self.height-120, self.width-50, self.height-50], 
-                      outline=palette['accent'], width=3)
-        
-        # Título centrado
-        title_font = self._get_font(52)
-        title_bbox = draw.textbbox((0, 0), title, font=title_font)
-        title_width = title_bbox[2] - title_bbox[0]
-        title_x = (self.width - title_width) // 2
-        title_y = 120
-        
-        draw.text((title_x, title_y), title, fill=palette['text'], font=title_font)
-        
-        # Línea decorativa bajo el título
-        line_y = title_y + 80
-        line_margin = 300
-        draw.line([(line_margin, line_y), (self.width - line_margin, line_y)], 
-                 fill=palette['primary'], width=4)
-        
-        # Conceptos centrados verticalmente (acepta cualquier cantidad)
-        concept_font = self._get_font(36)
-        concept_spacing = 60
-        start_y = line_y + 100
-        
-        # Ajustar espaciado si hay muchos conceptos
-        if len(concepts) > 4:
-            concept_spacing = min(60, (self.height - start_y - 100) // len(concepts))
-        
-        for i, concept in enumerate(concepts):
-            concept_bbox = draw.textbbox((0, 0), concept, font=concept_font)
-            concept_width = concept_bbox[2] - concept_bbox[0]
-            concept_x = (self.width - concept_width) // 2
-            concept_y = start_y + (i * concept_spacing)
-            
-            # Bullet point minimalista
-            bullet_x = concept_x - 30
-            draw.ellipse([bullet_x, concept_y + 12, bullet_x + 8, concept_y + 20], 
-                        fill=palette['accent'])
-            
-            draw.text((concept_x, concept_y), concept, fill=palette['text'], font=concept_font)
-    
-    def _render_geometric_boxes(self, draw, title: str, concepts: List[str], palette: dict):
-        """Estilo 2: Geometric Boxes - Lista flexible con rectángulos decorativos de fondo."""
-        # Rectángulos decorativos de fondo
-        import random
-        random.seed(123)  # Para consistencia diferente al minimal
-        
-        # Rectángulos decorativos en posiciones aleatorias
-        for i in range(8):
-            x = random.randint(50, self.width - 200)
-            y = random.randint(50, self.height - 100)
-            w = random.randint(100, 180)
-            h = random.randint(40, 80)
-            # Solo bordes para no interferir con el texto
-            draw.rectangle([x, y, x + w, y + h], outline=palette['secondary'], width=2)
-        
-        # Triángulos decorativos en las esquinas
-        # Triángulo superior izquierdo
-        triangle_points = [(100, 100), (160, 50), (160, 100)]
-        draw.polygon(triangle_points, fill=palette['accent'])
-        
-        # Triángulo inferior derecho
-        triangle_points = [(self.width-160, self.height-100), (self.width-100, self.height-100), (self.width-100, self.height-50)]
-        draw.polygon(triangle_points, fill=palette['accent'])
-        
-        # Título en la parte superior
-        title_font = self._get_font(48)
-        title_bbox = draw.textbbox((0, 0), title, font=title_font)
-        title_width = title_bbox[2] - title_bbox[0]
-        title_x = (self.width - title_width) // 2
-        title_y = 80
-        
-        draw.text((title_x, title_y), title, fill=palette['text'], font=title_font)
-        
-        # Lista de conceptos flexible (no limitada por rectángulos)
-        concept_font = self._get_font(32)
-        start_y = title_y + 120
-        concept_spacing = 70
-        
-        # Ajustar espaciado si hay muchos conceptos
-        if len(concepts) > 6:
-            concept_spacing = min(70, (self.height - start_y - 100) // len(concepts))
-        
-        for i, concept in enumerate(concepts):
-            concept_y = start_y + (i * concept_spacing)
-            
-            # Bullet decorativo (rectángulo pequeño)
-            bullet_x = 300
-            draw.rectangle([bullet_x, concept_y + 8, bullet_x + 20, concept_y + 28], 
-                          fill=palette['primary'])
-            
-            # Texto del concepto
-            text_x = bullet_x + 40
-            draw.text((text_x, concept_y), concept, fill=palette['text'], font=concept_font)
-    
-    def _render_circle_network(self, draw, title: str, concepts: List[str], palette: dict):
-        """Estilo 3: Circle Network - Ideas en círculos conectados con líneas."""
-        import math
-        
-        # Título en la parte superior
-        title_font = self._get_font(48)
-        title_bbox = draw.textbbox((0, 0), title, font=title_font)
-        title_width = title_bbox[2] - title_bbox[0]
-        title_x = (self.width - title_width) // 2
-        title_y = 70
-        
-        draw.text((title_x, title_y), title, fill=palette['text'], font=title_font)
-        
-        # Círculos distribuidos en un patrón
-        concept_font = self._get_font(24)
-        circle_radius = 60
-        center_x = self.width // 2
-        center_y = self.height // 2 + 50
-        
-        # Posiciones para los círculos (patrón distribuido)
-        positions = [
-            (center_x, center_y - 120),  # Centro superior
-            (center_x - 200, center_y),  # Izquierda
-            (center_x + 200, center_y),  # Derecha
-            (center_x, center_y + 120),  # Centro inferior
-        ]
-        
-        # Dibujar líneas de conexión primero
-        for i in range(len(concepts[:4])):
-            for j in range(i + 1, len(concepts[:4])):
-                if i < len(positions) and j < len(positions):
-                    x1, y1 = positions[i]
-                    x2, y2 = positions[j]
-                    draw.line([(x1, y1), (x2, y2)], fill=palette['secondary'], width=2)
-        
-        # Dibujar círculos y texto
-        for i, concept in enumerate(concepts[:4]):
-            if i < len(positions):
-                cx, cy = positions[i]
-                
-                # Círculo
-                draw.ellipse([cx - circle_radius, cy - circle_radius, 
-                             cx + circle_radius, cy + circle_radius], 
-                            fill=palette['primary'], outline=palette['accent'], width=3)
-                
-                # Texto centrado en el círculo
-                text_bbox = draw.textbbox((0, 0), concept, font=concept_font)
-                text_width = text_bbox[2] - text_bbox[0]
-                text_height = text_bbox[3] - text_bbox[1]
-                
-                text_x = cx - text_width // 2
-                text_y = cy - text_height // 2
-                
-                draw.text((text_x, text_y), concept, fill=palette['text'], font=concept_font)
-    
-    def _render_split_screen(self, draw, title: str, concepts: List[str], palette: dict):
-        """Estilo 4: Split Screen - Título a un lado, conceptos en formas al otro."""
-        # Dividir pantalla verticalmente
-        split_x = self.width // 2
-        
-        # Título en la mitad izquierda
-        title_font = self._get_font(42)
-        title_lines = []
-        words = title.split()
+    def _wrap_words(self, draw, text: str, font: ImageFont.ImageFont, max_width: int) -> List[str]:
+        """Divide el texto en líneas cuyo ancho medido sea menor que ``max_width``."""
+        lines = []
         current_line = ""
-        
-        # Dividir título en líneas para que quepa en media pantalla
-        for word in words:
+        for word in text.split():
             test_line = current_line + " " + word if current_line else word
-            bbox = draw.textbbox((0, 0), test_line, font=title_font)
-            if bbox[2] - bbox[0] < split_x - 80:
+            bbox = self._text_bbox(draw, test_line, font=font)
+            if bbox[2] - bbox[0] < max_width:
                 current_line = test_line
             else:
                 if current_line:
-                    title_lines.append(current_line)
+                    lines.append(current_line)
                 current_line = word
         if current_line:
-            title_lines.append(current_line)
-        
-        # Renderizar título centrado en la mitad izquierda
-        title_start_y = (self.height - len(title_lines) * 60) // 2
-        for i, line in enumerate(title_lines):
-            bbox = draw.textbbox((0, 0), line, font=title_font)
-            line_width = bbox[2] - bbox[0]
-            title_x = (split_x - line_width) // 2
-            title_y = title_start_y + i * 60
-            draw.text((title_x, title_y), line, fill=palette['text'], font=title_font)
-        
-        # Línea divisoria
-        draw.line([(split_x, 50), (split_x, self.height - 50)], 
-                 fill=palette['primary'], width=4)
-        
-        # Conceptos en la mitad derecha como hexágonos
-        concept_font = self._get_font(26)
-        hex_size = 70
-        start_x = split_x + 150
-        start_y = 150
-        spacing = 140
-        
-        for i, concept in enumerate(concepts[:3]):
-            hex_x = start_x
-            hex_y = start_y + i * spacing
-            
-            # Dibujar hexágono (simulado con rectángulo con esquinas cortadas)
-            points = [
-                (hex_x - hex_size, hex_y),
-                (hex_x - hex_size//2, hex_y - hex_size//2),
-                (hex_x + hex_size//2, hex_y - hex_size//2),
-                (hex_x + hex_size, hex_y),
-                (hex_x + hex_size//2, hex_y + hex_size//2),
-                (hex_x - hex_size//2, hex_y + hex_size//2)
-            ]
-            draw.polygon(points, fill=palette['primary'], outline=palette['accent'])
-            
-            # Texto centrado en el hexágono
-            text_bbox = draw.textbbox((0, 0), concept, font=concept_font)
-            text_width = text_bbox[2] - text_bbox[0]
-            text_height = text_bbox[3] - text_bbox[1]
-            
-            text_x = hex_x - text_width // 2
-            text_y = hex_y - text_height // 2
-            
-            draw.text((text_x, text_y), concept, fill=palette['text'], font=concept_font)
+            lines.append(current_line)
+        return lines
     
-    def _render_timeline_flow(self, draw, title: str, concepts: List[str], palette: dict):
-        """Estilo 5: Timeline Flow - Conceptos en secuencia horizontal con conectores."""
-        # Título centrado arriba
-        title_font = self._get_font(48)
-        title_bbox = draw.textbbox((0, 0), title, font=title_font)
-        title_width = title_bbox[2] - title_bbox[0]
-        title_x = (self.width - title_width) // 2
-        title_y = 80
-        
-        draw.text((title_x, title_y), title, fill=palette['text'], font=title_font)
-        
-        # Timeline horizontal
-        timeline_y = self.height // 2
-        timeline_start = 100
-        timeline_end = self.width - 100
-        
-        # Línea base del timeline
-        draw.line([(timeline_start, timeline_y), (timeline_end, timeline_y)], 
-                 fill=palette['secondary'], width=6)
-        
-        # Distribuir conceptos a lo largo del timeline
-        concept_font = self._get_font(24)
-        num_concepts = min(len(concepts), 4)
-        if num_concepts > 1:
-            spacing = (timeline_end - timeline_start) / (num_concepts - 1)
+    def _base_style(self, style: str) -> str:
+        """Devuelve el estilo base de una variación de color (p. ej. banner_style_green -> banner_style)."""
+        for suffix in ('_green', '_orange', '_purple'):
+            if style.endswith(suffix):
+                return style[:-len(suffix)]
+        return style
+
+    def _resolve_style(self, style: Optional[str], palette: Optional[Dict[str, Any]]) -> Tuple[str, Dict[str, Any]]:
+        """
+        Completa estilo/paleta no planificados; una paleta forzada usa el estilo base.
+
+        Los estilos con paleta propia en su plantilla (variaciones de color) la usan
+        también para el fondo.
+        """
+        if style is None:
+            style = self.style_manager.get_next_style()
+        if style not in self.style_registry.styles:
+            # Fallback al estilo minimal si no está registrado
+            style = 'minimal_clean'
+        if palette is None:
+            palette = self.style_registry.get(style).palette or self.style_manager.get_random_palette()
         else:
-            spacing = 0
-            
-        for i, concept in enumerate(concepts[:4]):
-            if num_concepts == 1:
-                concept_x = (timeline_start + timeline_end) // 2
-            else:
-                concept_x = timeline_start + i * spacing
-            
-            # Círculo en el timeline
-            circle_radius = 25
-            draw.ellipse([concept_x - circle_radius, timeline_y - circle_radius,
-                         concept_x + circle_radius, timeline_y + circle_radius],
-                        fill=palette['primary'], outline=palette['accent'], width=3)
-            
-            # Número en el círculo
-            num_font = self._get_font(20)
-            num_text = str(i + 1)
-            num_bbox = draw.textbbox((0, 0), num_text, font=num_font)
-            num_width = num_bbox[2] - num_bbox[0]
-            num_height = num_bbox[3] - num_bbox[1]
-            
-            num_x = concept_x - num_width // 2
-            num_y = timeline_y - num_height // 2
-            
-            draw.text((num_x, num_y), num_text, fill=palette['text'], font=num_font)
-            
-            # Concepto debajo del círculo
-            text_bbox = draw.textbbox((0, 0), concept, font=concept_font)
-            text_width = text_bbox[2] - text_bbox[0]
-            
-            text_x = concept_x - text_width // 2
-            text_y = timeline_y + 50
-            
-            draw.text((text_x, text_y), concept, fill=palette['text'], font=concept_font)
-            
-            # Flecha hacia el siguiente (excepto el último)
-            if i < num_concepts - 1 and num_concepts > 1:
-                arrow_start = concept_x + circle_radius + 10
-                arrow_end = concept_x + spacing - circle_radius - 10
-                arrow_y = timeline_y
-                
-                # Línea de flecha
-                draw.line([(arrow_start, arrow_y), (arrow_end, arrow_y)], 
-                         fill=palette['accent'], width=3)
-                
-                # Punta de flecha
-                arrow_points = [
-                    (arrow_end, arrow_y),
-                    (arrow_end - 15, arrow_y - 8),
-                    (arrow_end - 15, arrow_y + 8)
-                ]
-                draw.polygon(arrow_points, fill=palette['accent'])
-    
-    def _render_grid_layout(self, draw, title: str, concepts: List[str], palette: dict):
-        """Estilo 6: Grid Layout - Conceptos en cuadrícula de formas geométricas."""
-        # Título arriba
-        title_font = self._get_font(48)
-        title_bbox = draw.textbbox((0, 0), title, font=title_font)
-        title_width = title_bbox[2] - title_bbox[0]
-        title_x = (self.width - title_width) // 2
-        title_y = 70
-        
-        draw.text((title_x, title_y), title, fill=palette['text'], font=title_font)
-        
-        # Grid 2x2 de formas
-        concept_font = self._get_font(26)
-        grid_size = 200
-        spacing = 40
-        start_x = (self.width - (2 * grid_size + spacing)) // 2
-        start_y = title_y + 120
-        
-        # Formas alternativas para variedad
-        shapes = ['circle', 'square', 'diamond', 'triangle']
-        
-        for i, concept in enumerate(concepts[:4]):
-            row = i // 2
-            col = i % 2
-            
-            center_x = start_x + col * (grid_size + spacing) + grid_size // 2
-            center_y = start_y + row * (grid_size + spacing) + grid_size // 2
-            
-            shape = shapes[i % len(shapes)]
-            
-            if shape == 'circle':
-                radius = grid_size // 3
-                draw.ellipse([center_x - radius, center_y - radius,
-                             center_x + radius, center_y + radius],
-                            fill=palette['primary'], outline=palette['accent'], width=3)
-            
-            elif shape == 'square':
-                size = grid_size // 2
-                draw.rectangle([center_x - size//2, center_y - size//2,
-                               center_x + size//2, center_y + size//2],
-                              fill=palette['primary'], outline=palette['accent'], width=3)
-            
-            elif shape == 'diamond':
-                size = grid_size // 3
-                points = [
-                    (center_x, center_y - size),
-                    (center_x + size, center_y),
-                    (center_x, center_y + size),
-                    (center_x - size, center_y)
-                ]
-                draw.polygon(points, fill=palette['primary'], outline=palette['accent'])
-            
-            elif shape == 'triangle':
-                size = grid_size // 3
-                points = [
-                    (center_x, center_y - size),
-                    (center_x - size, center_y + size//2),
-                    (center_x + size, center_y + size//2)
-                ]
-                draw.polygon(points, fill=palette['primary'], outline=palette['accent'])
-            
-            # Texto centrado
-            text_bbox = draw.textbbox((0, 0), concept, font=concept_font)
-            text_width = text_bbox[2] - text_bbox[0]
-            text_height = text_bbox[3] - text_bbox[1]
-            
-            text_x = center_x - text_width // 2
-            text_y = center_y - text_height // 2
-            
-            draw.text((text_x, text_y), concept, fill=palette['text'], font=concept_font)
-    
-    def _render_hierarchy_tree(self, draw, title: str, concepts: List[str], palette: dict):
-        """Estilo 7: Hierarchy Tree - Concepto principal arriba, secundarios abajo."""
-        # Título como concepto principal en la parte superior
-        title_font = self._get_font(40)
-        title_box_width = 300
-        title_box_height = 80
-        title_x = (self.width - title_box_width) // 2
-        title_y = 100
-        
-        # Caja del título principal
-        draw.rectangle([title_x, title_y, title_x + title_box_width, title_y + title_box_height],
-                      fill=palette['primary'], outline=palette['accent'], width=4)
-        
-        # Texto del título centrado
-        title_bbox = draw.textbbox((0, 0), title, font=title_font)
-        title_text_width = title_bbox[2] - title_bbox[0]
-        title_text_height = title_bbox[3] - title_bbox[1]
-        
-        title_text_x = title_x + (title_box_width - title_text_width) // 2
-        title_text_y = title_y + (title_box_height - title_text_height) // 2
-        
-        draw.text((title_text_x, title_text_y), title, fill=palette['text'], font=title_font)
-        
-        # Conceptos secundarios distribuidos abajo
-        concept_font = self._get_font(28)
-        box_width = 180
-        box_height = 60
-        spacing = 40
-        
-        num_concepts = min(len(concepts), 3)
-        if num_concepts > 0:
-            total_width = num_concepts * box_width + (num_concepts - 1) * spacing
-            start_x = (self.width - total_width) // 2
-            start_y = title_y + title_box_height + 120
-            
-            # Líneas de conexión desde el título a cada concepto
-            title_center_x = title_x + title_box_width // 2
-            title_bottom_y = title_y + title_box_height
-            
-            for i, concept in enumerate(concepts[:3]):
-                concept_x = start_x + i * (box_width + spacing)
-                concept_center_x = concept_x + box_width // 2
-                concept_top_y = start_y
-                
-                # Línea de conexión
-                draw.line([(title_center_x, title_bottom_y), (title_center_x, title_bottom_y + 60)],
-                         fill=palette['secondary'], width=3)
-                draw.line([(title_center_x, title_bottom_y + 60), (concept_center_x, title_bottom_y + 60)],
-                         fill=palette['secondary'], width=3)
-                draw.line([(concept_center_x, title_bottom_y + 60), (concept_center_x, concept_top_y)],
-                         fill=palette['secondary'], width=3)
-                
-                # Caja del concepto
-                draw.rectangle([concept_x, start_y, concept_x + box_width, start_y + box_height],
-                              fill=palette['secondary'], outline=palette['accent'], width=2)
-                
-                # Texto del concepto
-                text_bbox = draw.textbbox((0, 0), concept, font=concept_font)
-                text_width = text_bbox[2] - text_bbox[0]
-                text_height = text_bbox[3] - text_bbox[1]
-                
-                text_x = concept_x + (box_width - text_width) // 2
-                text_y = start_y + (box_height - text_height) // 2
-                
-                draw.text((text_x, text_y), concept, fill=palette['text'], font=concept_font)
-    
-    def _render_floating_elements(self, draw, title: str, concepts: List[str], palette: Dict[str, str]) -> None:
-        """Estilo 8: Elementos flotantes distribuidos de forma orgánica."""
-        # Título centrado en la parte superior
-        title_font = self._get_font(44)
-        title_bbox = draw.textbbox((0, 0), title, font=title_font)
-        title_x = (self.width - title_bbox[2]) // 2
-        title_y = 80
-        draw.text((title_x, title_y), title, fill=palette['text'], font=title_font)
-        
-        # Crear "burbujas" flotantes con conceptos
-        import random
-        random.seed(42)  # Para resultados consistentes
-        
-        concept_font = self._get_font(28)
-        available_area = {
-            'x_min': 100, 'x_max': self.width - 100,
-            'y_min': title_y + 120, 'y_max': self.height - 100
-        }
-        
-        # Distribuir conceptos en posiciones "flotantes"
-        for i, concept in enumerate(concepts[:6]):  # Máximo 6 elementos
-            # Posición pseudo-aleatoria pero balanceada
-            x = available_area['x_min'] + (i % 3) * (available_area['x_max'] - available_area['x_min']) // 3
-            y = available_area['y_min'] + (i // 3) * (available_area['y_max'] - available_area['y_min']) // 2
-            
-            # Agregar variación aleatoria
-            x += random.randint(-80, 80)
-            y += random.randint(-60, 60)
-            
-            # Asegurar que esté dentro de límites
-            x = max(120, min(x, self.width - 250))
-            y = max(available_area['y_min'], min(y, available_area['y_max'] - 80))
-            
-            # Dibujar círculo con gradiente visual (círculo doble)
-            radius = 60
-            # Círculo exterior (sombra)
-            draw.ellipse([x-radius-2, y-radius-2, x+radius+2, y+radius+2], 
-                        fill=palette['secondary'])
-            # Círculo principal
-            draw.ellipse([x-radius, y-radius, x+radius, y+radius], 
-                        fill=palette['primary'])
-            
-            # Texto centrado en el círculo
-            text_bbox = draw.textbbox((0, 0), concept, font=concept_font)
-            text_x = x - text_bbox[2] // 2
-            text_y = y - text_bbox[3] // 2
-            draw.text((text_x, text_y), concept, fill=palette['text'], font=concept_font)
-            
-            # Líneas sutiles conectando elementos cercanos
-            if i > 0:
-                prev_x = available_area['x_min'] + ((i-1) % 3) * (available_area['x_max'] - available_area['x_min']) // 3
-                prev_y = available_area['y_min'] + ((i-1) // 3) * (available_area['y_max'] - available_area['y_min']) // 2
-                prev_x += random.randint(-80, 80) if i > 1 else 0
-                prev_y += random.randint(-60, 60) if i > 1 else 0
-                
-                # Línea sutil conectora
-                draw.line([prev_x, prev_y, x, y], fill=palette['accent'], width=2)
+            style = self._base_style(style)
+        return style, palette
 
-    def _render_banner_style(self, draw, title: str, concepts: List[str], palette: Dict[str, str]) -> None:
-        """Estilo 9: Diseño tipo banner con franjas horizontales."""
-        # Título en banner superior
-        banner_height = 120
-        draw.rectangle([0, 0, self.width, banner_height], fill=palette['primary'])
-        
-        title_font = self._get_font(44)
-        title_bbox = draw.textbbox((0, 0), title, font=title_font)
-        title_x = 50
-        title_y = (banner_height - title_bbox[3]) // 2
-        draw.text((title_x, title_y), title, fill=palette['text'], font=title_font)
-        
-        # Conceptos en franjas intercaladas
-        concept_font = self._get_font(32)
-        content_start_y = banner_height + 40
-        available_height = self.height - content_start_y - 40
-        
-        stripe_height = min(available_height // len(concepts), 140) if concepts else 140
-        
-        for i, concept in enumerate(concepts):
-            y_start = content_start_y + i * (stripe_height + 20)
-            y_end = y_start + stripe_height
-            
-            # Alternar lados y colores
-            if i % 2 == 0:
-                # Franja desde la izquierda
-                stripe_width = self.width * 0.7
-                draw.rectangle([0, y_start, stripe_width, y_end], fill=palette['secondary'])
-                
-                # Triángulo decorativo en el extremo
-                triangle_points = [
-                    (stripe_width, y_start),
-                    (stripe_width + 50, (y_start + y_end) // 2),
-                    (stripe_width, y_end)
-                ]
-                draw.polygon(triangle_points, fill=palette['secondary'])
-                
-                # Texto alineado a la izquierda
-                text_x = 40
-            else:
-                # Franja desde la derecha
-                stripe_width = self.width * 0.7
-                x_start = self.width - stripe_width
-                draw.rectangle([x_start, y_start, self.width, y_end], fill=palette['accent'])
-                
-                # Triángulo decorativo en el extremo
-                triangle_points = [
-                    (x_start, y_start),
-                    (x_start - 50, (y_start + y_end) // 2),
-                    (x_start, y_end)
-                ]
-                draw.polygon(triangle_points, fill=palette['accent'])
-                
-                # Texto alineado a la derecha
-                text_bbox = draw.textbbox((0, 0), concept, font=concept_font)
-                text_x = self.width - text_bbox[2] - 40
-            
-            # Dibujar texto centrado verticalmente en la franja
-            text_y = (y_start + y_end - draw.textbbox((0, 0), concept, font=concept_font)[3]) // 2
-            draw.text((text_x, text_y), concept, fill=palette['text'], font=concept_font)
-
-    def _render_banner_style_green(self, draw, title: str, concepts: List[str], palette: Dict[str, str]) -> None:
-        """Variación Verde de Banner Style - Modo oscuro con tonos verdes."""
-        green_palette = {
-            'bg': (15, 25, 15),
-            'primary': (46, 125, 50),
-            'secondary': (76, 175, 80),
-            'text': (255, 255, 255),
-            'accent': (129, 199, 132)
-        }
-        
-        # Reutilizar la lógica del banner_style original con nueva paleta
-        self._render_banner_style_base(draw, title, concepts, green_palette)
-    
-    def _render_banner_style_orange(self, draw, title: str, concepts: List[str], palette: Dict[str, str]) -> None:
-        """Variación Naranja de Banner Style - Modo oscuro con tonos naranjas."""
-        orange_palette = {
-            'bg': (25, 15, 10),
-            'primary': (255, 152, 0),
-            'secondary': (255, 183, 77),
-            'text': (255, 255, 255),
-            'accent': (255, 204, 128)
-        }
-        
-        # Reutilizar la lógica del banner_style original con nueva paleta
-        self._render_banner_style_base(draw, title, concepts, orange_palette)
-    
-    def _render_banner_style_purple(self, draw, title: str, concepts: List[str], palette: Dict[str, str]) -> None:
-        """Variación Púrpura de Banner Style - Modo oscuro con tonos púrpuras."""
-        purple_palette = {
-            'bg': (20, 15, 25),
-            'primary': (156, 39, 176),
-            'secondary': (186, 104, 200),
-            'text': (255, 255, 255),
-            'accent': (206, 147, 216)
-        }
-        
-        # Reutilizar la lógica del banner_style original con nueva paleta
-        self._render_banner_style_base(draw, title, concepts, purple_palette)
-    
-    def _render_banner_style_base(self, draw, title: str, concepts: List[str], palette: Dict[str, str]) -> None:
-        """Método base para todas las variaciones de banner_style."""
-        # Título en banner superior
-        banner_height = 120
-        draw.rectangle([0, 0, self.width, banner_height], fill=palette['primary'])
-        
-        title_font = self._get_font(44)
-        title_bbox = draw.textbbox((0, 0), title, font=title_font)
-        title_x = 50
-        title_y = (banner_height - title_bbox[3]) // 2
-        draw.text((title_x, title_y), title, fill=palette['text'], font=title_font)
-        
-        # Conceptos en franjas intercaladas
-        concept_font = self._get_font(32)
-        content_start_y = banner_height + 40
-        available_height = self.height - content_start_y - 40
-        
-        stripe_height = min(available_height // len(concepts), 140) if concepts else 140
-        
-        for i, concept in enumerate(concepts):
-            y_start = content_start_y + i * (stripe_height + 20)
-            y_end = y_start + stripe_height
-            
-            # Alternar lados y colores
-            if i % 2 == 0:
-                # Franja desde la izquierda
-                stripe_width = self.width * 0.7
-                draw.rectangle([0, y_start, stripe_width, y_end], fill=palette['secondary'])
-                
-                # Triángulo decorativo en el extremo
-                triangle_points = [
-                    (stripe_width, y_start),
-                    (stripe_width + 50, (y_start + y_end) // 2),
-                    (stripe_width, y_end)
-                ]
-                draw.polygon(triangle_points, fill=palette['secondary'])
-                
-                # Texto alineado a la izquierda
-                text_x = 40
-            else:
-                # Franja desde la derecha
-                stripe_width = self.width * 0.7
-                x_start = self.width - stripe_width
-                draw.rectangle([x_start, y_start, self.width, y_end], fill=palette['accent'])
-                
-                # Triángulo decorativo en el extremo
-                triangle_points = [
-                    (x_start, y_start),
-                    (x_start - 50, (y_start + y_end) // 2),
-                    (x_start, y_end)
-                ]
-                draw.polygon(triangle_points, fill=palette['accent'])
-                
-                # Texto alineado a la derecha
-                text_bbox = draw.textbbox((0, 0), concept, font=concept_font)
-                text_x = self.width - text_bbox[2] - 40
-            
-            # Dibujar texto centrado verticalmente en la franja
-            text_y = (y_start + y_end - draw.textbbox((0, 0), concept, font=concept_font)[3]) // 2
-            draw.text((text_x, text_y), concept, fill=palette['text'], font=concept_font)
-
-    def _render_focus_spotlight(self, draw, title: str, concepts: List[str], palette: Dict[str, str]) -> None:
-        """Estilo 10: Un concepto principal en spotlight con secundarios alrededor."""
-        # Título en la parte superior
-        title_font = self._get_font(44)
-        title_bbox = draw.textbbox((0, 0), title, font=title_font)
-        title_x = (self.width - title_bbox[2]) // 2
-        title_y = 60
-        draw.text((title_x, title_y), title, fill=palette['text'], font=title_font)
-        
-        if not concepts:
-            return
-            
-        # Concepto principal en el centro (spotlight)
-        main_concept = concepts[0]
-        secondary_concepts = concepts[1:6]  # Máximo 5 secundarios
-        
-        # Círculo principal grande en el centro
-        center_x, center_y = self.width // 2, (self.height + title_y + 100) // 2
-        main_radius = 120
-        
-        # Efecto de spotlight (círculos concéntricos)
-        for radius_offset in [30, 20, 10, 0]:
-            alpha = 100 - radius_offset * 2  # Efecto de transparencia simulado
-            color = palette['primary'] if radius_offset == 0 else palette['secondary']
-            draw.ellipse([
-                center_x - main_radius - radius_offset,
-                center_y - main_radius - radius_offset,
-                center_x + main_radius + radius_offset,
-                center_y + main_radius + radius_offset
-            ], fill=color)
-        
-        # Texto del concepto principal
-        main_font = self._get_font(36)
-        main_bbox = draw.textbbox((0, 0), main_concept, font=main_font)
-        main_x = center_x - main_bbox[2] // 2
-        main_y = center_y - main_bbox[3] // 2
-        draw.text((main_x, main_y), main_concept, fill=palette['text'], font=main_font)
-        
-        # Conceptos secundarios alrededor del principal
-        secondary_font = self._get_font(24)
-        orbit_radius = 250
-        
-        import math
-        for i, concept in enumerate(secondary_concepts):
-            # Distribución circular alrededor del concepto principal
-            angle = (2 * math.pi * i) / len(secondary_concepts)
-            sec_x = center_x + orbit_radius * math.cos(angle)
-            sec_y = center_y + orbit_radius * math.sin(angle)
-            
-            # Círculo secundario
-            sec_radius = 50
-            draw.ellipse([
-                sec_x - sec_radius, sec_y - sec_radius,
-                sec_x + sec_radius, sec_y + sec_radius
-            ], fill=palette['accent'])
-            
-            # Texto del concepto secundario
-            sec_bbox = draw.textbbox((0, 0), concept, font=secondary_font)
-            text_x = sec_x - sec_bbox[2] // 2
-            text_y = sec_y - sec_bbox[3] // 2
-            draw.text((text_x, text_y), concept, fill=palette['text'], font=secondary_font)
-            
-            # Línea conectora al concepto principal
-            draw.line([center_x, center_y, sec_x, sec_y], fill=palette['secondary'], width=3)
-    
-    def render_slide(self, slide: Dict[str, Any], slide_num: int, output_path: str) -> None:
+    def _draw_style(self, draw, style: str, title: str, concepts: List[str], palette: Dict[str, Any]) -> None:
+        """Dibuja la slide ejecutando las operaciones compiladas del estilo sobre ``draw``."""
+        self.style_registry.get(style).draw(self, draw, title, concepts, palette)
+
+    def render_slide(self, slide: Slide, slide_num: int, output_path: str,
+                     style: Optional[str] = None, palette: Optional[Dict[str, Any]] = None,
+                     storyboard: Optional[StoryboardBuilder] = None) -> str:
         """
         Renderiza una slide como imagen PNG usando estilos dinámicos.
-        
+
         Args:
-            slide: Diccionario con datos de la slide
+            slide: Slide parseada
             slide_num: Número de slide para logging
             output_path: Ruta donde guardar la imagen
+            style: Estilo a usar (si es None se elige con StyleManager)
+            palette: Paleta forzada; las variaciones de color del estilo se
+                reemplazan por su estilo base pintado con esta paleta
+            storyboard: Recibe el frame renderizado para poster/miniaturas
         """
         # Extraer título y conceptos
-        title = slide.get('titulo', f'Slide {slide_num}')
-        concepts = slide.get('puntos', [])
-        
-        # Seleccionar estilo aleatorio 
-        style = self.style_manager.get_next_style()
-        palette = self.style_manager.get_random_palette()
-        
+        title = slide.titulo
+        concepts = list(slide.puntos)
+
+        style, palette = self._resolve_style(style, palette)
+
         # Crear imagen con color de fondo de la paleta
         img = Image.new('RGB', (self.width, self.height), palette['bg'])
         draw = ImageDraw.Draw(img)
-        
-        # Renderizar según el estilo seleccionado (solo estilos universales)
-        if style == 'minimal_clean':
-            self._render_minimal_clean(draw, title, concepts, palette)
-        elif style == 'minimal_clean_green':
-            self._render_minimal_clean_green(draw, title, concepts, palette)
-        elif style == 'minimal_clean_orange':
-            self._render_minimal_clean_orange(draw, title, concepts, palette)
-        elif style == 'minimal_clean_purple':
-            self._render_minimal_clean_purple(draw, title, concepts, palette)
-        elif style == 'geometric_boxes':
-            self._render_geometric_boxes(draw, title, concepts, palette)
-        elif style == 'banner_style':
-            self._render_banner_style(draw, title, concepts, palette)
-        elif style == 'banner_style_green':
-            self._render_banner_style_green(draw, title, concepts, palette)
-        elif style == 'banner_style_orange':
-            self._render_banner_style_orange(draw, title, concepts, palette)
-        elif style == 'banner_style_purple':
-            self._render_banner_style_purple(draw, title, concepts, palette)
-        else:
-            # Fallback al estilo minimal si no está implementado
-            self._render_minimal_clean(draw, title, concepts, palette)
-        
+        self._draw_style(draw, style, title, concepts, palette)
+
         # Modificar el nombre del archivo para incluir el estilo
         path_parts = os.path.splitext(output_path)
         new_output_path = f"{path_parts[0]}_{style}{path_parts[1]}"
-        
+
         # Guardar imagen
         img.save(new_output_path, 'PNG')
+        if storyboard is not None:
+            storyboard.add_frame(slide_num, img)
         print(f"  Slide {slide_num:04d} renderizada ({style}): {os.path.basename(new_output_path)}")
-        
+
         # Retornar la nueva ruta para actualizar la referencia
         return new_output_path
-    
+
+    def render_slide_layers(self, slide: Slide, slide_num: int, output_path: str,
+                            style: Optional[str] = None,
+                            palette: Optional[Dict[str, Any]] = None,
+                            storyboard: Optional[StoryboardBuilder] = None) -> Tuple[str, List[str]]:
+        """
+        Renderiza la slide base (fondo y título) y una capa PNG transparente por bullet.
+
+        Returns:
+            Tuple con (ruta de la base, rutas de las capas en orden de aparición)
+        """
+        title = slide.titulo
+        concepts = list(slide.puntos)
+
+        style, palette = self._resolve_style(style, palette)
+
+        img = Image.new('RGB', (self.width, self.height), palette['bg'])
+        draw = LayeredDraw(img)
+        self._draw_style(draw, style, title, concepts, palette)
+        layers = draw.compose_layers()
+
+        root, ext = os.path.splitext(output_path)
+        base_path = f"{root}_{style}{ext}"
+        img.save(base_path, 'PNG')
+
+        layer_paths = []
+        for k, layer in enumerate(layers, 1):
+            layer_path = f"{root}_{style}_layer{k:02d}{ext}"
+            layer.save(layer_path, 'PNG')
+            layer_paths.append(layer_path)
+
+        if storyboard is not None:
+            # La miniatura muestra la slide completa, con todos los puntos revelados
+            full = img.convert('RGBA')
+            for layer in layers:
+                full = Image.alpha_composite(full, layer)
+            storyboard.add_frame(slide_num, full)
+
+        print(f"  Slide {slide_num:04d} renderizada por capas ({style}): "
+              f"{os.path.basename(base_path)} + {len(layer_paths)} capas")
+
+        return base_path, layer_paths
+
     def _fit_text_to_width(self, text: str, max_width: int, max_font_size: int = 48, min_font_size: int = 16) -> Tuple[ImageFont.ImageFont, List[str]]:
         """
         Ajusta el tamaño de fuente y divide el texto para que quepa en el ancho especificado.
@@ -1363,56 +1334,516 @@ class JSONExtractor:
         return slides
 
 
-class TimeUtils:
-    """Utilidades para manejo de tiempo."""
-    
+class TimeUtils:
+    """Utilidades para manejo de tiempo."""
+    
+    @staticmethod
+    def time_to_seconds(time_str: str) -> float:
+        """Convierte tiempo HH:MM o HH:MM:SS (segundos opcionalmente con .mmm) a segundos."""
+        return parse_time_ms(time_str) / 1000
+    
+    @staticmethod
+    def seconds_to_time(seconds: float) -> str:
+        """Convierte segundos a MM:SS o HH:MM:SS, con milisegundos solo si hacen falta."""
+        return format_time_ms(int(round(seconds * 1000)))
+    
+    @staticmethod
+    def validate_slide_times(slides: List[Slide]) -> None:
+        """Valida que los tiempos de las slides sean consistentes."""
+        for i, slide in enumerate(slides):
+            if slide.end_ms <= slide.start_ms:
+                raise VideoGeneratorError(
+                    f"Slide {i+1}: tiempo de fin ({slide.fin}) debe ser mayor que inicio ({slide.inicio})")
+            
+            # Verificar solapamiento con slide anterior
+            if i > 0:
+                if slide.start_ms < slides[i-1].end_ms:
+                    print(f"WARNING: Slide {i+1} se solapa con slide anterior")
+
+
+class AudioAnalyzer:
+    """
+    Análisis del audio en proceso, antes de renderizar.
+
+    El audio se decodifica una sola vez con ffmpeg a PCM mono de baja tasa
+    por un pipe; con NumPy se calculan la duración exacta y un mapa de
+    silencios (ventanas cuyo RMS queda por debajo de un umbral en dBFS).
+    """
+
+    def __init__(self, audio_path: str, sample_rate: int = 8000, window_ms: int = 20,
+                 silence_db: float = -40.0, min_silence_ms: int = 250, threads: int = 1):
+        self.audio_path = audio_path
+        self.threads = threads
+        self.sample_rate = sample_rate
+        self.window_ms = window_ms
+        self.silence_db = silence_db
+        self.min_silence_ms = min_silence_ms
+
+    def decode(self) -> np.ndarray:
+        """Decodifica el audio a muestras int16 mono."""
+        cmd = [
+            'ffmpeg', '-v', 'error',
+            '-threads', str(self.threads),
+            '-i', self.audio_path,
+            '-f', 's16le', '-acodec', 'pcm_s16le',
+            '-ac', '1', '-ar', str(self.sample_rate),
+            'pipe:1'
+        ]
+        result = subprocess.run(cmd, capture_output=True)
+        if result.returncode != 0:
+            raise VideoGeneratorError(
+                f"Error decodificando audio: {result.stderr.decode('utf-8', 'replace')}")
+        return np.frombuffer(result.stdout, dtype='<i2')
+
+    def analyze(self) -> Dict[str, Any]:
+        """
+        Returns:
+            Diccionario con ``duration`` (segundos) y ``silences`` (lista de [inicio, fin])
+        """
+        samples = self.decode()
+        duration = len(samples) / self.sample_rate
+
+        window = max(1, self.sample_rate * self.window_ms // 1000)
+        count = len(samples) // window
+        if count == 0:
+            return {"duration": duration, "silences": []}
+
+        frames = samples[:count * window].astype(np.float32).reshape(count, window) / 32768.0
+        rms = np.sqrt(np.mean(frames * frames, axis=1))
+        level_db = 20.0 * np.log10(rms + 1e-10)
+        silent = level_db < self.silence_db
+
+        # Inicio/fin de cada racha de ventanas silenciosas
+        edges = np.diff(np.concatenate(([0], silent.astype(np.int8), [0])))
+        starts = np.flatnonzero(edges == 1)
+        ends = np.flatnonzero(edges == -1)
+        min_windows = max(1, self.min_silence_ms // self.window_ms)
+        keep = (ends - starts) >= min_windows
+
+        window_sec = window / self.sample_rate
+        silences = [[round(float(a) * window_sec, 3), round(float(b) * window_sec, 3)]
+                    for a, b in zip(starts[keep], ends[keep])]
+
+        return {"duration": duration, "silences": silences}
+
+    @staticmethod
+    def snap_slides(slides: List[Slide], silences: List[List[float]],
+                    max_shift: float) -> Tuple[List[Slide], int]:
+        """
+        Mueve los límites entre slides al centro de la pausa más cercana.
+
+        Solo se mueve un límite si hay una pausa a menos de ``max_shift``
+        segundos y el resultado mantiene ambas slides con duración positiva.
+
+        Returns:
+            Tuple con (slides ajustadas, cantidad de límites ajustados)
+        """
+        if not silences or len(slides) < 2:
+            return slides, 0
+
+        pauses_ms = np.array([round((a + b) * 500) for a, b in silences], dtype=np.int64)
+        max_shift_ms = round(max_shift * 1000)
+        starts = [slide.start_ms for slide in slides]
+        ends = [slide.end_ms for slide in slides]
+        moved = 0
+
+        for k in range(1, len(slides)):
+            boundary = starts[k]
+            if ends[k - 1] != boundary:
+                continue  # Solo límites contiguos; los huecos se dejan como están
+
+            pos = int(np.searchsorted(pauses_ms, boundary))
+            candidates = [int(pauses_ms[j]) for j in (pos - 1, pos) if 0 <= j < len(pauses_ms)]
+            target = min(candidates, key=lambda p: abs(p - boundary))
+            if abs(target - boundary) > max_shift_ms or target == boundary:
+                continue
+            if not (starts[k - 1] < target < ends[k]):
+                continue
+
+            ends[k - 1] = starts[k] = target
+            moved += 1
+
+        snapped = [slide if (slide.start_ms, slide.end_ms) == (start, end) else slide.with_times(start, end)
+                   for slide, start, end in zip(slides, starts, ends)]
+        return snapped, moved
+
+
+class CpuBudget:
+    """
+    Presupuesto de núcleos compartido entre jobs concurrentes de Vidazor.
+
+    Cada núcleo de la máquina es un archivo token (``core_NN.lock``) en un
+    directorio común. Un job se anuncia con su propio archivo bloqueado
+    (``job_*.lock``) mientras dura y toma los tokens con ``flock`` por etapa
+    (análisis, render, codificación), liberándolos entre una y otra: cada
+    etapa pide la parte equitativa de los jobs activos (o ``cores`` si se
+    fijó), espera si no hay ningún token libre y puede obtener más núcleos
+    que la anterior si otros jobs terminaron. Los núcleos obtenidos se
+    reparten entre los workers de Pillow y los ``-threads`` de ffmpeg.
+
+    El presupuesto es un límite, no una garantía de uso: los workers de render
+    son hilos y el dibujo en Python comparte el GIL, así que solo escalan las
+    partes de Pillow que lo liberan (rasterizado de texto, compresión PNG).
+    Los procesos ffmpeg sí usan los ``-threads`` asignados.
+    """
+
+    def __init__(self, cores: Optional[int] = None, token_dir: Optional[str] = None,
+                 poll_interval: float = 0.5):
+        self.total = os.cpu_count() or 1
+        self.fixed = cores is not None
+        self.wanted = max(1, min(cores or self.total, self.total))
+        self.token_dir = token_dir or os.path.join(tempfile.gettempdir(), 'vidazor_cpu_tokens')
+        self.poll_interval = poll_interval
+        self.granted = 0
+        self._handles: List[Any] = []
+        self._job_handle: Optional[Any] = None
+        self._job_path: Optional[str] = None
+
+    def _prepare_dir(self) -> None:
+        """Crea el directorio común escribible por todos (con sticky bit, como /tmp)."""
+        try:
+            os.makedirs(self.token_dir, exist_ok=True)
+            if os.stat(self.token_dir).st_uid == os.getuid():
+                os.chmod(self.token_dir, 0o1777)
+            probe = tempfile.NamedTemporaryFile(dir=self.token_dir, prefix='.probe_')
+            probe.close()
+        except OSError:
+            # Directorio de otro usuario sin permisos: presupuesto propio de este usuario
+            private_dir = f"{self.token_dir}-{os.getuid()}"
+            print(f"WARNING: sin acceso a {self.token_dir}, se usa {private_dir}")
+            self.token_dir = private_dir
+            os.makedirs(self.token_dir, exist_ok=True)
+
+    def _open_token(self, path: str) -> Any:
+        # Solo lectura: flock no necesita escritura y así sirven los tokens creados por otros usuarios
+        fd = os.open(path, os.O_RDONLY | os.O_CREAT, 0o644)
+        return os.fdopen(fd, 'rb')
+
+    def _try_take(self, index: int) -> bool:
+        try:
+            handle = self._open_token(os.path.join(self.token_dir, f"core_{index:02d}.lock"))
+        except OSError:
+            return False
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            handle.close()
+            return False
+        self._handles.append(handle)
+        return True
+
+    def register(self) -> None:
+        """Anuncia el job para que los demás calculen su parte equitativa."""
+        if fcntl is None or self._job_handle is not None:
+            return
+        self._prepare_dir()
+        # Se bloquea con un nombre temporal y se renombra: nunca se ve un job_*.lock sin dueño vivo
+        handle = tempfile.NamedTemporaryFile(dir=self.token_dir, prefix='.job_', suffix='.tmp', delete=False)
+        os.chmod(handle.name, 0o644)  # Legible para que los jobs de otros usuarios lo cuenten
+        fcntl.flock(handle, fcntl.LOCK_EX)
+        self._job_path = os.path.join(self.token_dir, f"job_{os.getpid()}_{id(self):x}.lock")
+        os.replace(handle.name, self._job_path)
+        self._job_handle = handle
+
+    def unregister(self) -> None:
+        if self._job_handle is not None:
+            try:
+                os.remove(self._job_path)
+            except OSError:
+                pass
+            self._job_handle.close()
+            self._job_handle = None
+
+    def active_jobs(self) -> int:
+        """Jobs anunciados cuyo dueño sigue vivo (los de jobs caídos se limpian)."""
+        active = 0
+        for name in os.listdir(self.token_dir):
+            if not (name.startswith('job_') and name.endswith('.lock')):
+                continue
+            path = os.path.join(self.token_dir, name)
+            if path == self._job_path:
+                active += 1
+                continue
+            try:
+                handle = self._open_token(path)
+            except OSError:
+                continue
+            with handle:
+                try:
+                    fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    active += 1
+                    continue
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+        return max(1, active)
+
+    def target(self) -> int:
+        """Núcleos a pedir en la próxima etapa."""
+        if self.fixed or fcntl is None:
+            return self.wanted
+        return max(1, min(self.wanted, self.total // self.active_jobs()))
+
+    def acquire(self) -> int:
+        """Toma hasta ``target()`` núcleos; bloquea hasta conseguir al menos uno."""
+        if fcntl is None:
+            self.granted = self.wanted
+            return self.granted
+
+        self._prepare_dir()
+        waiting = False
+        while True:
+            wanted = self.target()
+            for index in range(self.total):
+                if len(self._handles) >= wanted:
+                    break
+                self._try_take(index)
+            if self._handles:
+                break
+            if not waiting:
+                print(f"Esperando núcleos libres en {self.token_dir}...")
+                waiting = True
+            time.sleep(self.poll_interval)
+
+        self.granted = len(self._handles)
+        print(f"Presupuesto de CPU: {self.granted}/{self.total} núcleos")
+        return self.granted
+
+    def release(self) -> None:
+        """Libera los tokens tomados."""
+        for handle in self._handles:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+            handle.close()
+        self._handles = []
+        self.granted = 0
+
+    def split(self, parts: int) -> int:
+        """Núcleos para cada una de ``parts`` tareas concurrentes (mínimo 1)."""
+        return max(1, (self.granted or self.wanted) // max(1, parts))
+
+    @contextmanager
+    def stage(self) -> Iterator['CpuBudget']:
+        """Toma los núcleos para una etapa y los devuelve al terminarla."""
+        self.acquire()
+        try:
+            yield self
+        finally:
+            self.release()
+
+    def __enter__(self) -> 'CpuBudget':
+        self.register()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.release()
+        self.unregister()
+
+
+class JobCheckpoint:
+    """
+    Registro de etapas completadas de un job para reanudar tras un fallo.
+
+    ``checkpoint.json`` guarda las rutas de entrada con sus huellas SHA-256,
+    las opciones del job y cada etapa terminada (extract, slides_video, mux)
+    con la ruta y el tamaño de su salida. El render se registra slide a slide
+    en ``checkpoint_render.jsonl`` (una línea por slide) para no reescribir
+    todo el checkpoint miles de veces.
+    """
+
+    FILENAME = 'checkpoint.json'
+    RENDER_JOURNAL = 'checkpoint_render.jsonl'
+
+    def __init__(self, job_dir: str):
+        self.job_dir = job_dir
+        self.path = os.path.join(job_dir, self.FILENAME)
+        self.journal_path = os.path.join(job_dir, self.RENDER_JOURNAL)
+        self.data: Dict[str, Any] = {"version": 1, "inputs": {}, "fingerprints": {},
+                                     "options": {}, "stages": {}}
+        self.rendered: Dict[Tuple[str, int], Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, job_dir: str) -> 'JobCheckpoint':
+        """Carga el checkpoint de un job existente."""
+        checkpoint = cls(os.path.abspath(job_dir))
+        if not os.path.exists(checkpoint.path):
+            raise VideoGeneratorError(f"No hay checkpoint para reanudar en: {job_dir}")
+
+        with open(checkpoint.path, 'r', encoding='utf-8') as f:
+            checkpoint.data = json.load(f)
+
+        if os.path.exists(checkpoint.journal_path):
+            with open(checkpoint.journal_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # Última línea truncada por un corte
+                    checkpoint.rendered[(entry['scope'], entry['index'])] = entry
+
+        return checkpoint
+
     @staticmethod
-    def time_to_seconds(time_str: str) -> float:
-        """Convierte tiempo HH:MM o HH:MM:SS a segundos."""
-        parts = time_str.split(':')
-        if len(parts) == 2:  # MM:SS
-            return int(parts[0]) * 60 + int(parts[1])
-        elif len(parts) == 3:  # HH:MM:SS
-            return int(parts[0]) * 3600 + int(parts[1]) * 60 + int(parts[2])
-        else:
-            raise ValueError(f"Formato de tiempo inválido: {time_str}")
-    
+    def fingerprint(path: str) -> str:
+        """Huella SHA-256 de un archivo."""
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
     @staticmethod
-    def validate_slide_times(slides: List[Dict[str, Any]]) -> None:
-        """Valida que los tiempos de las slides sean consistentes."""
-        for i, slide in enumerate(slides):
-            inicio_sec = TimeUtils.time_to_seconds(slide['inicio'])
-            fin_sec = TimeUtils.time_to_seconds(slide['fin'])
-            
-            if fin_sec <= inicio_sec:
+    def slide_hash(slide: 'Slide', style: Optional[str], palette: Optional[Dict[str, Any]]) -> str:
+        """Huella del contenido de una slide junto con su estilo y paleta."""
+        payload = json.dumps({'slide': slide.content_hash, 'style': style, 'palette': palette},
+                             sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def save(self) -> None:
+        """Escribe el checkpoint de forma atómica."""
+        with self._lock:
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.data, f, indent=2, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+
+    def bind_inputs(self, inputs: Dict[str, str]) -> None:
+        """Registra las huellas de las entradas o, al reanudar, verifica que no cambiaron."""
+        for key, path in inputs.items():
+            current = self.fingerprint(path)
+            recorded = self.data['fingerprints'].get(key)
+            if recorded is None:
+                self.data['fingerprints'][key] = current
+            elif recorded != current:
                 raise VideoGeneratorError(
-                    f"Slide {i+1}: tiempo de fin ({slide['fin']}) debe ser mayor que inicio ({slide['inicio']})")
-            
-            # Verificar solapamiento con slide anterior
-            if i > 0:
-                prev_fin = TimeUtils.time_to_seconds(slides[i-1]['fin'])
-                if inicio_sec < prev_fin:
-                    print(f"WARNING: Slide {i+1} se solapa con slide anterior")
+                    f"La entrada '{key}' cambió desde que se creó el job ({path}); no se puede reanudar")
+        self.save()
+
+    def set_option(self, key: str, value: Any) -> None:
+        self.data['options'][key] = value
+        self.save()
+
+    def complete(self, stage: str, path: str, scope: str = '.', **info: Any) -> None:
+        """Marca una etapa como completada registrando su salida."""
+        record = {"path": path, "size": os.path.getsize(path),
+                  "completed_at": datetime.now().isoformat(), **info}
+        with self._lock:
+            self.data['stages'].setdefault(stage, {})[scope] = record
+        self.save()
+
+    def completed(self, stage: str, scope: str = '.') -> Optional[Dict[str, Any]]:
+        """Devuelve el registro de la etapa si terminó y su salida sigue intacta."""
+        record = self.data['stages'].get(stage, {}).get(scope)
+        if record and os.path.exists(record['path']) and os.path.getsize(record['path']) == record['size']:
+            return record
+        return None
+
+    def record_slide(self, scope: str, index: int, slide_hash: str, paths: List[str]) -> None:
+        """Agrega una slide renderizada al journal."""
+        entry = {"scope": scope, "index": index, "hash": slide_hash, "paths": paths,
+                 "sizes": [os.path.getsize(path) for path in paths]}
+        with self._lock:
+            self.rendered[(scope, index)] = entry
+            with open(self.journal_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+
+    def rendered_slide(self, scope: str, index: int, slide_hash: str) -> Optional[List[str]]:
+        """Rutas de una slide ya renderizada con el mismo contenido, si siguen intactas."""
+        entry = self.rendered.get((scope, index))
+        if not entry or entry['hash'] != slide_hash:
+            return None
+        for path, size in zip(entry['paths'], entry['sizes']):
+            if not os.path.exists(path) or os.path.getsize(path) != size:
+                return None
+        return entry['paths']
 
 
 class VideoGenerator:
     """Clase principal para generar videos desde slides."""
     
-    def __init__(self, input_txt_path: str, audio_path: str, output_video_path: str):
+    def __init__(self, input_txt_path: str, audio_path: str, output_video_path: str,
+                 text_backend: str = 'pillow', reveal: bool = False,
+                 snap_to_pauses: bool = False, snap_window: float = 1.5,
+                 timeline_tolerance: float = 1.0, storyboard: bool = True,
+                 subtitles_path: Optional[str] = None, chapters: bool = True,
+                 cpu_cores: Optional[int] = None, cpu_token_dir: Optional[str] = None,
+                 normalize_timeline: bool = False, styles: Optional[List[str]] = None,
+                 style_templates: Optional[List[str]] = None,
+                 checkpoint: Optional[JobCheckpoint] = None):
         self.input_txt_path = os.path.abspath(input_txt_path)
         self.audio_path = os.path.abspath(audio_path)
         self.output_video_path = os.path.abspath(output_video_path)
+        self.subtitles_path = os.path.abspath(subtitles_path) if subtitles_path else None
         
-        # Crear directorio de trabajo temporal en el mismo directorio que el video de salida
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        output_dir = os.path.dirname(self.output_video_path)
-        self.job_dir = os.path.join(output_dir, f"job_{timestamp}")
-        os.makedirs(self.job_dir, exist_ok=True)
-        
-        self.renderer = SlideRenderer()
+        if checkpoint is not None:
+            # Reanudar en el directorio de trabajo de un job anterior
+            self.job_dir = checkpoint.job_dir
+            self.checkpoint = checkpoint
+        else:
+            # Crear directorio de trabajo temporal en el mismo directorio que el video de salida
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            output_dir = os.path.dirname(self.output_video_path)
+            self.job_dir = os.path.join(output_dir, f"job_{timestamp}")
+            os.makedirs(self.job_dir, exist_ok=True)
+            
+            self.checkpoint = JobCheckpoint(self.job_dir)
+            self.checkpoint.data['inputs'] = {'text': self.input_txt_path, 'audio': self.audio_path,
+                                              'output': self.output_video_path,
+                                              'subtitles': self.subtitles_path}
+            self.checkpoint.data['options'] = {'text_backend': text_backend, 'reveal': reveal,
+                                               'snap_to_pauses': snap_to_pauses, 'snap_window': snap_window,
+                                               'timeline_tolerance': timeline_tolerance,
+                                               'storyboard': storyboard, 'chapters': chapters,
+                                               'cpu_cores': cpu_cores, 'cpu_token_dir': cpu_token_dir,
+                                               'normalize_timeline': normalize_timeline,
+                                               'styles': styles, 'style_templates': style_templates}
+            self.checkpoint.save()
+        
+        self.renderer = SlideRenderer(text_backend=text_backend, style_templates=style_templates, styles=styles)
+        self.audio_analysis: Optional[Dict[str, Any]] = None
+        self.reveal = reveal
+        self.snap_to_pauses = snap_to_pauses
+        self.snap_window = snap_window
+        self.timeline_tolerance = timeline_tolerance
+        self.storyboard = storyboard
+        self.chapters = chapters
+        self.normalize_timeline = normalize_timeline
+        self.cpu_budget = CpuBudget(cpu_cores, cpu_token_dir)
+        # Núcleos por tarea concurrente (workers de render / -threads de ffmpeg)
+        self.cpu_share = self.cpu_budget.wanted
+        self.fps = 25
         
         print(f"Directorio de trabajo: {self.job_dir}")
     
+    @classmethod
+    def resume(cls, job_dir: str) -> 'VideoGenerator':
+        """Crea un generador que continúa un job desde su primera etapa incompleta."""
+        checkpoint = JobCheckpoint.load(job_dir)
+        inputs = checkpoint.data['inputs']
+        options = checkpoint.data['options']
+        print(f"↻ Reanudando job: {checkpoint.job_dir}")
+        return cls(inputs['text'], inputs['audio'], inputs['output'],
+                   text_backend=options.get('text_backend', 'pillow'),
+                   reveal=options.get('reveal', False),
+                   snap_to_pauses=options.get('snap_to_pauses', False),
+                   snap_window=options.get('snap_window', 1.5),
+                   timeline_tolerance=options.get('timeline_tolerance', 1.0),
+                   storyboard=options.get('storyboard', True),
+                   subtitles_path=inputs.get('subtitles'),
+                   chapters=options.get('chapters', True),
+                   cpu_cores=options.get('cpu_cores'),
+                   cpu_token_dir=options.get('cpu_token_dir'),
+                   normalize_timeline=options.get('normalize_timeline', False),
+                   styles=options.get('styles'),
+                   style_templates=options.get('style_templates'),
+                   checkpoint=checkpoint)
+    
+    def _scope(self, out_dir: Optional[str]) -> str:
+        """Clave de checkpoint para un directorio de salida (job o variante)."""
+        return os.path.relpath(out_dir or self.job_dir, self.job_dir)
+    
     def validate_inputs(self) -> None:
         """Valida que los archivos de entrada existan."""
         if not os.path.exists(self.input_txt_path):
@@ -1426,9 +1857,30 @@ class VideoGenerator:
             subprocess.run(['ffmpeg', '-version'], capture_output=True, check=True)
         except (subprocess.CalledProcessError, FileNotFoundError):
             raise VideoGeneratorError("ffmpeg no está instalado o no está en PATH")
+        
+        inputs = {'text': self.input_txt_path, 'audio': self.audio_path}
+        if self.subtitles_path:
+            if not os.path.exists(self.subtitles_path):
+                raise VideoGeneratorError(f"Archivo de subtítulos no encontrado: {self.subtitles_path}")
+            if os.path.splitext(self.subtitles_path)[1].lower() not in ('.srt', '.vtt'):
+                raise VideoGeneratorError(f"Formato de subtítulos no soportado (se espera .srt o .vtt): {self.subtitles_path}")
+            inputs['subtitles'] = self.subtitles_path
+        
+        # Registrar (o verificar al reanudar) las huellas de las entradas
+        self.checkpoint.bind_inputs(inputs)
     
-    def load_and_validate_slides(self) -> List[Dict[str, Any]]:
-        """Carga y valida las slides desde el archivo de entrada."""
+    def load_and_validate_slides(self) -> List[Slide]:
+        """
+        Carga y valida las slides desde el archivo de entrada.
+
+        Devuelve las slides ya parseadas (``Slide``) que usan todas las etapas siguientes.
+        """
+        slides_path = os.path.join(self.job_dir, 'slides.json')
+        if self.checkpoint.completed('extract'):
+            print(f"↻ Slides ya extraídas, cargando: {slides_path}")
+            with open(slides_path, 'r', encoding='utf-8') as f:
+                return [Slide.from_dict(i, data) for i, data in enumerate(json.load(f), 1)]
+        
         print(f"Leyendo archivo: {self.input_txt_path}")
         
         with open(self.input_txt_path, 'r', encoding='utf-8') as f:
@@ -1445,12 +1897,26 @@ class VideoGenerator:
         except Exception as e:
             raise VideoGeneratorError(f"Error extrayendo slides: {e}")
         
+        if self.normalize_timeline:
+            # Duplicados, solapes y gaps en una sola pasada (mismo motor que fix_script.py)
+            print("Normalizando timeline...")
+            engine = TimelineEngine()
+            slides = engine.normalize(slides)
+            print(f"Timeline normalizado: {len(slides)} slides, {len(engine.events)} ajustes")
+        
         # Validar con schema
         self._validate_slides_schema(slides)
         
+        # Parsear una sola vez: tiempos en ms y hash de contenido
+        slides = [Slide.from_dict(i, data) for i, data in enumerate(slides, 1)]
+        
         # Validar tiempos
         TimeUtils.validate_slide_times(slides)
         
+        with open(slides_path, 'w', encoding='utf-8') as f:
+            json.dump([slide.to_dict() for slide in slides], f, indent=2, ensure_ascii=False)
+        self.checkpoint.complete('extract', slides_path)
+        
         return slides
     
     def _validate_slides_schema(self, slides: List[Dict[str, Any]]) -> None:
@@ -1470,20 +1936,17 @@ class VideoGenerator:
         except jsonschema.ValidationError as e:
             raise VideoGeneratorError(f"Error de validación de schema: {e.message}")
     
-    def render_slides(self, slides: List[Dict[str, Any]]) -> List[str]:
-        """Renderiza todas las slides como imágenes PNG."""
-        print("Renderizando slides...")
-        
-        slide_paths = []
-        
-        for i, slide in enumerate(slides, 1):
-            filename = f"slide_{i:04d}.png"
-            output_path = os.path.join(self.job_dir, filename)
-            
-            # render_slide ahora retorna la ruta real con el estilo incluido
-            actual_path = self.renderer.render_slide(slide, i, output_path)
-            slide_paths.append(actual_path)
-        
+    def plan_styles(self, slides: List[Slide]) -> List[str]:
+        """Elige el estilo de cada slide una sola vez (timeline compartido entre variantes)."""
+        planned = self.checkpoint.data.get('styles')
+        if planned and len(planned) == len(slides):
+            # Al reanudar se conservan los estilos ya elegidos
+            return planned
+        
+        styles = [self.renderer.style_manager.get_next_style() for _ in slides]
+        self.checkpoint.data['styles'] = styles
+        self.checkpoint.save()
+
         # Mostrar estadísticas de distribución de estilos
         stats = self.renderer.style_manager.get_style_statistics()
         print(f"\n📊 Estadísticas de estilos utilizados:")
@@ -1492,40 +1955,93 @@ class VideoGenerator:
         for style, count in stats['usage_count'].items():
             variance = stats['variance'][style]
             print(f"   • {style}: {count} veces (desviación: {variance:+.1f})")
-        
+
+        return styles
+
+    def render_slides(self, slides: List[Slide], out_dir: Optional[str] = None,
+                      styles: Optional[List[str]] = None,
+                      palette: Optional[Dict[str, Any]] = None,
+                      storyboard: Optional[StoryboardBuilder] = None) -> List[str]:
+        """Renderiza todas las slides como imágenes PNG."""
+        print("Renderizando slides...")
+
+        out_dir = out_dir or self.job_dir
+        if styles is None:
+            styles = self.plan_styles(slides)
+
+        scope = self._scope(out_dir)
+        slide_paths: List[Optional[str]] = [None] * len(slides)
+
+        def render_one(i: int, slide: Slide) -> None:
+            slide_hash = JobCheckpoint.slide_hash(slide, styles[i - 1], palette)
+            done = self.checkpoint.rendered_slide(scope, i, slide_hash)
+            if done:
+                if storyboard is not None:
+                    storyboard.add_frame_from_files(i, done)
+                slide_paths[i - 1] = done[0]
+                return
+
+            filename = f"slide_{i:04d}.png"
+            output_path = os.path.join(out_dir, filename)
+
+            # render_slide ahora retorna la ruta real con el estilo incluido
+            actual_path = self.renderer.render_slide(slide, i, output_path,
+                                                     style=styles[i - 1], palette=palette,
+                                                     storyboard=storyboard)
+            self.checkpoint.record_slide(scope, i, slide_hash, [actual_path])
+            slide_paths[i - 1] = actual_path
+
+        self._run_render_pool(render_one, slides)
         return slide_paths
-    
-    def generate_concat_file(self, slides: List[Dict[str, Any]], slide_paths: List[str]) -> str:
+
+    def _run_render_pool(self, render_one: Any, slides: List[Slide]) -> None:
+        """
+        Ejecuta ``render_one(i, slide)`` con tantos workers como núcleos asignados.
+
+        Son hilos (render_one comparte renderer, checkpoint y storyboard), por lo
+        que la parte en Python de cada slide se serializa en el GIL; ver CpuBudget.
+        """
+        if self.cpu_share <= 1:
+            for i, slide in enumerate(slides, 1):
+                render_one(i, slide)
+            return
+
+        with ThreadPoolExecutor(max_workers=self.cpu_share) as executor:
+            futures = [executor.submit(render_one, i, slide) for i, slide in enumerate(slides, 1)]
+            for future in futures:
+                future.result()
+
+    def generate_concat_file(self, slides: List[Slide], slide_paths: List[str],
+                             out_dir: Optional[str] = None) -> str:
         """Genera archivo list.txt para ffmpeg concat."""
-        list_path = os.path.join(self.job_dir, 'list.txt')
-        
+        list_path = os.path.join(out_dir or self.job_dir, 'list.txt')
+
         print("Generando archivo de concatenación...")
-        
+
         with open(list_path, 'w', encoding='utf-8') as f:
             for i, slide in enumerate(slides):
-                inicio_sec = TimeUtils.time_to_seconds(slide['inicio'])
-                fin_sec = TimeUtils.time_to_seconds(slide['fin'])
-                duration = fin_sec - inicio_sec
-                
+                duration = slide.duration_ms / 1000
+
                 # Usar ruta relativa para ffmpeg
                 slide_filename = os.path.basename(slide_paths[i])
                 f.write(f"file '{slide_filename}'\n")
-                f.write(f"duration {duration:.1f}\n")
-            
+                f.write(f"duration {duration:.3f}\n")
+
             # Para que ffmpeg reproduzca correctamente, agregar la última imagen sin duración
             if slides:
                 last_slide_filename = os.path.basename(slide_paths[-1])
                 f.write(f"file '{last_slide_filename}'\n")
-        
+
         print(f"Archivo de concatenación generado: {list_path}")
         return list_path
-    
-    def create_video(self, list_path: str) -> str:
+
+    def create_video(self, list_path: str, out_dir: Optional[str] = None) -> str:
         """Crea video de slides usando ffmpeg."""
-        slides_video_path = os.path.join(self.job_dir, 'slides.mp4')
-        
+        out_dir = out_dir or self.job_dir
+        slides_video_path = os.path.join(out_dir, 'slides.mp4')
+
         print("Generando video de slides...")
-        
+
         # Comando ffmpeg para crear video de slides con configuración compatible
         cmd = [
             'ffmpeg', '-y',
@@ -1535,72 +2051,363 @@ class VideoGenerator:
             '-fps_mode', 'cfr',  # Usar fps_mode en lugar de vsync
             '-r', '25',  # Frame rate
             '-pix_fmt', 'yuv420p',
+            '-threads', str(self.cpu_share),
             slides_video_path
         ]
-        
+
         try:
             # Ejecutar desde el directorio de trabajo para rutas relativas
-            result = subprocess.run(cmd, cwd=self.job_dir, capture_output=True, text=True)
+            result = subprocess.run(cmd, cwd=out_dir, capture_output=True, text=True)
             if result.returncode != 0:
                 print(f"Error ffmpeg stdout: {result.stdout}")
                 print(f"Error ffmpeg stderr: {result.stderr}")
                 raise VideoGeneratorError(f"Error en ffmpeg (slides): {result.stderr}")
-            
+
             print(f"Video de slides generado: {slides_video_path}")
         except Exception as e:
             raise VideoGeneratorError(f"Error ejecutando ffmpeg: {e}")
-        
+
         return slides_video_path
-    
-    def merge_audio(self, slides_video_path: str) -> None:
-        """Combina video de slides con audio."""
+
+    def render_reveal_slides(self, slides: List[Slide], out_dir: Optional[str] = None,
+                             styles: Optional[List[str]] = None,
+                             palette: Optional[Dict[str, Any]] = None,
+                             storyboard: Optional[StoryboardBuilder] = None) -> List[Tuple[str, List[str]]]:
+        """Renderiza cada slide como base + una capa transparente por bullet."""
+        print("Renderizando slides por capas (revelado progresivo)...")
+
+        out_dir = out_dir or self.job_dir
+        if styles is None:
+            styles = self.plan_styles(slides)
+
+        scope = self._scope(out_dir)
+        layered: List[Optional[Tuple[str, List[str]]]] = [None] * len(slides)
+
+        def render_one(i: int, slide: Slide) -> None:
+            slide_hash = JobCheckpoint.slide_hash(slide, styles[i - 1], palette)
+            done = self.checkpoint.rendered_slide(scope, i, slide_hash)
+            if done:
+                if storyboard is not None:
+                    storyboard.add_frame_from_files(i, done)
+                layered[i - 1] = (done[0], done[1:])
+                return
+
+            base_path, layer_paths = self.renderer.render_slide_layers(
+                slide, i, os.path.join(out_dir, f"slide_{i:04d}.png"),
+                style=styles[i - 1], palette=palette, storyboard=storyboard)
+            self.checkpoint.record_slide(scope, i, slide_hash, [base_path] + layer_paths)
+            layered[i - 1] = (base_path, layer_paths)
+
+        self._run_render_pool(render_one, slides)
+        return layered
+
+    def reveal_times(self, slide: Slide, layer_count: int) -> List[Tuple[float, float]]:
+        """
+        Ventanas (relativas al inicio de la slide) en que cada bullet está visible.
+
+        La duración inicio→fin se reparte en partes iguales: el bullet k
+        aparece en k·D/n y permanece hasta el final de la slide.
+        """
+        duration = slide.duration_ms / 1000
+        return [(duration * k / layer_count, duration) for k in range(layer_count)]
+
+    def create_reveal_video(self, slides: List[Slide], layered: List[Tuple[str, List[str]]],
+                            out_dir: Optional[str] = None) -> str:
+        """
+        Crea el video de slides con revelado progresivo.
+
+        Cada slide es un único ffmpeg que compone la base con sus capas usando
+        ``overlay`` y ``enable='between(t,…)'``; el costo en Python es una
+        composición por slide sin importar su duración. Los segmentos se unen
+        después con el demuxer concat sin recodificar.
+        """
+        out_dir = out_dir or self.job_dir
+        slides_video_path = os.path.join(out_dir, 'slides.mp4')
+
+        print("Generando video de slides con revelado progresivo...")
+
+        segments = []
+        for i, (slide, (base_path, layer_paths)) in enumerate(zip(slides, layered), 1):
+            # Frames desde el timeline acumulado para no arrastrar error de redondeo
+            start_frame = round(slide.start_ms * self.fps / 1000)
+            end_frame = round(slide.end_ms * self.fps / 1000)
+            frames = max(1, end_frame - start_frame)
+
+            segment_path = os.path.join(out_dir, f"segment_{i:04d}.mp4")
+            cmd = ['ffmpeg', '-y', '-loop', '1', '-framerate', str(self.fps), '-i', base_path]
+            for layer_path in layer_paths:
+                cmd.extend(['-loop', '1', '-framerate', str(self.fps), '-i', layer_path])
+
+            filters = []
+            current = '[0:v]'
+            for k, (appear, until) in enumerate(self.reveal_times(slide, len(layer_paths)), 1):
+                filters.append(f"{current}[{k}:v]overlay=enable='between(t,{appear:.3f},{until:.3f})'[v{k}]")
+                current = f'[v{k}]'
+            filters.append(f"{current}format=yuv420p[out]")
+
+            cmd.extend([
+                '-filter_complex', ';'.join(filters),
+                '-map', '[out]',
+                '-frames:v', str(frames),
+                '-r', str(self.fps),
+                '-threads', str(self.cpu_share),
+                segment_path
+            ])
+
+            result = subprocess.run(cmd, capture_output=True, text=True)
+            if result.returncode != 0:
+                print(f"Error ffmpeg stderr: {result.stderr}")
+                raise VideoGeneratorError(f"Error en ffmpeg (segmento {i}): {result.stderr}")
+            segments.append(segment_path)
+
+        list_path = os.path.join(out_dir, 'segments.txt')
+        with open(list_path, 'w', encoding='utf-8') as f:
+            for segment_path in segments:
+                f.write(f"file '{os.path.basename(segment_path)}'\n")
+
+        cmd = ['ffmpeg', '-y', '-f', 'concat', '-safe', '0', '-i', list_path, '-c', 'copy', slides_video_path]
+        result = subprocess.run(cmd, cwd=out_dir, capture_output=True, text=True)
+        if result.returncode != 0:
+            print(f"Error ffmpeg stderr: {result.stderr}")
+            raise VideoGeneratorError(f"Error en ffmpeg (concat segmentos): {result.stderr}")
+
+        print(f"Video de slides generado: {slides_video_path}")
+        return slides_video_path
+
+    def build_slides_video(self, slides: List[Slide], out_dir: Optional[str] = None,
+                           styles: Optional[List[str]] = None,
+                           palette: Optional[Dict[str, Any]] = None,
+                           output_path: Optional[str] = None) -> str:
+        """
+        Renderiza las slides y genera el video mudo (estático o con revelado progresivo).
+
+        Poster y storyboard se escriben junto a ``output_path`` con los frames
+        producidos en este mismo render; si faltan al reanudar se rearman desde
+        las slides del journal.
+        """
+        scope = self._scope(out_dir)
+        output_path = output_path or self.output_video_path
+        storyboard = StoryboardBuilder() if self.storyboard else None
+        if self.checkpoint.completed('storyboard', scope):
+            storyboard = None
+
+        done = self.checkpoint.completed('slides_video', scope)
+        if done:
+            print(f"↻ Video de slides ya generado: {done['path']}")
+            if storyboard is not None:
+                if self.reveal:
+                    self.render_reveal_slides(slides, out_dir, styles, palette, storyboard)
+                else:
+                    self.render_slides(slides, out_dir, styles, palette, storyboard)
+                self.write_storyboard(storyboard, slides, output_path, scope)
+            return done['path']
+
+        if self.reveal:
+            layered = self.render_reveal_slides(slides, out_dir, styles, palette, storyboard)
+            slides_video_path = self.create_reveal_video(slides, layered, out_dir)
+        else:
+            slide_paths = self.render_slides(slides, out_dir, styles, palette, storyboard)
+            list_path = self.generate_concat_file(slides, slide_paths, out_dir)
+            slides_video_path = self.create_video(list_path, out_dir)
+
+        if storyboard is not None:
+            self.write_storyboard(storyboard, slides, output_path, scope)
+
+        self.checkpoint.complete('slides_video', slides_video_path, scope)
+        return slides_video_path
+
+    def write_storyboard(self, storyboard: StoryboardBuilder, slides: List[Slide],
+                         output_path: str, scope: str) -> None:
+        """Escribe poster y storyboard y los registra en el checkpoint."""
+        written = storyboard.write(slides, output_path)
+        self.checkpoint.complete('storyboard', written['vtt'], scope,
+                                 poster=written['poster'], sheets=written['sheets'])
+
+    def analyze_audio(self) -> Dict[str, Any]:
+        """Analiza el audio una sola vez (duración y mapa de silencios) y lo guarda en el job."""
+        if self.audio_analysis is None:
+            print("Analizando audio...")
+            analyzer = AudioAnalyzer(self.audio_path, threads=self.cpu_share)
+            self.audio_analysis = analyzer.analyze()
+
+            analysis_path = os.path.join(self.job_dir, 'audio_analysis.json')
+            with open(analysis_path, 'w', encoding='utf-8') as f:
+                json.dump(self.audio_analysis, f, indent=2)
+
+            print(f"Duración del audio: {self.audio_analysis['duration']:.2f} segundos "
+                  f"({len(self.audio_analysis['silences'])} pausas detectadas)")
+        return self.audio_analysis
+
+    def probe_audio_duration(self) -> Optional[float]:
+        """Duración del audio según el análisis en proceso."""
+        return self.analyze_audio()['duration']
+
+    def prepare_timeline(self, slides: List[Slide]) -> List[Slide]:
+        """
+        Contrasta el timeline con el audio antes de renderizar.
+
+        Falla de inmediato si las slides terminan más allá del audio (más la
+        tolerancia) y, si se pidió, ajusta los límites entre slides a las pausas.
+        """
+        analysis = self.analyze_audio()
+        audio_duration = analysis['duration']
+        timeline_end = max(slide.end_ms for slide in slides) / 1000
+
+        if timeline_end > audio_duration + self.timeline_tolerance:
+            raise VideoGeneratorError(
+                f"El timeline termina en {TimeUtils.seconds_to_time(timeline_end)} pero el audio dura "
+                f"{TimeUtils.seconds_to_time(audio_duration)} "
+                f"({timeline_end - audio_duration:.1f}s de más); revisa el guion o el audio")
+        if audio_duration > timeline_end + self.timeline_tolerance:
+            print(f"WARNING: El audio dura {audio_duration - timeline_end:.1f}s más que el timeline; "
+                  f"la última slide quedará fija hasta el final")
+
+        if self.snap_to_pauses:
+            slides, moved = AudioAnalyzer.snap_slides(slides, analysis['silences'], self.snap_window)
+            print(f"✓ {moved} límites de slide ajustados a pausas del audio")
+
+        return slides
+
+    @staticmethod
+    def _escape_ffmetadata(value: str) -> str:
+        """Escapa los caracteres especiales del formato ffmetadata."""
+        for char in ('\\', '=', ';', '#', '\n'):
+            value = value.replace(char, '\\' + char)
+        return value
+
+    def write_chapters(self, slides: List[Slide], out_dir: Optional[str] = None) -> str:
+        """Escribe un archivo ffmetadata con un capítulo por slide (título = ``titulo``)."""
+        out_dir = out_dir or self.job_dir
+        chapters_path = os.path.join(out_dir, 'chapters.ffmeta')
+
+        lines = [';FFMETADATA1']
+        for i, slide in enumerate(slides, 1):
+            lines.extend(['', '[CHAPTER]', 'TIMEBASE=1/1000', f'START={slide.start_ms}', f'END={slide.end_ms}',
+                          f'title={self._escape_ffmetadata(slide.titulo)}'])
+
+        with open(chapters_path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n')
+
+        print(f"Capítulos generados: {chapters_path} ({len(slides)} capítulos)")
+        return chapters_path
+
+    def merge_audio(self, slides_video_path: str, output_path: Optional[str] = None,
+                    chapters_path: Optional[str] = None) -> None:
+        """
+        Combina video de slides con audio.
+
+        En la misma pasada (sin recodificar el video) agrega los capítulos de
+        ``chapters_path`` y, si se indicó, la pista de subtítulos como ``mov_text``.
+        """
         print("Combinando video con audio...")
-        
-        # Primero obtener la duración del audio
-        audio_duration_cmd = [
-            'ffprobe', '-v', 'quiet', 
-            '-show_entries', 'format=duration',
-            '-of', 'default=noprint_wrappers=1:nokey=1',
-            self.audio_path
-        ]
-        
-        try:
-            audio_result = subprocess.run(audio_duration_cmd, capture_output=True, text=True)
-            audio_duration = float(audio_result.stdout.strip())
-            print(f"Duración del audio: {audio_duration:.2f} segundos")
-        except Exception as e:
-            print(f"Warning: No se pudo obtener duración del audio: {e}")
-            audio_duration = None
-        
+
+        output_path = output_path or self.output_video_path
+        if self.checkpoint.completed('mux', output_path):
+            print(f"↻ Video final ya generado: {output_path}")
+            return
+
+        audio_duration = self.probe_audio_duration()
+
         # Comando simplificado para combinar video y audio
         cmd = [
             'ffmpeg', '-y',
             '-i', slides_video_path,
             '-i', self.audio_path,
+        ]
+        maps = ['-map', '0:v:0', '-map', '1:a:0']
+        next_input = 2
+
+        if self.subtitles_path:
+            cmd.extend(['-i', self.subtitles_path])
+            maps.extend(['-map', f'{next_input}:s:0'])
+            next_input += 1
+
+        if chapters_path:
+            cmd.extend(['-i', chapters_path])
+            maps.extend(['-map_metadata', str(next_input), '-map_chapters', str(next_input)])
+            next_input += 1
+
+        cmd.extend(maps)
+        cmd.extend([
             '-c:v', 'copy',  # Copiar video sin recodificar
             '-c:a', 'aac',
-            '-map', '0:v:0',
-            '-map', '1:a:0',
-        ]
-        
+            '-threads', str(self.cpu_share),
+        ])
+        if self.subtitles_path:
+            cmd.extend(['-c:s', 'mov_text', '-metadata:s:s:0', 'language=spa'])
+
         # Si tenemos la duración del audio, usarla como referencia
         if audio_duration:
             cmd.extend(['-t', str(audio_duration)])
-        
-        cmd.append(self.output_video_path)
-        
+
+        cmd.append(output_path)
+
         try:
             result = subprocess.run(cmd, capture_output=True, text=True)
             if result.returncode != 0:
                 print(f"Error ffmpeg stdout: {result.stdout}")
                 print(f"Error ffmpeg stderr: {result.stderr}")
                 raise VideoGeneratorError(f"Error en ffmpeg (audio merge): {result.stderr}")
-            
-            print(f"Video final generado: {self.output_video_path}")
+
+            print(f"Video final generado: {output_path}")
         except Exception as e:
             raise VideoGeneratorError(f"Error combinando audio: {e}")
-    
-    def generate_manifest(self, slides: List[Dict[str, Any]]) -> None:
+
+        self.checkpoint.complete('mux', output_path, output_path)
+
+    def parse_variants(self, spec: str) -> List[Dict[str, Any]]:
+        """
+        Interpreta la lista de variantes de --variants.
+
+        Cada variante es una paleta (``green``), un estilo fijo (``banner_style``)
+        o ambos separados por dos puntos (``banner_style:green``).
+        """
+        style_manager = self.renderer.style_manager
+        style_registry = self.renderer.style_registry
+        variants = []
+
+        for token in [t.strip() for t in spec.split(',') if t.strip()]:
+            style, palette_name = None, None
+            for part in token.split(':'):
+                if part in style_manager.color_palettes:
+                    palette_name = part
+                elif part in style_registry.styles:
+                    style = part
+                else:
+                    raise VideoGeneratorError(
+                        f"Variante desconocida '{part}'. Paletas: {', '.join(style_manager.color_palettes)}; "
+                        f"estilos: {', '.join(style_registry.names)}")
+
+            variants.append({
+                'name': token.replace(':', '_'),
+                'style': style,
+                'palette': style_manager.color_palettes.get(palette_name) if palette_name else None
+            })
+
+        if not variants:
+            raise VideoGeneratorError("--variants no contiene ninguna variante")
+
+        return variants
+
+    def render_variant(self, slides: List[Slide], styles: List[str],
+                       variant: Dict[str, Any]) -> str:
+        """Renderiza y codifica una variante en su propio subdirectorio y salida."""
+        variant_dir = os.path.join(self.job_dir, f"variant_{variant['name']}")
+        os.makedirs(variant_dir, exist_ok=True)
+
+        base, ext = os.path.splitext(self.output_video_path)
+        output_path = f"{base}_{variant['name']}{ext}"
+
+        variant_styles = [variant['style']] * len(slides) if variant['style'] else styles
+        slides_video_path = self.build_slides_video(slides, variant_dir, variant_styles, variant['palette'],
+                                                    output_path)
+        chapters_path = self.write_chapters(slides, variant_dir) if self.chapters else None
+        self.merge_audio(slides_video_path, output_path, chapters_path)
+
+        return output_path
+
+    def generate_manifest(self, slides: List[Slide],
+                          variant_outputs: Optional[Dict[str, str]] = None) -> None:
         """Genera archivo manifest.json con metadatos."""
         print("Generando manifest...")
         
@@ -1614,8 +2421,7 @@ class VideoGenerator:
         # Calcular duración total
         total_duration = 0
         if slides:
-            last_slide = slides[-1]
-            total_duration = TimeUtils.time_to_seconds(last_slide['fin'])
+            total_duration = slides[-1].end
         
         manifest = {
             "timestamp": datetime.now().isoformat(),
@@ -1635,15 +2441,21 @@ class VideoGenerator:
             "slides_summary": [
                 {
                     "index": i + 1,
-                    "titulo": slide.get('titulo', ''),
-                    "inicio": slide.get('inicio', ''),
-                    "fin": slide.get('fin', ''),
-                    "duration": TimeUtils.time_to_seconds(slide['fin']) - TimeUtils.time_to_seconds(slide['inicio'])
+                    "titulo": slide.titulo,
+                    "inicio": slide.inicio,
+                    "fin": slide.fin,
+                    "duration": slide.duration_ms / 1000
                 }
                 for i, slide in enumerate(slides)
             ]
         }
         
+        if variant_outputs:
+            manifest["variants"] = {
+                name: {"output_file": path, "checksum": file_checksum(path)}
+                for name, path in variant_outputs.items()
+            }
+        
         manifest_path = os.path.join(self.job_dir, 'manifest.json')
         with open(manifest_path, 'w', encoding='utf-8') as f:
             json.dump(manifest, f, indent=2, ensure_ascii=False)
@@ -1661,17 +2473,23 @@ class VideoGenerator:
             # Cargar y validar slides
             slides = self.load_and_validate_slides()
             
-            # Renderizar slides
-            slide_paths = self.render_slides(slides)
-            
-            # Generar archivo de concatenación
-            list_path = self.generate_concat_file(slides, slide_paths)
-            
-            # Crear video de slides
-            slides_video_path = self.create_video(list_path)
-            
-            # Combinar con audio
-            self.merge_audio(slides_video_path)
+            with self.cpu_budget:
+                # Las etapas son secuenciales: cada una toma los núcleos del job y los libera al terminar
+                with self.cpu_budget.stage():
+                    self.cpu_share = self.cpu_budget.split(1)
+                    # Analizar audio y validar/ajustar timeline antes de renderizar
+                    slides = self.prepare_timeline(slides)
+                
+                with self.cpu_budget.stage():
+                    self.cpu_share = self.cpu_budget.split(1)
+                    # Renderizar slides y crear video de slides
+                    slides_video_path = self.build_slides_video(slides)
+                
+                with self.cpu_budget.stage():
+                    self.cpu_share = self.cpu_budget.split(1)
+                    # Combinar con audio, capítulos y subtítulos
+                    chapters_path = self.write_chapters(slides) if self.chapters else None
+                    self.merge_audio(slides_video_path, chapters_path=chapters_path)
             
             # Generar manifest
             self.generate_manifest(slides)
@@ -1686,6 +2504,55 @@ class VideoGenerator:
             print(f"ERROR INESPERADO: {e}")
             sys.exit(1)
 
+    def generate_variants(self, variants_spec: str) -> None:
+        """
+        Genera N variantes de paleta/estilo del mismo guion en una sola ejecución.
+
+        Extracción, validación, plan de estilos y duración del audio se calculan
+        una vez; cada variante se renderiza y codifica en paralelo a su propia salida.
+        """
+        print("=== Iniciando generación de variantes ===")
+
+        try:
+            self.validate_inputs()
+            variants = self.parse_variants(variants_spec)
+            self.checkpoint.set_option('variants', variants_spec)
+
+            slides = self.load_and_validate_slides()
+
+            outputs = {}
+            with self.cpu_budget:
+                with self.cpu_budget.stage():
+                    # El análisis del audio decodifica con ffmpeg usando los núcleos de la etapa
+                    self.cpu_share = self.cpu_budget.split(1)
+                    slides = self.prepare_timeline(slides)
+                    styles = self.plan_styles(slides)
+
+                with self.cpu_budget.stage():
+                    # Los núcleos del job se reparten entre las variantes concurrentes
+                    workers = min(len(variants), self.cpu_budget.granted)
+                    self.cpu_share = self.cpu_budget.split(workers)
+                    with ThreadPoolExecutor(max_workers=workers) as executor:
+                        futures = {
+                            executor.submit(self.render_variant, slides, styles, variant): variant['name']
+                            for variant in variants
+                        }
+                        for future in as_completed(futures):
+                            outputs[futures[future]] = future.result()
+                            print(f"✓ Variante '{futures[future]}' generada: {outputs[futures[future]]}")
+
+            self.generate_manifest(slides, variant_outputs=outputs)
+
+            print(f"✓ {len(outputs)} variantes generadas")
+            print(f"✓ Artefactos guardados en: {self.job_dir}")
+
+        except VideoGeneratorError as e:
+            print(f"ERROR: {e}")
+            sys.exit(1)
+        except Exception as e:
+            print(f"ERROR INESPERADO: {e}")
+            sys.exit(1)
+
 
 def main():
     """Función principal del script."""
@@ -1696,21 +2563,71 @@ def main():
 Ejemplos:
   python generate_video.py input.txt audio.mp3 output.mp4
   python generate_video.py /ruta/completa/texto.md /ruta/audio.wav /ruta/video.mp4
+  python generate_video.py input.txt audio.mp3 output.mp4 --variants blue,green,banner_style:orange
+  python generate_video.py --resume /ruta/job_20250101_120000
         """
     )
     
-    parser.add_argument('input_txt_path', 
+    parser.add_argument('input_txt_path', nargs='?',
                        help='Ruta completa al archivo TXT/MD con JSON o bloques de texto')
-    parser.add_argument('audio_path', 
+    parser.add_argument('audio_path', nargs='?',
                        help='Ruta completa al archivo de audio (mp3/wav)')
-    parser.add_argument('output_video_path', 
+    parser.add_argument('output_video_path', nargs='?',
                        help='Ruta completa donde guardar el video MP4')
+    parser.add_argument('--resume', metavar='JOB_DIR',
+                       help='Reanuda un job interrumpido desde su primera etapa incompleta '
+                            '(entradas y opciones se toman de su checkpoint)')
     
     parser.add_argument('--verbose', '-v', action='store_true',
                        help='Mostrar información detallada')
+    parser.add_argument('--variants',
+                       help='Lista separada por comas de variantes (paleta, estilo o estilo:paleta); '
+                            'genera un video por variante, p. ej. output_green.mp4')
+    parser.add_argument('--reveal', action='store_true',
+                       help='Revela los puntos de cada slide uno a uno a lo largo de su duración')
+    parser.add_argument('--snap-to-pauses', action='store_true',
+                       help='Ajusta los límites entre slides a la pausa más cercana del audio')
+    parser.add_argument('--snap-window', type=float, default=1.5,
+                       help='Distancia máxima (segundos) para ajustar un límite a una pausa (default: 1.5)')
+    parser.add_argument('--timeline-tolerance', type=float, default=1.0,
+                       help='Segundos que el timeline puede exceder al audio antes de fallar (default: 1.0)')
+    parser.add_argument('--no-storyboard', action='store_true',
+                       help='No generar poster, sprite sheet de miniaturas ni su índice WebVTT')
+    parser.add_argument('--subtitles', metavar='SRT_O_VTT',
+                       help='Subtítulos (.srt o .vtt) a incluir como pista mov_text en el MP4 final')
+    parser.add_argument('--no-chapters', action='store_true',
+                       help='No agregar capítulos a partir de los títulos de las slides')
+    parser.add_argument('--cpu-budget', type=int, metavar='NUCLEOS',
+                       help='Núcleos por etapa para este job (por defecto: una parte equitativa entre los jobs activos)')
+    parser.add_argument('--cpu-token-dir', metavar='DIR',
+                       help='Directorio de tokens compartido por los jobs concurrentes '
+                            '(por defecto: <tmp>/vidazor_cpu_tokens)')
+    parser.add_argument('--normalize-timeline', action='store_true',
+                       help='Eliminar duplicados, recortar solapes y rellenar gaps del guion antes de validar '
+                            '(equivalente a fix_script.py, en el mismo proceso)')
+    parser.add_argument('--styles', metavar='ESTILO,...',
+                       help='Estilos de la rotación (por defecto los universales de styles.json); '
+                            'acepta cualquier estilo registrado, p. ej. timeline_flow,circle_network')
+    parser.add_argument('--style-templates', metavar='JSON', action='append',
+                       help='Archivo JSON con plantillas de estilo adicionales (se puede repetir)')
+    parser.add_argument('--text-backend', choices=SlideRenderer.TEXT_BACKENDS, default='pillow',
+                       help='Backend de texto: pillow (ImageDraw.text) o atlas (glifos cacheados, '
+                            'recomendado para miles de slides)')
     
     args = parser.parse_args()
     
+    if args.resume:
+        generator = VideoGenerator.resume(args.resume)
+        variants = generator.checkpoint.data['options'].get('variants')
+        if variants:
+            generator.generate_variants(variants)
+        else:
+            generator.generate()
+        return
+    
+    if not (args.input_txt_path and args.audio_path and args.output_video_path):
+        parser.error("se requieren input_txt_path, audio_path y output_video_path (o --resume JOB_DIR)")
+    
     if args.verbose:
         print(f"Input TXT: {args.input_txt_path}")
         print(f"Audio: {args.audio_path}")
@@ -1718,8 +2635,27 @@ Ejemplos:
         print()
     
     # Crear y ejecutar generador
-    generator = VideoGenerator(args.input_txt_path, args.audio_path, args.output_video_path)
-    generator.generate()
+    styles = [style.strip() for style in args.styles.split(',') if style.strip()] if args.styles else None
+    style_templates = [os.path.abspath(path) for path in args.style_templates or []] or None
+    try:
+        generator = VideoGenerator(args.input_txt_path, args.audio_path, args.output_video_path,
+                                   text_backend=args.text_backend, reveal=args.reveal,
+                                   snap_to_pauses=args.snap_to_pauses, snap_window=args.snap_window,
+                                   timeline_tolerance=args.timeline_tolerance,
+                                   storyboard=not args.no_storyboard,
+                                   subtitles_path=args.subtitles,
+                                   chapters=not args.no_chapters,
+                                   cpu_cores=args.cpu_budget,
+                                   cpu_token_dir=args.cpu_token_dir,
+                                   normalize_timeline=args.normalize_timeline,
+                                   styles=styles, style_templates=style_templates)
+    except VideoGeneratorError as e:
+        print(f"ERROR: {e}")
+        sys.exit(1)
+    if args.variants:
+        generator.generate_variants(args.variants)
+    else:
+        generator.generate()
 
 
 if __name__ == "__main__":